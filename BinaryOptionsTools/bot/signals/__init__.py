@@ -1,10 +1,93 @@
+import threading
+
+import pandas as pd
+
 from BinaryOptionsTools.indicators.trend import sma
+from BinaryOptionsTools.indicators import streaming
+
+def _candle_time(candles: pd.DataFrame, position: int) -> int:
+    """Epoch second of a get_candles row (DatetimeIndex or time column)."""
+    time = candles["time"].iloc[position] if "time" in candles.columns else candles.index[position]
+    if isinstance(time, pd.Timestamp):
+        return int((time - pd.Timestamp(0)) // pd.Timedelta(seconds=1))
+    return int(time)
 
 class StreamSignals:
-    def __init__(self) -> None:
-        pass
+    """Indicators updated incrementally from streamed OHLC candles.
+
+    Register the indicators first, then subscribe: every completed candle
+    updates them in O(1) and provisional() evaluates the in-progress candle.
+    """
+    def __init__(self, api=None, timeframe: int = 60) -> None:
+        self.api = api
+        self.timeframe = timeframe
+        self.engine = streaming.IndicatorEngine()
+
+    def subscribe(self, ticker: str = "EURUSD_otc", warm_up: int = 0):
+        """Aggregate ticks of ``ticker`` into candles that feed the indicators.
+
+        ``warm_up`` candles of history are fed first so values are ready immediately.
+        The subscription is made before the history is loaded, so no candle completes
+        unseen; live candles the history already holds are not fed twice.
+        """
+        lock = threading.Lock()
+        state = {"first": True, "last": None, "pending": [] if warm_up else None}
+
+        def feed(asset, candle):
+            if state["last"] is None or candle.timestamp > state["last"]:
+                self.engine.on_candle_complete(asset, candle)
+
+        def on_candle_complete(asset, candle):
+            with lock:
+                if state["first"]:
+                    # The aggregator started it when the subscription did, mid-period
+                    state["first"] = False
+                elif state["pending"] is not None:
+                    state["pending"].append(candle)
+                else:
+                    feed(asset, candle)
+
+        result = self.api.subscribe_candles(ticker, create_ohlc=True, timeframe_seconds=self.timeframe,
+                                            on_candle_complete=on_candle_complete)
+        if warm_up:
+            # One candle more: the last one is still forming and is fed when it completes live
+            seconds = (warm_up + 1) * self.timeframe
+            # get_candles counts seconds, at most 9000 per request
+            candles = self.api.get_candles(ticker, self.timeframe, count=min(seconds, 9000),
+                                           count_request=max(1, -(-seconds // 9000)))
+            with lock:
+                if candles is not None and len(candles) > 1:
+                    self.engine.warm_up(ticker, candles.iloc[:-1])
+                    state["last"] = _candle_time(candles, -2)
+                pending, state["pending"] = state["pending"], None
+                for candle in pending:
+                    feed(ticker, candle)
+        return result
+
     def sma(self, period):
-        pass
+        return self.engine.add(f"sma_{period}", streaming.SMA, period)
+    def ema(self, period):
+        return self.engine.add(f"ema_{period}", streaming.EMA, period)
+    def rsi(self, period: int = 14):
+        return self.engine.add(f"rsi_{period}", streaming.RSI, period)
+    def macd(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        return self.engine.add("macd", streaming.MACD, fast_period, slow_period, signal_period)
+    def bollinger_bands(self, period: int = 20, std_dev: float = 2.0):
+        return self.engine.add("bollinger_bands", streaming.BollingerBands, period, std_dev)
+    def stochastic(self, k_period: int = 14, d_period: int = 3):
+        return self.engine.add("stochastic", streaming.Stochastic, k_period, d_period)
+    def williams_r(self, period: int = 14):
+        return self.engine.add(f"williams_r_{period}", streaming.WilliamsR, period)
+    def atr(self, period: int = 14):
+        return self.engine.add(f"atr_{period}", streaming.ATR, period)
+
+    def latest(self, ticker: str = "EURUSD_otc"):
+        """Values as of the last completed candle."""
+        return self.engine.values(ticker)
+    def provisional(self, ticker: str = "EURUSD_otc"):
+        """Values including the in-progress candle."""
+        current = self.api.get_current_ohlc_candle(ticker, self.timeframe)
+        return self.engine.provisional(ticker, current)
 
 class signals:
     def __init__(self) -> None:
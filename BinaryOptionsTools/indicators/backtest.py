@@ -0,0 +1,380 @@
+"""
+Vectorised backtesting of binary option strategies.
+
+Signals are evaluated for every candle of a history at once and every trade is
+settled in bulk: a CALL opened at the close of candle ``i`` wins when the price
+at expiry is higher, a PUT when it is lower, and an unchanged price returns the
+stake. The signal functions compute the indicators with the pandas formulas of
+technical_analysis and apply its signal rules to every candle.
+
+Example:
+    candles = load_history("history-EURUSD_otc.csv")
+    signal = sma_cross_signal(candles["close"].values, 9, 14)
+    result = backtest(candles, signal, expiry=60, payout=92)
+    print(result["stats"])
+"""
+
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from BinaryOptionsTools.indicators import technical_analysis as ta
+
+CALL = 1
+PUT = -1
+
+_PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+
+def load_history(source: Union[str, pd.DataFrame, Dict[str, np.ndarray]]) -> pd.DataFrame:
+    """
+    Candles in backtest layout: a ``time`` column of epoch seconds plus open/high/low/close, sorted.
+
+    Args:
+        source: Path of a candle CSV (e.g. the bundled ``history-<asset>.csv`` files), a
+            get_candles DataFrame (DatetimeIndex named time), any frame with a ``time``
+            column, or a dictionary of column arrays such as CandleWarehouse.query() output
+    """
+    if isinstance(source, str):
+        df = pd.read_csv(source)
+    elif isinstance(source, dict):
+        df = pd.DataFrame(source)
+    else:
+        df = source
+    if "time" in df.columns:
+        times = df["time"]
+    elif isinstance(df.index, pd.DatetimeIndex):
+        times = df.index.to_series()
+    else:
+        raise ValueError("Candle history needs a time column or a DatetimeIndex")
+    if not pd.api.types.is_numeric_dtype(times):
+        times = pd.to_datetime(times)
+        if times.dt.tz is not None:
+            times = times.dt.tz_convert(None)
+        times = (times - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+
+    missing = [c for c in _PRICE_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Candle history is missing columns: {missing}")
+    candles = pd.DataFrame({"time": np.asarray(times, dtype=np.int64)})
+    for column in _PRICE_COLUMNS:
+        candles[column] = np.asarray(df[column], dtype=np.float64)
+    candles = candles.sort_values("time", kind="stable").drop_duplicates("time", keep="last")
+    return candles.reset_index(drop=True)
+
+
+# ==============================================================================
+# SIGNAL SERIES (1 = CALL, -1 = PUT, 0 = no trade)
+# ==============================================================================
+
+def _direction(buy: np.ndarray, sell: np.ndarray) -> np.ndarray:
+    """Signal array from BUY/SELL masks, BUY taking precedence like the if/elif chains."""
+    signal = np.zeros(len(buy), dtype=np.int8)
+    signal[sell] = PUT
+    signal[buy] = CALL
+    return signal
+
+
+def _series(values) -> pd.Series:
+    return pd.Series(np.asarray(values, dtype=np.float64))
+
+
+def sma_signal(close: np.ndarray, period: int = 20) -> np.ndarray:
+    """BUY above the simple moving average, SELL below it (technical_analysis.sma)."""
+    close = np.asarray(close, dtype=np.float64)
+    average = ta._sma_series(_series(close), period).values
+    valid = ~np.isnan(average)
+    return _direction(valid & (close > average), valid & (close <= average))
+
+
+def ema_signal(close: np.ndarray, period: int = 20) -> np.ndarray:
+    """BUY above the exponential moving average, SELL below it (technical_analysis.ema)."""
+    close = np.asarray(close, dtype=np.float64)
+    average = ta._ema_series(_series(close), period).values
+    valid = np.arange(len(close)) >= period - 1
+    return _direction(valid & (close > average), valid & (close <= average))
+
+
+def rsi_signal(close: np.ndarray, period: int = 14, oversold: float = 30, overbought: float = 70) -> np.ndarray:
+    """BUY when RSI is oversold, SELL when overbought (technical_analysis.rsi)."""
+    values = ta._rsi_series(_series(close), period).values
+    return _direction(values < oversold, values > overbought)
+
+
+def macd_signal(close: np.ndarray, fast_period: int = 12, slow_period: int = 26,
+                signal_period: int = 9) -> np.ndarray:
+    """BUY when MACD crosses above its signal line, SELL when it crosses below (technical_analysis.macd)."""
+    line, signal_line = (series.values for series in ta._macd_series(_series(close), fast_period, slow_period,
+                                                                      signal_period))
+    above = line > signal_line
+    below = line < signal_line
+    prev_line = np.concatenate([line[:1], line[:-1]])
+    prev_signal = np.concatenate([signal_line[:1], signal_line[:-1]])
+    return _direction(above & (prev_line <= prev_signal), below & (prev_line >= prev_signal))
+
+
+def bollinger_signal(close: np.ndarray, period: int = 20, std_dev: float = 2.0) -> np.ndarray:
+    """BUY at or below the lower band, SELL at or above the upper band (technical_analysis.bollinger_bands)."""
+    upper, _, lower = ta._bollinger_series(_series(close), period, std_dev)
+    close = np.asarray(close, dtype=np.float64)
+    return _direction(close <= lower.values, close >= upper.values)
+
+
+def stochastic_signal(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                      k_period: int = 14, d_period: int = 3) -> np.ndarray:
+    """Oversold/overbought zones first, then %K/%D crossovers (technical_analysis.stochastic)."""
+    slowk, slowd = (line.values for line in ta._stochastic_series(_series(high), _series(low), _series(close),
+                                                                  k_period, d_period))
+
+    prev_k = np.concatenate([[np.nan], slowk[:-1]])
+    prev_d = np.concatenate([[np.nan], slowd[:-1]])
+    valid = ~(np.isnan(slowk) | np.isnan(slowd))
+    oversold = valid & (slowk < 20) & (slowd < 20)
+    overbought = valid & ~oversold & (slowk > 80) & (slowd > 80)
+    zone = oversold | overbought
+    cross_up = valid & ~zone & (slowk > slowd) & (prev_k <= prev_d)
+    cross_down = valid & ~zone & ~cross_up & (slowk < slowd) & (prev_k >= prev_d)
+    return _direction(oversold | cross_up, overbought | cross_down)
+
+
+def williams_r_signal(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """BUY below -80, SELL above -20 (technical_analysis.williams_r)."""
+    willr = ta._williams_r_series(_series(high), _series(low), _series(close), period).values
+    return _direction(willr < -80, willr > -20)
+
+
+def sma_cross_signal(close: np.ndarray, fast_period: int = 9, slow_period: int = 14) -> np.ndarray:
+    """CALL while the fast SMA is above the slow one, PUT while below (signals.sma_cross_over)."""
+    close = _series(close)
+    fast = ta._sma_series(close, fast_period).values
+    slow = ta._sma_series(close, slow_period).values
+    return _direction(fast > slow, fast < slow)
+
+
+def indicator_signals(candles: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Signal series of the signal indicators of get_all_indicators, keyed like it."""
+    high, low, close = (np.asarray(candles[name]) for name in ("high", "low", "close"))
+    return {
+        "sma_20": sma_signal(close, 20),
+        "ema_20": ema_signal(close, 20),
+        "rsi": rsi_signal(close, 14),
+        "macd": macd_signal(close, 12, 26, 9),
+        "bollinger_bands": bollinger_signal(close, 20, 2.0),
+        "stochastic": stochastic_signal(high, low, close, 14, 3),
+        "williams_r": williams_r_signal(high, low, close, 14),
+    }
+
+
+# get_trading_signals reads each indicator's "signal" entry; MACD's holds the signal line, so
+# its crossovers (in "trade_signal") never vote
+VOTING_INDICATORS = ("sma_20", "ema_20", "rsi", "bollinger_bands", "stochastic", "williams_r")
+
+
+def consensus_signal(signals: Sequence[np.ndarray], strong: bool = False) -> np.ndarray:
+    """
+    Majority vote of several signal series with the thresholds of get_trading_signals.
+
+    Args:
+        signals: Signal arrays of the same length
+        strong: Only trade STRONG_BUY/STRONG_SELL (one side has more than 1.5x the votes of the other)
+
+    Returns:
+        Signal array
+    """
+    votes = np.vstack(signals)
+    buy = (votes == CALL).sum(axis=0)
+    sell = (votes == PUT).sum(axis=0)
+    if strong:
+        return _direction(buy > sell * 1.5, sell > buy * 1.5)
+    return _direction(buy > sell, sell > buy)
+
+
+def trading_signal_series(candles: pd.DataFrame, strong: bool = False) -> np.ndarray:
+    """get_trading_signals' overall signal for every candle of a history."""
+    signals = indicator_signals(candles)
+    return consensus_signal([signals[name] for name in VOTING_INDICATORS], strong)
+
+
+# ==============================================================================
+# SETTLEMENT
+# ==============================================================================
+
+def _period(times: np.ndarray) -> int:
+    return int(np.median(np.diff(times))) if len(times) > 1 else 0
+
+
+def expiry_index(times: np.ndarray, expiry: int) -> np.ndarray:
+    """
+    Index of the candle whose close settles a trade opened at the close of each candle.
+
+    Candle times are open times: a trade opened at the close of candle i expires ``expiry``
+    seconds later, at the close of the candle starting at times[i] + expiry (rounded down
+    to whole periods). Trades whose exit candle is missing, because the history has a gap
+    there or ends before it, get -1.
+    """
+    times = np.asarray(times)
+    period = _period(times)
+    if expiry < period:
+        raise ValueError(f"expiry ({expiry}s) is shorter than the candle period ({period}s)")
+    if not period:
+        return np.full(len(times), -1, dtype=np.intp)
+    targets = times + expiry // period * period
+    exits = np.searchsorted(times, targets, side="left")
+    found = exits < len(times)
+    found[found] = times[exits[found]] == targets[found]
+    return np.where(found, exits, -1)
+
+
+def candle_outcomes(candles: pd.DataFrame, signal: np.ndarray, expiry: int = 60,
+                    payout: Union[float, np.ndarray] = 92, stake: float = 1.0):
+    """
+    Settle every signal in place: per candle result (1 win, 0 draw or no trade, -1 loss),
+    profit and exit index (-1 when the trade cannot be settled), for window statistics
+    by slicing instead of settling again.
+    """
+    close = np.asarray(candles["close"])
+    exits = expiry_index(candles["time"], expiry)
+    settled = exits >= 0
+    result = np.zeros(len(close), dtype=np.int8)
+    result[settled] = np.sign(close[exits[settled]] - close[settled]).astype(np.int8) * np.asarray(signal)[settled]
+    rate = np.broadcast_to(np.asarray(payout, dtype=np.float64) / 100.0, close.shape)
+    profit = np.where(result > 0, stake * rate, np.where(result < 0, -stake, 0.0))
+    return result, profit, exits
+
+
+def settle(candles: pd.DataFrame, signal: np.ndarray, expiry: int = 60,
+           payout: Union[float, np.ndarray] = 92, stake: float = 1.0, overlap: bool = True) -> pd.DataFrame:
+    """
+    Settle a fixed-expiry trade for every non-zero signal.
+
+    Args:
+        candles: History from load_history, or a dictionary of its column arrays
+        signal: One value per candle, 1 = CALL, -1 = PUT, 0 = no trade; acted on at the candle close
+        expiry: Trade duration in seconds
+        payout: Payout percentage of a win (e.g. 92), or one value per candle
+        stake: Amount of every trade
+        overlap: If False a new trade is only opened once the previous one expired
+
+    Returns:
+        DataFrame of trades: entry_time, direction, entry_price, exit_price, result (1 win,
+        0 draw, -1 loss) and profit
+    """
+    times = np.asarray(candles["time"])
+    close = np.asarray(candles["close"])
+    signal = np.asarray(signal)
+    if len(signal) != len(close):
+        raise ValueError("signal must have one value per candle")
+
+    period = _period(times)
+    entries = np.flatnonzero(signal)
+    exits = expiry_index(times, expiry)[entries]
+    # Trades expiring after the end of the history cannot be settled
+    entries, exits = entries[exits >= 0], exits[exits >= 0]
+
+    if not overlap and len(entries):
+        entries, exits = _sequential(entries, exits)
+
+    direction = signal[entries].astype(np.int8)
+    entry_price = close[entries]
+    exit_price = close[exits]
+    result = np.sign(exit_price - entry_price).astype(np.int8) * direction
+    rate = np.broadcast_to(np.asarray(payout, dtype=np.float64) / 100.0, close.shape)[entries]
+    profit = np.where(result > 0, stake * rate, np.where(result < 0, -stake, 0.0))
+    return pd.DataFrame({
+        "entry_time": times[entries],
+        "exit_time": times[exits] + period,
+        "direction": direction,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "result": result,
+        "profit": profit,
+    })
+
+
+def _sequential(entries: np.ndarray, exits: np.ndarray):
+    """Keep the first trade, then the first signal after each kept trade expired."""
+    keep = []
+    position = 0
+    while position < len(entries):
+        keep.append(position)
+        position = int(np.searchsorted(entries, exits[position], side="left"))
+    keep = np.asarray(keep)
+    return entries[keep], exits[keep]
+
+
+def summarise(trades: pd.DataFrame, stake: float = 1.0) -> Dict:
+    """Win rate, expectancy and drawdown of settled trades."""
+    profit = trades["profit"].values
+    result = trades["result"].values
+    count = len(profit)
+    wins = int((result > 0).sum())
+    losses = int((result < 0).sum())
+    decided = wins + losses
+
+    equity = np.cumsum(profit)
+    peaks = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:]
+    drawdown = peaks - equity
+    losing = np.concatenate([[0], (result < 0).astype(np.int64), [0]])
+    edges = np.flatnonzero(np.diff(losing))
+    longest_losing = int((edges[1::2] - edges[::2]).max()) if len(edges) else 0
+    gross_win = float(profit[profit > 0].sum())
+    gross_loss = float(-profit[profit < 0].sum())
+
+    return {
+        "trades": count,
+        "wins": wins,
+        "losses": losses,
+        "draws": count - decided,
+        "win_rate": wins / decided if decided else 0.0,
+        # Win rate at which the payout exactly covers the losses
+        "breakeven_win_rate": float(stake / (stake + profit[profit > 0].mean())) if wins else None,
+        "total_profit": float(equity[-1]) if count else 0.0,
+        "expectancy": float(profit.mean()) if count else 0.0,
+        "expectancy_per_stake": float(profit.mean() / stake) if count else 0.0,
+        "profit_factor": gross_win / gross_loss if gross_loss else None,
+        "max_drawdown": float(drawdown.max()) if count else 0.0,
+        "max_consecutive_losses": longest_losing,
+    }
+
+
+def _as_history(candles) -> pd.DataFrame:
+    """Histories already in backtest layout are used as they are."""
+    if isinstance(candles, pd.DataFrame) and "time" in candles.columns \
+            and pd.api.types.is_integer_dtype(candles["time"]) and candles["time"].is_monotonic_increasing:
+        return candles
+    return load_history(candles)
+
+
+def backtest(candles: Union[str, pd.DataFrame], signal: Optional[np.ndarray] = None, expiry: int = 60,
+             payout: Union[float, np.ndarray] = 92, stake: float = 1.0, overlap: bool = True) -> Dict:
+    """
+    Backtest a signal series over a candle history.
+
+    Args:
+        candles: History, anything load_history accepts
+        signal: Signal series (defaults to get_trading_signals' overall signal)
+        expiry: Trade duration in seconds
+        payout: Payout percentage of a win, or one value per candle
+        stake: Amount of every trade
+        overlap: If False trades never overlap
+
+    Returns:
+        {"stats": summary statistics, "trades": DataFrame of settled trades}
+    """
+    candles = _as_history(candles)
+    if signal is None:
+        signal = trading_signal_series(candles)
+    trades = settle(candles, signal, expiry, payout, stake, overlap)
+    return {"stats": summarise(trades, stake), "trades": trades}
+
+
+def backtest_many(candles: Union[str, pd.DataFrame], signals: Dict[str, np.ndarray], expiry: int = 60,
+                  payout: Union[float, np.ndarray] = 92, stake: float = 1.0, overlap: bool = True) -> pd.DataFrame:
+    """Backtest several named signal series over the same history, one statistics row each."""
+    candles = _as_history(candles)
+    rows: List[Dict] = []
+    for name, signal in signals.items():
+        stats = backtest(candles, signal, expiry, payout, stake, overlap)["stats"]
+        rows.append({"strategy": name, **stats})
+    return pd.DataFrame(rows).sort_values("expectancy", ascending=False, kind="stable").reset_index(drop=True)
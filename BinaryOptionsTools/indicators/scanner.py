@@ -0,0 +1,186 @@
+"""
+Multi-asset market scanner.
+
+Candles are fetched concurrently on threads (network bound) and every frame is
+handed to a process pool as soon as it arrives, where the NumPy/pandas heavy
+comprehensive analysis runs in parallel. The result is one table with a row per
+(asset, timeframe), strongest signals first.
+
+Example:
+    with MarketScanner(api) as scanner:
+        table = scanner.scan(["EURUSD_otc", "GBPUSD_otc"], timeframes=[60, 300])
+"""
+
+import concurrent.futures
+import multiprocessing
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from BinaryOptionsTools.indicators.technical_analysis import (
+    AnalysisContext,
+    _fetch_candles,
+    get_comprehensive_analysis,
+)
+
+SCAN_COLUMNS = [
+    "asset", "timeframe", "signal", "score", "confidence", "buy_signals", "sell_signals",
+    "price", "candles", "error",
+]
+
+_DIRECTIONS = {
+    "VERY_STRONG_BUY": 1, "STRONG_BUY": 1, "BUY": 1,
+    "VERY_STRONG_SELL": -1, "STRONG_SELL": -1, "SELL": -1,
+}
+
+
+def analyse_frame(asset: str, timeframe: int, df: pd.DataFrame, num_candles: int = 200,
+                  detailed: bool = False) -> Dict:
+    """
+    Run the comprehensive analysis on fetched candles and summarise it as one table row.
+
+    Module level so it can run in a worker process.
+    """
+    row = {column: None for column in SCAN_COLUMNS}
+    row.update(asset=asset, timeframe=timeframe, candles=0 if df is None else len(df))
+    if df is None or df.empty:
+        row["error"] = "No candles"
+        return row
+
+    analysis = get_comprehensive_analysis(AnalysisContext(df, asset, timeframe), timeframe, asset, num_candles)
+    if "error" in analysis:
+        row["error"] = analysis["error"]
+        return row
+
+    summary = analysis["comprehensive_summary"]
+    buy, sell = summary["total_buy_signals"], summary["total_sell_signals"]
+    total = buy + sell
+    row.update(
+        signal=analysis["final_signal"],
+        # Net agreement of all signals, from -1 (all sell) to 1 (all buy)
+        score=(buy - sell) / total if total else 0.0,
+        confidence=float(summary["signal_confidence"]),
+        buy_signals=int(buy),
+        sell_signals=int(sell),
+        price=float(df["close"].iloc[-1]),
+    )
+    if detailed:
+        row["analysis"] = analysis
+    return row
+
+
+def rank_signals(rows: List[Dict]) -> pd.DataFrame:
+    """Table of scan rows, strongest directional signals first and errors last."""
+    table = pd.DataFrame(rows)
+    for column in SCAN_COLUMNS:
+        if column not in table.columns:
+            table[column] = None
+    if table.empty:
+        return table[SCAN_COLUMNS]
+    table["direction"] = table["signal"].map(_DIRECTIONS).fillna(0).astype(int)
+    table["_strength"] = table["score"].astype(float).abs().fillna(-1)
+    table = table.sort_values(
+        ["_strength", "confidence", "buy_signals", "asset", "timeframe"],
+        ascending=[False, False, False, True, True],
+        na_position="last",
+        kind="stable",
+    )
+    extra = [c for c in table.columns if c not in SCAN_COLUMNS and c not in ("direction", "_strength")]
+    return table[SCAN_COLUMNS[:3] + ["direction"] + SCAN_COLUMNS[3:] + extra].reset_index(drop=True)
+
+
+class MarketScanner:
+    """Scans many assets and timeframes per call, reusing its worker pools between scans.
+
+    Args:
+        api: Object candles are fetched from (e.g. PocketOption)
+        fetch: Optional ``fetch(asset, timeframe, num_candles) -> DataFrame``, defaults to
+            the technical analysis candle fetch through ``api``
+        fetch_workers: Threads fetching candles at the same time
+        processes: Analysis worker processes (None for one per CPU, 0 to analyse on the
+            fetch threads instead)
+    """
+
+    def __init__(self, api=None, fetch: Optional[Callable[[str, int, int], pd.DataFrame]] = None,
+                 fetch_workers: int = 8, processes: Optional[int] = None):
+        if api is None and fetch is None:
+            raise ValueError("MarketScanner needs an api or a fetch function")
+        self.api = api
+        self.fetch = fetch or (lambda asset, timeframe, num_candles: _fetch_candles(api, asset, timeframe, num_candles))
+        self.fetch_workers = fetch_workers
+        self.processes = processes
+        self._fetch_pool = None
+        self._process_pool = None
+
+    def _pools(self):
+        if self._fetch_pool is None:
+            self._fetch_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.fetch_workers, thread_name_prefix="scanner-fetch")
+        if self._process_pool is None and self.processes != 0:
+            # Forking this process (websocket thread, fetch threads) can copy locks those threads hold
+            self._process_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+        return self._fetch_pool, self._process_pool
+
+    def scan(self, assets: Iterable[str], timeframes: Iterable[int] = (60,), num_candles: int = 200,
+             detailed: bool = False, timeout: Optional[float] = None) -> pd.DataFrame:
+        """
+        Analyse every (asset, timeframe) pair and rank the signals.
+
+        Args:
+            assets: Assets to scan, e.g. ["EURUSD_otc", "GBPUSD_otc"]
+            timeframes: Candle periods in seconds
+            num_candles: Candles fetched and analysed per pair
+            detailed: Also keep the full analysis of every pair in an "analysis" column
+            timeout: Seconds to wait for the whole scan (None waits for everything)
+
+        Returns:
+            DataFrame with one row per pair (see SCAN_COLUMNS plus "direction"), strongest first
+        """
+        fetch_pool, process_pool = self._pools()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        jobs = [(asset, timeframe) for timeframe in timeframes for asset in assets]
+
+        def fetch_and_analyse(asset, timeframe):
+            df = self.fetch(asset, timeframe, num_candles)
+            if df is None or df.empty:
+                return analyse_frame(asset, timeframe, pd.DataFrame(), num_candles)
+            if process_pool is None:
+                return analyse_frame(asset, timeframe, df, num_candles, detailed)
+            # Analysis overlaps with the fetches still in flight
+            return process_pool.submit(analyse_frame, asset, timeframe, df, num_candles, detailed)
+
+        futures = {fetch_pool.submit(fetch_and_analyse, asset, timeframe): (asset, timeframe)
+                   for asset, timeframe in jobs}
+        rows = []
+        for future, (asset, timeframe) in futures.items():
+            try:
+                result = future.result(timeout=self._remaining(deadline))
+                if isinstance(result, concurrent.futures.Future):
+                    result = result.result(timeout=self._remaining(deadline))
+            except concurrent.futures.TimeoutError:
+                result = {"asset": asset, "timeframe": timeframe, "error": "Timed out"}
+            except Exception as e:
+                result = {"asset": asset, "timeframe": timeframe, "error": f"Scan failed: {str(e)}"}
+            rows.append(result)
+        return rank_signals(rows)
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+    def close(self):
+        """Shut the worker pools down."""
+        if self._fetch_pool is not None:
+            self._fetch_pool.shutdown(wait=False, cancel_futures=True)
+            self._fetch_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
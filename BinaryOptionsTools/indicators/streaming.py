@@ -0,0 +1,524 @@
+"""
+Streaming (incremental) technical indicators.
+
+Each indicator keeps a small running state and is updated in O(1) per completed
+candle instead of recomputing the whole window. ``peek`` returns the value the
+indicator would have if the in-progress candle closed now, without changing the
+state, so signals can be evaluated on every tick.
+
+Conventions follow TA-Lib: EMA is seeded with the SMA of its first ``period``
+values, RSI and ATR use Wilder smoothing and Bollinger Bands use the population
+standard deviation.
+
+Example:
+    engine = IndicatorEngine()
+    engine.add("rsi_14", RSI, 14)
+    engine.add("macd", MACD)
+    api.subscribe_candles("EURUSD_otc", create_ohlc=True, timeframe_seconds=60,
+                          on_candle_complete=engine.on_candle_complete)
+    engine.values("EURUSD_otc")           # committed values
+    engine.provisional("EURUSD_otc", api.get_current_ohlc_candle("EURUSD_otc", 60))
+"""
+
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+def _hlc(candle) -> Tuple[float, float, float]:
+    """High, low and close of an OHLCCandle, a candle dict or a DataFrame row."""
+    if isinstance(candle, dict):
+        return float(candle["high"]), float(candle["low"]), float(candle["close"])
+    return float(candle.high), float(candle.low), float(candle.close)
+
+
+# ==============================================================================
+# RUNNING STATES ON PLAIN VALUES
+# ==============================================================================
+
+class _Mean:
+    """Mean of the last ``period`` values."""
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self._since_resum = 0
+
+    def update(self, x: float) -> Optional[float]:
+        self.window.append(x)
+        self.total += x
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        self._since_resum += 1
+        if self._since_resum >= self.period:
+            # Re-sum once per window so rounding errors cannot accumulate
+            self.total = math.fsum(self.window)
+            self._since_resum = 0
+        return self.value
+
+    def peek(self, x: float) -> Optional[float]:
+        n = len(self.window)
+        if n == self.period:
+            return (self.total - self.window[0] + x) / self.period
+        if n == self.period - 1:
+            return (self.total + x) / self.period
+        return None
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.total / self.period if len(self.window) == self.period else None
+
+
+class _Smoothed:
+    """Exponential smoothing seeded with the mean of the first ``period`` values.
+
+    ``alpha`` is 2 / (period + 1) for an EMA and 1 / period for Wilder smoothing.
+    """
+
+    def __init__(self, period: int, alpha: float):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        self.alpha = alpha
+        self.count = 0
+        self.seed_total = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> Optional[float]:
+        self.value = self.peek(x)
+        self.count += 1
+        if self.count <= self.period:
+            self.seed_total += x
+        return self.value
+
+    def peek(self, x: float) -> Optional[float]:
+        if self.count >= self.period:
+            return self.value + self.alpha * (x - self.value)
+        if self.count == self.period - 1:
+            return (self.seed_total + x) / self.period
+        return None
+
+
+class _Extreme:
+    """Maximum (or minimum) of the last ``period`` values, using a monotonic deque."""
+
+    def __init__(self, period: int, maximum: bool = True):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        self.maximum = maximum
+        self.candidates = deque()  # (index, value), values strictly monotonic
+        self.index = -1
+
+    def _dominates(self, a: float, b: float) -> bool:
+        return a >= b if self.maximum else a <= b
+
+    def update(self, x: float) -> Optional[float]:
+        self.index += 1
+        while self.candidates and self._dominates(x, self.candidates[-1][1]):
+            self.candidates.pop()
+        self.candidates.append((self.index, x))
+        if self.candidates[0][0] <= self.index - self.period:
+            self.candidates.popleft()
+        return self.value
+
+    def peek(self, x: float) -> Optional[float]:
+        if self.index + 2 < self.period:
+            return None
+        # Only the oldest candidate can drop out of the window on the next value
+        oldest = self.index + 1 - self.period
+        best = None
+        for position, value in self.candidates:
+            if position > oldest:
+                best = value
+                break
+        if best is None or self._dominates(x, best):
+            return x
+        return best
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.index + 1 < self.period:
+            return None
+        return self.candidates[0][1]
+
+
+# ==============================================================================
+# INDICATORS
+# ==============================================================================
+
+class StreamingIndicator(ABC):
+    """Base class of the streaming indicators.
+
+    ``update`` commits a completed candle, ``peek`` evaluates an in-progress
+    candle without committing it and ``value`` is the latest committed value
+    (None until enough candles were seen).
+    """
+
+    value: Any = None
+
+    @abstractmethod
+    def update(self, candle) -> Any:
+        """Commit a completed candle and return the new value."""
+
+    @abstractmethod
+    def peek(self, candle) -> Any:
+        """Value the indicator would have if ``candle`` completed now."""
+
+    @property
+    def ready(self) -> bool:
+        return self.value is not None
+
+
+class SMA(StreamingIndicator):
+    """Simple Moving Average of closes."""
+
+    def __init__(self, period: int = 14):
+        self.mean = _Mean(period)
+
+    def update(self, candle) -> Optional[float]:
+        return self.mean.update(_hlc(candle)[2])
+
+    def peek(self, candle) -> Optional[float]:
+        return self.mean.peek(_hlc(candle)[2])
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.mean.value
+
+
+class EMA(StreamingIndicator):
+    """Exponential Moving Average of closes."""
+
+    def __init__(self, period: int = 14):
+        self.ema = _Smoothed(period, 2.0 / (period + 1))
+
+    def update(self, candle) -> Optional[float]:
+        return self.ema.update(_hlc(candle)[2])
+
+    def peek(self, candle) -> Optional[float]:
+        return self.ema.peek(_hlc(candle)[2])
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.ema.value
+
+
+class RSI(StreamingIndicator):
+    """Relative Strength Index with Wilder smoothing."""
+
+    def __init__(self, period: int = 14):
+        self.gain = _Smoothed(period, 1.0 / period)
+        self.loss = _Smoothed(period, 1.0 / period)
+        self.previous_close: Optional[float] = None
+
+    @staticmethod
+    def _rsi(gain: Optional[float], loss: Optional[float]) -> Optional[float]:
+        if gain is None or loss is None:
+            return None
+        if loss == 0:
+            return 100.0 if gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    def update(self, candle) -> Optional[float]:
+        close = _hlc(candle)[2]
+        if self.previous_close is not None:
+            change = close - self.previous_close
+            self.gain.update(max(change, 0.0))
+            self.loss.update(max(-change, 0.0))
+        self.previous_close = close
+        return self.value
+
+    def peek(self, candle) -> Optional[float]:
+        if self.previous_close is None:
+            return None
+        change = _hlc(candle)[2] - self.previous_close
+        return self._rsi(self.gain.peek(max(change, 0.0)), self.loss.peek(max(-change, 0.0)))
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._rsi(self.gain.value, self.loss.value)
+
+
+class MACD(StreamingIndicator):
+    """MACD line, signal line and histogram as ``(macd, signal, histogram)``."""
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast = _Smoothed(fast_period, 2.0 / (fast_period + 1))
+        self.slow = _Smoothed(slow_period, 2.0 / (slow_period + 1))
+        self.signal = _Smoothed(signal_period, 2.0 / (signal_period + 1))
+        self.value: Optional[Tuple[float, Optional[float], Optional[float]]] = None
+
+    @staticmethod
+    def _combine(macd_line, signal_line):
+        if macd_line is None:
+            return None
+        histogram = macd_line - signal_line if signal_line is not None else None
+        return macd_line, signal_line, histogram
+
+    def update(self, candle):
+        close = _hlc(candle)[2]
+        fast = self.fast.update(close)
+        slow = self.slow.update(close)
+        if fast is None or slow is None:
+            return None
+        macd_line = fast - slow
+        self.value = self._combine(macd_line, self.signal.update(macd_line))
+        return self.value
+
+    def peek(self, candle):
+        close = _hlc(candle)[2]
+        fast = self.fast.peek(close)
+        slow = self.slow.peek(close)
+        if fast is None or slow is None:
+            return None
+        macd_line = fast - slow
+        return self._combine(macd_line, self.signal.peek(macd_line))
+
+
+class BollingerBands(StreamingIndicator):
+    """Bollinger Bands as ``(upper, middle, lower)``."""
+
+    def __init__(self, period: int = 20, std_dev: float = 2.0):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        self.std_dev = std_dev
+        self.window = deque()
+        # Running mean and sum of squared deviations (Welford, sliding form)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._since_resum = 0
+
+    def _bands(self, mean: float, m2: float):
+        std = math.sqrt(max(m2, 0.0) / self.period)
+        return mean + self.std_dev * std, mean, mean - self.std_dev * std
+
+    def update(self, candle):
+        x = _hlc(candle)[2]
+        if len(self.window) < self.period:
+            self.window.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.window)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.window.popleft()
+            self.window.append(x)
+            mean = self.mean + (x - old) / self.period
+            self.m2 += (x - old) * (x - mean + old - self.mean)
+            self.mean = mean
+            self._since_resum += 1
+            if self._since_resum >= self.period:
+                # Recompute from the window once per window to bound rounding drift
+                self.mean = math.fsum(self.window) / self.period
+                self.m2 = math.fsum((v - self.mean) ** 2 for v in self.window)
+                self._since_resum = 0
+        return self.value
+
+    def peek(self, candle):
+        x = _hlc(candle)[2]
+        n = len(self.window)
+        if n == self.period:
+            old = self.window[0]
+            mean = self.mean + (x - old) / self.period
+            return self._bands(mean, self.m2 + (x - old) * (x - mean + old - self.mean))
+        if n == self.period - 1:
+            delta = x - self.mean
+            mean = self.mean + delta / self.period
+            return self._bands(mean, self.m2 + delta * (x - mean))
+        return None
+
+    @property
+    def value(self):
+        if len(self.window) < self.period:
+            return None
+        return self._bands(self.mean, self.m2)
+
+
+class Stochastic(StreamingIndicator):
+    """Slow stochastic oscillator as ``(slow_k, slow_d)``."""
+
+    def __init__(self, k_period: int = 14, d_period: int = 3):
+        self.highest = _Extreme(k_period, maximum=True)
+        self.lowest = _Extreme(k_period, maximum=False)
+        self.slow_k = _Mean(d_period)
+        self.slow_d = _Mean(d_period)
+        self.value: Optional[Tuple[float, Optional[float]]] = None
+
+    @staticmethod
+    def _fast_k(high: Optional[float], low: Optional[float], close: float) -> Optional[float]:
+        if high is None or low is None:
+            return None
+        return 100.0 * (close - low) / (high - low) if high != low else 50.0
+
+    def update(self, candle):
+        high, low, close = _hlc(candle)
+        fast_k = self._fast_k(self.highest.update(high), self.lowest.update(low), close)
+        if fast_k is None:
+            return None
+        slow_k = self.slow_k.update(fast_k)
+        if slow_k is None:
+            return None
+        self.value = (slow_k, self.slow_d.update(slow_k))
+        return self.value
+
+    def peek(self, candle):
+        high, low, close = _hlc(candle)
+        fast_k = self._fast_k(self.highest.peek(high), self.lowest.peek(low), close)
+        if fast_k is None:
+            return None
+        slow_k = self.slow_k.peek(fast_k)
+        if slow_k is None:
+            return None
+        return slow_k, self.slow_d.peek(slow_k)
+
+
+class WilliamsR(StreamingIndicator):
+    """Williams %R."""
+
+    def __init__(self, period: int = 14):
+        self.highest = _Extreme(period, maximum=True)
+        self.lowest = _Extreme(period, maximum=False)
+        self.value: Optional[float] = None
+
+    @staticmethod
+    def _willr(high: Optional[float], low: Optional[float], close: float) -> Optional[float]:
+        if high is None or low is None:
+            return None
+        return -100.0 * (high - close) / (high - low) if high != low else -50.0
+
+    def update(self, candle):
+        high, low, close = _hlc(candle)
+        self.value = self._willr(self.highest.update(high), self.lowest.update(low), close)
+        return self.value
+
+    def peek(self, candle):
+        high, low, close = _hlc(candle)
+        return self._willr(self.highest.peek(high), self.lowest.peek(low), close)
+
+
+class ATR(StreamingIndicator):
+    """Average True Range with Wilder smoothing."""
+
+    def __init__(self, period: int = 14):
+        self.average = _Smoothed(period, 1.0 / period)
+        self.previous_close: Optional[float] = None
+
+    def _true_range(self, high: float, low: float) -> float:
+        return max(high - low, abs(high - self.previous_close), abs(low - self.previous_close))
+
+    def update(self, candle) -> Optional[float]:
+        high, low, close = _hlc(candle)
+        if self.previous_close is not None:
+            self.average.update(self._true_range(high, low))
+        self.previous_close = close
+        return self.value
+
+    def peek(self, candle) -> Optional[float]:
+        if self.previous_close is None:
+            return None
+        high, low, _ = _hlc(candle)
+        return self.average.peek(self._true_range(high, low))
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.average.value
+
+
+# ==============================================================================
+# ENGINE
+# ==============================================================================
+
+class IndicatorEngine:
+    """A set of streaming indicators kept per asset.
+
+    Pass :meth:`on_candle_complete` as the ``on_candle_complete`` callback of an
+    OHLC subscription (one engine per timeframe) and read :meth:`values` or
+    :meth:`provisional` from any thread.
+    """
+
+    def __init__(self):
+        self.specs: Dict[str, Tuple[Callable[..., StreamingIndicator], tuple, dict]] = {}
+        self.indicators: Dict[str, Dict[str, StreamingIndicator]] = {}
+        self.lock = threading.Lock()
+        self.asset_locks: Dict[str, threading.Lock] = {}
+
+    def add(self, name: str, indicator: Callable[..., StreamingIndicator], *args, **kwargs) -> str:
+        """
+        Register an indicator for every asset.
+
+        Args:
+            name: Key of the indicator in values()/provisional()
+            indicator: Indicator class (or factory), e.g. RSI
+            *args, **kwargs: Arguments for the indicator, e.g. its period
+
+        Returns:
+            The indicator name
+        """
+        with self.lock:
+            self.specs[name] = (indicator, args, kwargs)
+            # Assets already tracked start this indicator from scratch
+            for indicators in self.indicators.values():
+                indicators[name] = indicator(*args, **kwargs)
+        return name
+
+    def _asset(self, asset: str):
+        lock = self.asset_locks.get(asset)
+        if lock is None:
+            with self.lock:
+                lock = self.asset_locks.setdefault(asset, threading.Lock())
+                if asset not in self.indicators:
+                    self.indicators[asset] = {
+                        name: factory(*args, **kwargs) for name, (factory, args, kwargs) in self.specs.items()
+                    }
+        return lock, self.indicators[asset]
+
+    def update(self, asset: str, candle) -> Dict[str, Any]:
+        """Commit a completed candle to every indicator of an asset."""
+        lock, indicators = self._asset(asset)
+        with lock:
+            return {name: indicator.update(candle) for name, indicator in indicators.items()}
+
+    def on_candle_complete(self, asset: str, candle):
+        """Callback for CandleAggregator/SubscriptionManager."""
+        self.update(asset, candle)
+
+    def warm_up(self, asset: str, candles: Iterable) -> Dict[str, Any]:
+        """Feed historical candles (dicts, OHLCCandle objects or a DataFrame) in order."""
+        if hasattr(candles, "itertuples"):
+            candles = candles.itertuples(index=False)
+        lock, indicators = self._asset(asset)
+        with lock:
+            for candle in candles:
+                for indicator in indicators.values():
+                    indicator.update(candle)
+            return {name: indicator.value for name, indicator in indicators.items()}
+
+    def values(self, asset: str) -> Dict[str, Any]:
+        """Latest committed value of every indicator of an asset."""
+        lock, indicators = self._asset(asset)
+        with lock:
+            return {name: indicator.value for name, indicator in indicators.items()}
+
+    def provisional(self, asset: str, candle) -> Dict[str, Any]:
+        """Values every indicator would have if ``candle`` (the in-progress candle) closed now."""
+        lock, indicators = self._asset(asset)
+        if candle is None:
+            return self.values(asset)
+        with lock:
+            return {name: indicator.peek(candle) for name, indicator in indicators.items()}
+
+    def reset(self, asset: Optional[str] = None):
+        """Drop the state of one asset, or of every asset."""
+        with self.lock:
+            if asset is None:
+                self.indicators.clear()
+                self.asset_locks.clear()
+            else:
+                self.indicators.pop(asset, None)
+                self.asset_locks.pop(asset, None)
@@ -0,0 +1,261 @@
+"""
+Parallel parameter sweeps of indicator strategies.
+
+The candle arrays of every asset are copied once into shared memory; worker
+processes attach to them by name, so neither DataFrames nor arrays are pickled
+per task. Each task backtests a chunk of parameter combinations on one asset
+and only the statistics rows travel back, which keeps the sweep CPU bound and
+lets it scale with the number of cores.
+
+Example:
+    with ParameterSweep({"EURUSD_otc": load_history("history-EURUSD_otc.csv")}) as sweep:
+        table = sweep.run("sma_cross", {"fast_period": range(3, 20), "slow_period": range(10, 60, 5)},
+                          constraint=lambda p: p["fast_period"] < p["slow_period"])
+"""
+
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from BinaryOptionsTools.indicators import backtest as bt
+
+# Columns kept in shared memory; times are stored as float64, exact for epoch seconds
+SHARED_COLUMNS = ["time", "open", "high", "low", "close"]
+
+# Grid parameters consumed by the settlement instead of the strategy
+SETTLE_PARAMETERS = ("expiry", "payout")
+
+
+def sma_cross_strategy(candles: Dict[str, np.ndarray], fast_period: int = 9, slow_period: int = 14) -> np.ndarray:
+    return bt.sma_cross_signal(candles["close"], fast_period, slow_period)
+
+
+def rsi_strategy(candles: Dict[str, np.ndarray], period: int = 14, oversold: float = 30,
+                 overbought: float = 70) -> np.ndarray:
+    return bt.rsi_signal(candles["close"], period, oversold, overbought)
+
+
+def bollinger_strategy(candles: Dict[str, np.ndarray], period: int = 20, std_dev: float = 2.0) -> np.ndarray:
+    return bt.bollinger_signal(candles["close"], period, std_dev)
+
+
+def macd_strategy(candles: Dict[str, np.ndarray], fast_period: int = 12, slow_period: int = 26,
+                  signal_period: int = 9) -> np.ndarray:
+    return bt.macd_signal(candles["close"], fast_period, slow_period, signal_period)
+
+
+def stochastic_strategy(candles: Dict[str, np.ndarray], k_period: int = 14, d_period: int = 3) -> np.ndarray:
+    return bt.stochastic_signal(candles["high"], candles["low"], candles["close"], k_period, d_period)
+
+
+def williams_r_strategy(candles: Dict[str, np.ndarray], period: int = 14) -> np.ndarray:
+    return bt.williams_r_signal(candles["high"], candles["low"], candles["close"], period)
+
+
+def consensus_strategy(candles: Dict[str, np.ndarray], strong: bool = False) -> np.ndarray:
+    return bt.trading_signal_series(candles, strong)
+
+
+# Strategies by name; any module level ``strategy(candles, **params) -> signal`` works as well
+STRATEGIES: Dict[str, Callable] = {
+    "sma_cross": sma_cross_strategy,
+    "rsi": rsi_strategy,
+    "bollinger": bollinger_strategy,
+    "macd": macd_strategy,
+    "stochastic": stochastic_strategy,
+    "williams_r": williams_r_strategy,
+    "consensus": consensus_strategy,
+}
+
+
+def parameter_grid(grid: Dict[str, Iterable], constraint: Optional[Callable[[Dict], bool]] = None) -> List[Dict]:
+    """Every combination of the grid values, optionally filtered by ``constraint(params)``."""
+    names = list(grid)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*(list(grid[n]) for n in names))]
+    if constraint is not None:
+        combinations = [params for params in combinations if constraint(params)]
+    return combinations
+
+
+# Shared candle blocks attached by the current process: block name -> (SharedMemory, columns).
+# Keyed by block, not asset, since sweeps in one process may hold different candles for an asset
+_attached: Dict[str, tuple] = {}
+
+
+def _open_block(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the block with the resource tracker, which then
+        # unlinks it (or warns) when this worker exits; only the creating process tracks it
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _shared_columns(block: shared_memory.SharedMemory, length: int) -> Dict[str, np.ndarray]:
+    """Read-only column views of a shared candle block."""
+    matrix = np.ndarray((len(SHARED_COLUMNS), length), dtype=np.float64, buffer=block.buf)
+    matrix.flags.writeable = False
+    columns = dict(zip(SHARED_COLUMNS, matrix))
+    columns["time"] = columns["time"].astype(np.int64)
+    return columns
+
+
+def _attach(blocks: Dict[str, tuple]):
+    """Worker initializer: map every asset's shared block."""
+    for name, length in blocks.values():
+        block = _open_block(name)
+        _attached[name] = (block, _shared_columns(block, length))
+
+
+def _evaluate(asset: str, block: str, strategy: Union[str, Callable], combinations: List[Dict], expiry: int,
+              payout: float, stake: float, overlap: bool) -> List[Dict]:
+    """Backtest a chunk of parameter combinations on the candles of one asset's shared block."""
+    candles = _attached[block][1]
+    function = STRATEGIES[strategy] if isinstance(strategy, str) else strategy
+    rows = []
+    for params in combinations:
+        settle_kwargs = {"expiry": expiry, "payout": payout}
+        strategy_params = {}
+        for name, value in params.items():
+            if name in SETTLE_PARAMETERS:
+                settle_kwargs[name] = value
+            else:
+                strategy_params[name] = value
+        row = {"asset": asset, **params}
+        try:
+            signal = function(candles, **strategy_params)
+            trades = bt.settle(candles, signal, stake=stake, overlap=overlap, **settle_kwargs)
+            row.update(bt.summarise(trades, stake))
+        except Exception as e:
+            row["error"] = f"Evaluation failed: {str(e)}"
+        rows.append(row)
+    return rows
+
+
+class ParameterSweep:
+    """Backtests parameter grids over several assets on a pool of worker processes.
+
+    Args:
+        histories: Candle history per asset, anything load_history accepts
+        processes: Worker processes (None for one per CPU, 0 to evaluate in this process)
+    """
+
+    def __init__(self, histories: Dict[str, Union[str, pd.DataFrame]], processes: Optional[int] = None):
+        self.processes = processes
+        self.blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.layout: Dict[str, tuple] = {}  # asset -> (shared block name, candles)
+        try:
+            for asset, history in histories.items():
+                candles = bt.load_history(history)
+                block = shared_memory.SharedMemory(create=True, size=max(len(SHARED_COLUMNS) * len(candles) * 8, 1))
+                self.blocks[asset] = block
+                matrix = np.ndarray((len(SHARED_COLUMNS), len(candles)), dtype=np.float64, buffer=block.buf)
+                for row, column in enumerate(SHARED_COLUMNS):
+                    matrix[row] = candles[column].values
+                self.layout[asset] = (block.name, len(candles))
+        except BaseException:
+            self.close()
+            raise
+        self._pool = None
+
+    def _executor(self):
+        if self._pool is None and self.processes != 0:
+            # Spawned, not forked: the sweep may run next to the websocket and fetch threads,
+            # whose locks a forked worker could inherit while held
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_attach, initargs=(self.layout,))
+        return self._pool
+
+    def run(self, strategy: Union[str, Callable], grid: Dict[str, Iterable], assets: Optional[Iterable[str]] = None,
+            expiry: int = 60, payout: float = 92, stake: float = 1.0, overlap: bool = True,
+            constraint: Optional[Callable[[Dict], bool]] = None, rank_by: str = "expectancy",
+            chunk_size: Optional[int] = None) -> pd.DataFrame:
+        """
+        Backtest every parameter combination on every asset.
+
+        Args:
+            strategy: Name in STRATEGIES, or a module level ``strategy(candles, **params) -> signal``
+            grid: Values per parameter, e.g. {"fast_period": range(3, 20), "slow_period": [20, 30]};
+                "expiry" and "payout" may be swept as well
+            assets: Assets to sweep (default: all)
+            expiry: Trade duration in seconds, unless swept
+            payout: Payout percentage, unless swept
+            stake: Amount of every trade
+            overlap: If False trades never overlap
+            constraint: Keeps only combinations for which ``constraint(params)`` is true
+            rank_by: Statistic the table is sorted by, best first
+            chunk_size: Combinations per task (default: spread evenly, a few tasks per worker)
+
+        Returns:
+            DataFrame with one row per (asset, combination): parameters and backtest statistics
+        """
+        combinations = parameter_grid(grid, constraint)
+        assets = list(self.layout) if assets is None else list(assets)
+        if not chunk_size:
+            workers = self.processes or os.cpu_count() or 1
+            chunk_size = max(1, -(-len(combinations) * len(assets) // (workers * 4)))
+        chunks = [combinations[i:i + chunk_size] for i in range(0, len(combinations), chunk_size)]
+        tasks = [(asset, chunk) for asset in assets for chunk in chunks]
+
+        pool = self._executor()
+        rows: List[Dict] = []
+        if pool is None:
+            for asset in assets:
+                name, length = self.layout[asset]
+                if name not in _attached:
+                    _attached[name] = (self.blocks[asset], _shared_columns(self.blocks[asset], length))
+            for asset, chunk in tasks:
+                rows.extend(_evaluate(asset, self.layout[asset][0], strategy, chunk, expiry, payout, stake, overlap))
+        else:
+            futures = [pool.submit(_evaluate, asset, self.layout[asset][0], strategy, chunk, expiry, payout, stake,
+                                   overlap)
+                       for asset, chunk in tasks]
+            for future in futures:
+                rows.extend(future.result())
+        return rank_results(rows, rank_by)
+
+    def close(self):
+        """Stop the workers and free the shared candle blocks."""
+        if getattr(self, "_pool", None) is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        for block in self.blocks.values():
+            # Views handed out by in-process runs must go before the block can be closed
+            if block.name in _attached and _attached[block.name][0] is block:
+                del _attached[block.name]
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def rank_results(rows: List[Dict], rank_by: str = "expectancy") -> pd.DataFrame:
+    """Sweep rows as a table, best ``rank_by`` first and failed evaluations last."""
+    table = pd.DataFrame(rows)
+    if table.empty or rank_by not in table.columns:
+        return table
+    return table.sort_values(rank_by, ascending=False, na_position="last", kind="stable").reset_index(drop=True)
+
+
+def sweep(histories: Dict[str, Union[str, pd.DataFrame]], strategy: Union[str, Callable], grid: Dict[str, Iterable],
+          processes: Optional[int] = None, **kwargs) -> pd.DataFrame:
+    """One-off sweep: see ParameterSweep.run for the keyword arguments."""
+    with ParameterSweep(histories, processes) as runner:
+        return runner.run(strategy, grid, **kwargs)
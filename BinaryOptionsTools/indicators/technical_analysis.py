@@ -6,7 +6,7 @@ Includes indicators, chart patterns, and price action detection
 import pandas as pd
 import numpy as np
 import time
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Callable, Dict, List, Tuple, Optional, Any
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -28,8 +28,14 @@ except ImportError:
 def _fetch_candles(api, active: str, period: int, num_candles: int) -> pd.DataFrame:
     """Fetch candle data and format for analysis."""
     try:
-        # Try OHLC candles first
-        if hasattr(api, 'get_ohlc_candles'):
+        # Try OHLC candles first, column-wise when the aggregator can hand out arrays
+        if hasattr(api, 'get_ohlc_candles_array'):
+            candles_array = api.get_ohlc_candles_array(active, timeframe_seconds=period, count=num_candles)
+            if candles_array is not None and len(candles_array) > 0:
+                df = pd.DataFrame(candles_array)
+                df['time'] = pd.to_datetime(df['time'], unit='s')
+                return df
+        elif hasattr(api, 'get_ohlc_candles'):
             candles_data = api.get_ohlc_candles(active, timeframe_seconds=period, count=num_candles)
             if candles_data:
                 df = pd.DataFrame(candles_data)
@@ -77,20 +83,103 @@ def _validate_data(df: pd.DataFrame, min_periods: int = 1) -> bool:
     required_columns = ['open', 'high', 'low', 'close']
     return all(col in df.columns for col in required_columns)
 
+class AnalysisContext:
+    """Candles fetched once and shared by every indicator, pattern and price-action function.
+
+    Every ``api``-based function in this module also accepts a context in place of
+    ``api``; it then works on the context's frame instead of fetching candles again.
+
+    Example:
+        ctx = AnalysisContext.fetch(api, "EURUSD_otc", 60, 200)
+        rsi(ctx, period=14)
+        get_chart_patterns(ctx)
+    """
+
+    def __init__(self, df: pd.DataFrame, ticker: str = "EURUSD_otc", timeframe: int = 60):
+        self.df = df
+        self.ticker = ticker
+        self.timeframe = timeframe
+
+    @classmethod
+    def fetch(cls, api, ticker: str = "EURUSD_otc", timeframe: int = 60, num_candles: int = 200) -> "AnalysisContext":
+        """Fetch candles once through ``api`` and wrap them in a context."""
+        return cls(_fetch_candles(api, ticker, timeframe, num_candles), ticker, timeframe)
+
+    def frame(self, num_candles: Optional[int] = None) -> pd.DataFrame:
+        """The latest ``num_candles`` candles of the shared frame."""
+        if num_candles is None or num_candles >= len(self.df):
+            return self.df
+        return self.df.iloc[-num_candles:]
+
+def analysis_context(api, timeframe: int = 60, ticker: str = "EURUSD_otc", num_candles: int = 200) -> AnalysisContext:
+    """Return ``api`` if it already is a context, otherwise fetch candles once into a new one."""
+    if isinstance(api, AnalysisContext):
+        return api
+    return AnalysisContext.fetch(api, ticker, timeframe, num_candles)
+
+def _candles(api, ticker: str, timeframe: int, num_candles: int) -> pd.DataFrame:
+    """Candles from a shared context, or fetched through the api."""
+    if isinstance(api, AnalysisContext):
+        return api.frame(num_candles)
+    return _fetch_candles(api, ticker, timeframe, num_candles)
+
+# ==============================================================================
+# INDICATOR SERIES (pandas formulas, also used by the vectorised backtests)
+# ==============================================================================
+
+def _sma_series(close: pd.Series, period: int) -> pd.Series:
+    return close.rolling(window=period).mean()
+
+def _ema_series(close: pd.Series, period: int) -> pd.Series:
+    return close.ewm(span=period).mean()
+
+def _macd_series(close: pd.Series, fast_period: int, slow_period: int,
+                 signal_period: int) -> Tuple[pd.Series, pd.Series]:
+    """MACD line and its signal line."""
+    macd_line = close.ewm(span=fast_period).mean() - close.ewm(span=slow_period).mean()
+    return macd_line, macd_line.ewm(span=signal_period).mean()
+
+def _bollinger_series(close: pd.Series, period: int, std_dev: float) -> Tuple[pd.Series, pd.Series, pd.Series]:
+    """Upper, middle and lower band."""
+    middle = close.rolling(window=period).mean()
+    std = close.rolling(window=period).std()
+    return middle + (std * std_dev), middle, middle - (std * std_dev)
+
+def _rsi_series(close: pd.Series, period: int) -> pd.Series:
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+def _stochastic_series(high: pd.Series, low: pd.Series, close: pd.Series, k_period: int,
+                       d_period: int) -> Tuple[pd.Series, pd.Series]:
+    """Slow %K and %D."""
+    lowest_low = low.rolling(window=k_period).min()
+    highest_high = high.rolling(window=k_period).max()
+    k_percent = 100 * ((close - lowest_low) / (highest_high - lowest_low))
+    slowk = k_percent.rolling(window=d_period).mean()
+    return slowk, slowk.rolling(window=d_period).mean()
+
+def _williams_r_series(high: pd.Series, low: pd.Series, close: pd.Series, period: int) -> pd.Series:
+    highest_high = high.rolling(window=period).max()
+    lowest_low = low.rolling(window=period).min()
+    return -100 * ((highest_high - close) / (highest_high - lowest_low))
+
 # ==============================================================================
 # TREND INDICATORS
 # ==============================================================================
 
 def sma(api, timeframe: int = 60, ticker: str = "EURUSD_otc", period: int = 14, num_candles: int = 100) -> Dict:
     """Simple Moving Average"""
-    df = _fetch_candles(api, ticker, timeframe, num_candles)
+    df = _candles(api, ticker, timeframe, num_candles)
     if not _validate_data(df, period):
         return {"error": "Insufficient data"}
     
     if TALIB_AVAILABLE:
         sma_values = talib.SMA(df['close'].values, timeperiod=period)
     else:
-        sma_values = df['close'].rolling(window=period).mean()
+        sma_values = _sma_series(df['close'], period).values
     
     return {
         "indicator": "SMA",
@@ -102,14 +191,14 @@ def sma(api, timeframe: int = 60, ticker: str = "EURUSD_otc", period: int = 14,
 
 def ema(api, timeframe: int = 60, ticker: str = "EURUSD_otc", period: int = 14, num_candles: int = 100) -> Dict:
     """Exponential Moving Average"""
-    df = _fetch_candles(api, ticker, timeframe, num_candles)
+    df = _candles(api, ticker, timeframe, num_candles)
     if not _validate_data(df, period):
         return {"error": "Insufficient data"}
     
     if TALIB_AVAILABLE:
         ema_values = talib.EMA(df['close'].values, timeperiod=period)
     else:
-        ema_values = df['close'].ewm(span=period).mean()
+        ema_values = _ema_series(df['close'], period).values
     
     return {
         "indicator": "EMA",
@@ -123,7 +212,7 @@ def macd(api, timeframe: int = 60, ticker: str = "EURUSD_otc",
          fast_period: int = 12, slow_period: int = 26, signal_period: int = 9, 
          num_candles: int = 100) -> Dict:
     """MACD (Moving Average Convergence Divergence)"""
-    df = _fetch_candles(api, ticker, timeframe, num_candles)
+    df = _candles(api, ticker, timeframe, num_candles)
     if not _validate_data(df, slow_period + signal_period):
         return {"error": "Insufficient data"}
     
@@ -133,11 +222,10 @@ def macd(api, timeframe: int = 60, ticker: str = "EURUSD_otc",
             slowperiod=slow_period, signalperiod=signal_period
         )
     else:
-        exp1 = df['close'].ewm(span=fast_period).mean()
-        exp2 = df['close'].ewm(span=slow_period).mean()
-        macd_line = exp1 - exp2
-        macd_signal = macd_line.ewm(span=signal_period).mean()
-        macd_histogram = macd_line - macd_signal
+        macd_line, macd_signal = _macd_series(df['close'], fast_period, slow_period, signal_period)
+        macd_histogram = (macd_line - macd_signal).values
+        macd_line = macd_line.values
+        macd_signal = macd_signal.values
     
     # Generate signal
     current_macd = macd_line[-1]
@@ -165,7 +253,7 @@ def macd(api, timeframe: int = 60, ticker: str = "EURUSD_otc",
 def bollinger_bands(api, timeframe: int = 60, ticker: str = "EURUSD_otc", 
                    period: int = 20, std_dev: float = 2.0, num_candles: int = 100) -> Dict:
     """Bollinger Bands"""
-    df = _fetch_candles(api, ticker, timeframe, num_candles)
+    df = _candles(api, ticker, timeframe, num_candles)
     if not _validate_data(df, period):
         return {"error": "Insufficient data"}
     
@@ -174,10 +262,7 @@ def bollinger_bands(api, timeframe: int = 60, ticker: str = "EURUSD_otc",
             df['close'].values, timeperiod=period, nbdevup=std_dev, nbdevdn=std_dev
         )
     else:
-        middle = df['close'].rolling(window=period).mean()
-        std = df['close'].rolling(window=period).std()
-        upper = middle + (std * std_dev)
-        lower = middle - (std * std_dev)
+        upper, middle, lower = (band.values for band in _bollinger_series(df['close'], period, std_dev))
     
     current_price = df['close'].iloc[-1]
     upper_val = upper[-1]
@@ -214,18 +299,14 @@ def bollinger_bands(api, timeframe: int = 60, ticker: str = "EURUSD_otc",
 
 def rsi(api, timeframe: int = 60, ticker: str = "EURUSD_otc", period: int = 14, num_candles: int = 100) -> Dict:
     """Relative Strength Index"""
-    df = _fetch_candles(api, ticker, timeframe, num_candles)
+    df = _candles(api, ticker, timeframe, num_candles)
     if not _validate_data(df, period + 1):
         return {"error": "Insufficient data"}
     
     if TALIB_AVAILABLE:
         rsi_values = talib.RSI(df['close'].values, timeperiod=period)
     else:
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi_values = 100 - (100 / (1 + rs))
+        rsi_values = _rsi_series(df['close'], period).values
     
     current_rsi = rsi_values[-1] if not pd.isna(rsi_values[-1]) else None
     
@@ -250,7 +331,7 @@ def rsi(api, timeframe: int = 60, ticker: str = "EURUSD_otc", period: int = 14,
 def stochastic(api, timeframe: int = 60, ticker: str = "EURUSD_otc", 
                k_period: int = 14, d_period: int = 3, num_candles: int = 100) -> Dict:
     """Stochastic Oscillator"""
-    df = _fetch_candles(api, ticker, timeframe, num_candles)
+    df = _candles(api, ticker, timeframe, num_candles)
     if not _validate_data(df, k_period + d_period):
         return {"error": "Insufficient data"}
     
@@ -260,11 +341,8 @@ def stochastic(api, timeframe: int = 60, ticker: str = "EURUSD_otc",
             fastk_period=k_period, slowk_period=d_period, slowd_period=d_period
         )
     else:
-        lowest_low = df['low'].rolling(window=k_period).min()
-        highest_high = df['high'].rolling(window=k_period).max()
-        k_percent = 100 * ((df['close'] - lowest_low) / (highest_high - lowest_low))
-        slowk = k_percent.rolling(window=d_period).mean()
-        slowd = slowk.rolling(window=d_period).mean()
+        slowk, slowd = (line.values for line in _stochastic_series(df['high'], df['low'], df['close'],
+                                                                   k_period, d_period))
     
     current_k = slowk[-1] if not pd.isna(slowk[-1]) else None
     current_d = slowd[-1] if not pd.isna(slowd[-1]) else None
@@ -294,16 +372,14 @@ def stochastic(api, timeframe: int = 60, ticker: str = "EURUSD_otc",
 
 def williams_r(api, timeframe: int = 60, ticker: str = "EURUSD_otc", period: int = 14, num_candles: int = 100) -> Dict:
     """Williams %R"""
-    df = _fetch_candles(api, ticker, timeframe, num_candles)
+    df = _candles(api, ticker, timeframe, num_candles)
     if not _validate_data(df, period):
         return {"error": "Insufficient data"}
     
     if TALIB_AVAILABLE:
         willr = talib.WILLR(df['high'].values, df['low'].values, df['close'].values, timeperiod=period)
     else:
-        highest_high = df['high'].rolling(window=period).max()
-        lowest_low = df['low'].rolling(window=period).min()
-        willr = -100 * ((highest_high - df['close']) / (highest_high - lowest_low))
+        willr = _williams_r_series(df['high'], df['low'], df['close'], period).values
     
     current_willr = willr[-1] if not pd.isna(willr[-1]) else None
     
@@ -331,7 +407,7 @@ def williams_r(api, timeframe: int = 60, ticker: str = "EURUSD_otc", period: int
 
 def atr(api, timeframe: int = 60, ticker: str = "EURUSD_otc", period: int = 14, num_candles: int = 100) -> Dict:
     """Average True Range"""
-    df = _fetch_candles(api, ticker, timeframe, num_candles)
+    df = _candles(api, ticker, timeframe, num_candles)
     if not _validate_data(df, period + 1):
         return {"error": "Insufficient data"}
     
@@ -342,7 +418,7 @@ def atr(api, timeframe: int = 60, ticker: str = "EURUSD_otc", period: int = 14,
         high_close = np.abs(df['high'] - df['close'].shift())
         low_close = np.abs(df['low'] - df['close'].shift())
         true_range = np.maximum(high_low, np.maximum(high_close, low_close))
-        atr_values = true_range.rolling(window=period).mean()
+        atr_values = true_range.rolling(window=period).mean().values
     
     current_atr = atr_values[-1] if not pd.isna(atr_values[-1]) else None
     
@@ -369,10 +445,13 @@ def atr(api, timeframe: int = 60, ticker: str = "EURUSD_otc", period: int = 14,
 
 def volume_sma(api, timeframe: int = 60, ticker: str = "EURUSD_otc", period: int = 20, num_candles: int = 100) -> Dict:
     """Volume Simple Moving Average"""
-    df = _fetch_candles(api, ticker, timeframe, num_candles)
+    df = _candles(api, ticker, timeframe, num_candles)
     if not _validate_data(df, period):
         return {"error": "Insufficient data"}
     
+    # The frame may be shared through an AnalysisContext, so work on a copy
+    df = df.copy()
+    
     # For forex/crypto, use tick count as volume proxy
     if 'volume' not in df.columns or df['volume'].sum() == 0:
         if 'tick_count' in df.columns:
@@ -406,7 +485,7 @@ def volume_sma(api, timeframe: int = 60, ticker: str = "EURUSD_otc", period: int
 def support_resistance_levels(api, timeframe: int = 60, ticker: str = "EURUSD_otc", 
                              num_candles: int = 200, lookback: int = 20) -> Dict:
     """Calculate Support and Resistance levels"""
-    df = _fetch_candles(api, ticker, timeframe, num_candles)
+    df = _candles(api, ticker, timeframe, num_candles)
     if not _validate_data(df, lookback * 2):
         return {"error": "Insufficient data"}
     
@@ -414,42 +493,23 @@ def support_resistance_levels(api, timeframe: int = 60, ticker: str = "EURUSD_ot
     lows = df['low'].values
     closes = df['close'].values
     
-    # Find local maxima and minima
-    resistance_levels = []
-    support_levels = []
+    # Find local maxima and minima (highest/lowest within +-lookback candles)
+    resistance_levels = highs[_find_extrema(highs, order=lookback, peaks=True)]
+    support_levels = lows[_find_extrema(lows, order=lookback, peaks=False)]
     
-    for i in range(lookback, len(highs) - lookback):
-        # Check for resistance (local maximum)
-        if highs[i] == max(highs[i-lookback:i+lookback+1]):
-            resistance_levels.append(highs[i])
-        
-        # Check for support (local minimum)
-        if lows[i] == min(lows[i-lookback:i+lookback+1]):
-            support_levels.append(lows[i])
-    
-    # Remove duplicate levels (within 0.1% of each other)
-    def remove_close_levels(levels, tolerance=0.001):
-        if not levels:
-            return []
-        levels = sorted(set(levels))
-        filtered = [levels[0]]
-        for level in levels[1:]:
-            if abs(level - filtered[-1]) / filtered[-1] > tolerance:
-                filtered.append(level)
-        return filtered
-    
-    resistance_levels = remove_close_levels(resistance_levels)
-    support_levels = remove_close_levels(support_levels)
-    
-    # Get current price and nearest levels
+    # Remove duplicate levels (within 0.1% of each other), levels stay sorted
+    resistance_levels = _merge_close_levels(resistance_levels)
+    support_levels = _merge_close_levels(support_levels)
+    
+    # Get current price and nearest levels by binary search on the sorted levels
     current_price = closes[-1]
-    nearest_resistance = min([r for r in resistance_levels if r > current_price], default=None)
-    nearest_support = max([s for s in support_levels if s < current_price], default=None)
+    nearest_resistance, _ = _nearest_levels(resistance_levels, current_price)
+    _, nearest_support = _nearest_levels(support_levels, current_price)
     
     return {
         "indicator": "Support/Resistance",
-        "resistance_levels": resistance_levels[-5:],  # Last 5 levels
-        "support_levels": support_levels[-5:],  # Last 5 levels
+        "resistance_levels": resistance_levels[-5:].tolist(),  # Last 5 levels
+        "support_levels": support_levels[-5:].tolist(),  # Last 5 levels
         "nearest_resistance": nearest_resistance,
         "nearest_support": nearest_support,
         "current_price": float(current_price),
@@ -461,19 +521,20 @@ def support_resistance_levels(api, timeframe: int = 60, ticker: str = "EURUSD_ot
 # ==============================================================================
 
 def get_all_indicators(api, timeframe: int = 60, ticker: str = "EURUSD_otc", num_candles: int = 200) -> Dict:
-    """Get all indicators at once"""
+    """Get all indicators at once (candles are fetched a single time)"""
     indicators = {}
     
     try:
-        indicators['sma_20'] = sma(api, timeframe, ticker, 20, num_candles)
-        indicators['ema_20'] = ema(api, timeframe, ticker, 20, num_candles)
-        indicators['rsi'] = rsi(api, timeframe, ticker, 14, num_candles)
-        indicators['macd'] = macd(api, timeframe, ticker, 12, 26, 9, num_candles)
-        indicators['bollinger_bands'] = bollinger_bands(api, timeframe, ticker, 20, 2.0, num_candles)
-        indicators['stochastic'] = stochastic(api, timeframe, ticker, 14, 3, num_candles)
-        indicators['williams_r'] = williams_r(api, timeframe, ticker, 14, num_candles)
-        indicators['atr'] = atr(api, timeframe, ticker, 14, num_candles)
-        indicators['support_resistance'] = support_resistance_levels(api, timeframe, ticker, num_candles, 20)
+        ctx = analysis_context(api, timeframe, ticker, num_candles)
+        indicators['sma_20'] = sma(ctx, timeframe, ticker, 20, num_candles)
+        indicators['ema_20'] = ema(ctx, timeframe, ticker, 20, num_candles)
+        indicators['rsi'] = rsi(ctx, timeframe, ticker, 14, num_candles)
+        indicators['macd'] = macd(ctx, timeframe, ticker, 12, 26, 9, num_candles)
+        indicators['bollinger_bands'] = bollinger_bands(ctx, timeframe, ticker, 20, 2.0, num_candles)
+        indicators['stochastic'] = stochastic(ctx, timeframe, ticker, 14, 3, num_candles)
+        indicators['williams_r'] = williams_r(ctx, timeframe, ticker, 14, num_candles)
+        indicators['atr'] = atr(ctx, timeframe, ticker, 14, num_candles)
+        indicators['support_resistance'] = support_resistance_levels(ctx, timeframe, ticker, num_candles, 20)
         
     except Exception as e:
         indicators['error'] = f"Error calculating indicators: {str(e)}"
@@ -483,7 +544,10 @@ def get_all_indicators(api, timeframe: int = 60, ticker: str = "EURUSD_otc", num
 def get_trading_signals(api, timeframe: int = 60, ticker: str = "EURUSD_otc", num_candles: int = 200) -> Dict:
     """Get consolidated trading signals from all indicators"""
     indicators = get_all_indicators(api, timeframe, ticker, num_candles)
-    
+    return _summarise_indicator_signals(indicators)
+
+def _summarise_indicator_signals(indicators: Dict) -> Dict:
+    """Consolidate the signals of get_all_indicators output"""
     if 'error' in indicators:
         return indicators
     
@@ -541,17 +605,21 @@ def detect_chart_patterns(df: pd.DataFrame) -> Dict:
     low = df['low'].values
     close = df['close'].values
     
+    # Swing points shared by the peak/trough based patterns
+    peaks = _find_extrema(high, order=5, peaks=True)
+    troughs = _find_extrema(low, order=5, peaks=False)
+    
     # Double Top Pattern
-    patterns['double_top'] = _detect_double_top(high, close)
+    patterns['double_top'] = _detect_double_top(high, close, peaks)
     
     # Double Bottom Pattern
-    patterns['double_bottom'] = _detect_double_bottom(low, close)
+    patterns['double_bottom'] = _detect_double_bottom(low, close, troughs)
     
     # Head and Shoulders
-    patterns['head_and_shoulders'] = _detect_head_and_shoulders(high, close)
+    patterns['head_and_shoulders'] = _detect_head_and_shoulders(high, close, peaks)
     
     # Inverse Head and Shoulders
-    patterns['inverse_head_and_shoulders'] = _detect_inverse_head_and_shoulders(low, close)
+    patterns['inverse_head_and_shoulders'] = _detect_inverse_head_and_shoulders(low, close, troughs)
     
     # Triangle Patterns
     patterns['ascending_triangle'] = _detect_ascending_triangle(high, low)
@@ -571,167 +639,268 @@ def detect_chart_patterns(df: pd.DataFrame) -> Dict:
     
     return patterns
 
-def _detect_double_top(high: np.ndarray, close: np.ndarray) -> Dict:
+def _find_extrema(values: np.ndarray, order: int = 5, peaks: bool = True, strict: bool = False) -> np.ndarray:
+    """Indices of swing highs (or lows): points not exceeded by the ``order`` values on either side
+
+    With ``strict`` the point has to be strictly above (below) all of them.
+    """
+    values = np.asarray(values, dtype=float)
+    if order < 1 or len(values) < 2 * order + 1:
+        return np.empty(0, dtype=np.intp)
+    windows = np.lib.stride_tricks.sliding_window_view(values, 2 * order + 1)
+    center = values[order:len(values) - order]
+    if strict:
+        # Compare against the neighbours only, leaving the point itself out of the window
+        reduce = np.maximum if peaks else np.minimum
+        neighbours = reduce(reduce.reduce(windows[:, :order], axis=1), reduce.reduce(windows[:, order + 1:], axis=1))
+        is_extremum = center > neighbours if peaks else center < neighbours
+    elif peaks:
+        is_extremum = center >= windows.max(axis=1)
+    else:
+        is_extremum = center <= windows.min(axis=1)
+    return np.flatnonzero(is_extremum) + order
+
+def _pair_range_extremes(values: np.ndarray, idx: np.ndarray, peaks: bool) -> np.ndarray:
+    """For every pair a < b of swing points, the min (max for troughs) of values[idx[a]:idx[b]]"""
+    reduce = np.minimum if peaks else np.maximum
+    # Extreme of each stretch between consecutive swing points, then running extreme over stretches
+    segments = reduce.reduceat(values, idx)[:-1]
+    k = len(idx)
+    rows = np.arange(k)[:, None]
+    cols = np.arange(k - 1)[None, :]
+    fill = np.inf if peaks else -np.inf
+    table = np.where(cols >= rows, segments[None, :], fill)
+    table = reduce.accumulate(table, axis=1)
+    # Pair (a, b) spans stretches a .. b-1
+    return np.concatenate([np.full((k, 1), fill), table], axis=1)
+
+def _merge_close_levels(levels: np.ndarray, tolerance: float = 0.001) -> np.ndarray:
+    """Sorted unique levels, dropping those within ``tolerance`` of the previous kept level"""
+    levels = np.unique(levels)
+    if len(levels) < 2:
+        return levels
+    # Greedy over the sorted levels; only gaps that are all wider than the tolerance can skip the loop
+    if np.all(np.abs(np.diff(levels)) / levels[:-1] > tolerance):
+        return levels
+    filtered = [levels[0]]
+    for level in levels[1:]:
+        if abs(level - filtered[-1]) / filtered[-1] > tolerance:
+            filtered.append(level)
+    return np.array(filtered)
+
+def _nearest_levels(levels: np.ndarray, price: float) -> Tuple[Optional[float], Optional[float]]:
+    """Nearest level above and below ``price`` in sorted ``levels`` (None when there is none)"""
+    above = np.searchsorted(levels, price, side='right')
+    below = np.searchsorted(levels, price, side='left') - 1
+    return (
+        float(levels[above]) if above < len(levels) else None,
+        float(levels[below]) if below >= 0 else None
+    )
+
+def _count_touches(values: np.ndarray, levels: np.ndarray, tolerance: float = 0.005) -> np.ndarray:
+    """Number of ``values`` with ``|value - level| / level < tolerance`` for each level.
+
+    The values matching a level form one run of the sorted values, so both ends
+    are found by a binary search that evaluates that exact expression.
+    """
+    ordered = np.sort(values)
+    levels = np.asarray(levels, dtype=float)
+
+    def first(outside: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+        # First position where ``outside`` holds; it is false then true along ``ordered``
+        lo = np.zeros(len(levels), dtype=np.intp)
+        hi = np.full(len(levels), len(ordered), dtype=np.intp)
+        while (lo < hi).any():
+            mid = (lo + hi) // 2
+            hit = outside(ordered[np.minimum(mid, len(ordered) - 1)]) | (lo >= hi)
+            hi = np.where(hit, np.minimum(mid, hi), hi)
+            lo = np.where(hit, lo, mid + 1)
+        return lo
+
+    def near(v: np.ndarray) -> np.ndarray:
+        return np.abs(v - levels) / levels < tolerance
+
+    start = first(lambda v: (v >= levels) | near(v))
+    stop = first(lambda v: (v > levels) & ~near(v))
+    return stop - start
+
+def _pivot_levels(values: np.ndarray, pivots: np.ndarray, current_price: float) -> List[Dict]:
+    """Levels of the pivots tested at least twice (within 0.5%), in pivot order"""
+    levels = values[pivots]
+    touches = _count_touches(values, levels)
+    tested = touches >= 2
+    distances = np.abs(levels - current_price) / current_price
+    return [
+        {
+            "level": level,
+            "strength": strength,
+            "distance_from_current": distance,
+            "index": index
+        }
+        for level, strength, distance, index in zip(
+            levels[tested].tolist(), touches[tested].tolist(), distances[tested].tolist(), pivots[tested].tolist()
+        )
+    ]
+
+def _detect_double_top(high: np.ndarray, close: np.ndarray, peaks: Optional[np.ndarray] = None) -> Dict:
     """Detect double top pattern"""
     if len(high) < 20:
         return {"detected": False, "confidence": 0}
     
     # Find peaks
-    peaks = []
-    for i in range(5, len(high) - 5):
-        if all(high[i] >= high[i-j] for j in range(1, 6)) and all(high[i] >= high[i+j] for j in range(1, 6)):
-            peaks.append((i, high[i]))
+    if peaks is None:
+        peaks = _find_extrema(high, order=5, peaks=True)
     
     if len(peaks) < 2:
         return {"detected": False, "confidence": 0}
     
-    # Look for two similar peaks
-    for i in range(len(peaks) - 1):
-        for j in range(i + 1, len(peaks)):
-            peak1_idx, peak1_val = peaks[i]
-            peak2_idx, peak2_val = peaks[j]
-            
-            # Check if peaks are similar in height (within 2%)
-            if abs(peak1_val - peak2_val) / max(peak1_val, peak2_val) <= 0.02:
-                # Check if there's a valley between peaks
-                valley_low = min(high[peak1_idx:peak2_idx])
-                if valley_low < min(peak1_val, peak2_val) * 0.98:
-                    # Check if price declined after second peak
-                    if len(close) > peak2_idx + 3 and close[-1] < peak2_val * 0.99:
-                        confidence = 1 - abs(peak1_val - peak2_val) / max(peak1_val, peak2_val)
-                        return {
-                            "detected": True,
-                            "confidence": confidence,
-                            "signal": "SELL",
-                            "peak1_idx": int(peak1_idx),
-                            "peak2_idx": int(peak2_idx),
-                            "peak1_val": float(peak1_val),
-                            "peak2_val": float(peak2_val)
-                        }
+    # Score every pair of peaks at once, the earliest matching pair wins
+    values = high[peaks]
+    v1 = values[:, None]
+    v2 = values[None, :]
+    highest = np.maximum(v1, v2)
+    difference = np.abs(v1 - v2) / highest
+    valley_low = _pair_range_extremes(high, peaks, peaks=True)
+    # Peaks similar in height (within 2%), a valley between them and price declining after the second
+    matches = (
+        np.triu(np.ones((len(peaks), len(peaks)), dtype=bool), 1)
+        & (difference <= 0.02)
+        & (valley_low < np.minimum(v1, v2) * 0.98)
+        & (len(close) > peaks[None, :] + 3)
+        & (close[-1] < v2 * 0.99)
+    )
+    found = np.argwhere(matches)
+    if len(found):
+        i, j = found[0]
+        return {
+            "detected": True,
+            "confidence": float(1 - difference[i, j]),
+            "signal": "SELL",
+            "peak1_idx": int(peaks[i]),
+            "peak2_idx": int(peaks[j]),
+            "peak1_val": float(values[i]),
+            "peak2_val": float(values[j])
+        }
     
     return {"detected": False, "confidence": 0}
 
-def _detect_double_bottom(low: np.ndarray, close: np.ndarray) -> Dict:
+def _detect_double_bottom(low: np.ndarray, close: np.ndarray, troughs: Optional[np.ndarray] = None) -> Dict:
     """Detect double bottom pattern"""
     if len(low) < 20:
         return {"detected": False, "confidence": 0}
     
     # Find troughs
-    troughs = []
-    for i in range(5, len(low) - 5):
-        if all(low[i] <= low[i-j] for j in range(1, 6)) and all(low[i] <= low[i+j] for j in range(1, 6)):
-            troughs.append((i, low[i]))
+    if troughs is None:
+        troughs = _find_extrema(low, order=5, peaks=False)
     
     if len(troughs) < 2:
         return {"detected": False, "confidence": 0}
     
-    # Look for two similar troughs
-    for i in range(len(troughs) - 1):
-        for j in range(i + 1, len(troughs)):
-            trough1_idx, trough1_val = troughs[i]
-            trough2_idx, trough2_val = troughs[j]
-            
-            # Check if troughs are similar in depth (within 2%)
-            if abs(trough1_val - trough2_val) / max(trough1_val, trough2_val) <= 0.02:
-                # Check if there's a peak between troughs
-                peak_high = max(low[trough1_idx:trough2_idx])
-                if peak_high > max(trough1_val, trough2_val) * 1.02:
-                    # Check if price rose after second trough
-                    if len(close) > trough2_idx + 3 and close[-1] > trough2_val * 1.01:
-                        confidence = 1 - abs(trough1_val - trough2_val) / max(trough1_val, trough2_val)
-                        return {
-                            "detected": True,
-                            "confidence": confidence,
-                            "signal": "BUY",
-                            "trough1_idx": int(trough1_idx),
-                            "trough2_idx": int(trough2_idx),
-                            "trough1_val": float(trough1_val),
-                            "trough2_val": float(trough2_val)
-                        }
+    # Score every pair of troughs at once, the earliest matching pair wins
+    values = low[troughs]
+    v1 = values[:, None]
+    v2 = values[None, :]
+    highest = np.maximum(v1, v2)
+    difference = np.abs(v1 - v2) / highest
+    peak_high = _pair_range_extremes(low, troughs, peaks=False)
+    # Troughs similar in depth (within 2%), a peak between them and price rising after the second
+    matches = (
+        np.triu(np.ones((len(troughs), len(troughs)), dtype=bool), 1)
+        & (difference <= 0.02)
+        & (peak_high > highest * 1.02)
+        & (len(close) > troughs[None, :] + 3)
+        & (close[-1] > v2 * 1.01)
+    )
+    found = np.argwhere(matches)
+    if len(found):
+        i, j = found[0]
+        return {
+            "detected": True,
+            "confidence": float(1 - difference[i, j]),
+            "signal": "BUY",
+            "trough1_idx": int(troughs[i]),
+            "trough2_idx": int(troughs[j]),
+            "trough1_val": float(values[i]),
+            "trough2_val": float(values[j])
+        }
     
     return {"detected": False, "confidence": 0}
 
-def _detect_head_and_shoulders(high: np.ndarray, close: np.ndarray) -> Dict:
+def _detect_head_and_shoulders(high: np.ndarray, close: np.ndarray, peaks: Optional[np.ndarray] = None) -> Dict:
     """Detect head and shoulders pattern"""
     if len(high) < 30:
         return {"detected": False, "confidence": 0}
     
     # Find three consecutive peaks
-    peaks = []
-    for i in range(5, len(high) - 5):
-        if all(high[i] >= high[i-j] for j in range(1, 6)) and all(high[i] >= high[i+j] for j in range(1, 6)):
-            peaks.append((i, high[i]))
+    if peaks is None:
+        peaks = _find_extrema(high, order=5, peaks=True)
     
     if len(peaks) < 3:
         return {"detected": False, "confidence": 0}
     
-    # Look for head and shoulders pattern
-    for i in range(len(peaks) - 2):
-        left_shoulder = peaks[i]
-        head = peaks[i + 1]
-        right_shoulder = peaks[i + 2]
-        
-        # Head should be highest
-        if head[1] > left_shoulder[1] and head[1] > right_shoulder[1]:
-            # Shoulders should be similar height
-            shoulder_diff = abs(left_shoulder[1] - right_shoulder[1]) / max(left_shoulder[1], right_shoulder[1])
-            if shoulder_diff <= 0.03:
-                # Check neckline break
-                if len(close) > right_shoulder[0] + 3:
-                    neckline = min(left_shoulder[1], right_shoulder[1])
-                    if close[-1] < neckline * 0.99:
-                        confidence = 1 - shoulder_diff
-                        return {
-                            "detected": True,
-                            "confidence": confidence,
-                            "signal": "SELL",
-                            "left_shoulder": {"idx": int(left_shoulder[0]), "val": float(left_shoulder[1])},
-                            "head": {"idx": int(head[0]), "val": float(head[1])},
-                            "right_shoulder": {"idx": int(right_shoulder[0]), "val": float(right_shoulder[1])},
-                            "neckline": float(neckline)
-                        }
+    # Every run of three consecutive peaks as (left shoulder, head, right shoulder)
+    values = high[peaks]
+    left, head, right = values[:-2], values[1:-1], values[2:]
+    shoulder_diff = np.abs(left - right) / np.maximum(left, right)
+    neckline = np.minimum(left, right)
+    # Head highest, shoulders of similar height and the neckline broken
+    matches = (
+        (head > left) & (head > right)
+        & (shoulder_diff <= 0.03)
+        & (len(close) > peaks[2:] + 3)
+        & (close[-1] < neckline * 0.99)
+    )
+    found = np.flatnonzero(matches)
+    if len(found):
+        i = found[0]
+        return {
+            "detected": True,
+            "confidence": float(1 - shoulder_diff[i]),
+            "signal": "SELL",
+            "left_shoulder": {"idx": int(peaks[i]), "val": float(left[i])},
+            "head": {"idx": int(peaks[i + 1]), "val": float(head[i])},
+            "right_shoulder": {"idx": int(peaks[i + 2]), "val": float(right[i])},
+            "neckline": float(neckline[i])
+        }
     
     return {"detected": False, "confidence": 0}
 
-def _detect_inverse_head_and_shoulders(low: np.ndarray, close: np.ndarray) -> Dict:
+def _detect_inverse_head_and_shoulders(low: np.ndarray, close: np.ndarray, troughs: Optional[np.ndarray] = None) -> Dict:
     """Detect inverse head and shoulders pattern"""
     if len(low) < 30:
         return {"detected": False, "confidence": 0}
     
     # Find three consecutive troughs
-    troughs = []
-    for i in range(5, len(low) - 5):
-        if all(low[i] <= low[i-j] for j in range(1, 6)) and all(low[i] <= low[i+j] for j in range(1, 6)):
-            troughs.append((i, low[i]))
+    if troughs is None:
+        troughs = _find_extrema(low, order=5, peaks=False)
     
     if len(troughs) < 3:
         return {"detected": False, "confidence": 0}
     
-    # Look for inverse head and shoulders pattern
-    for i in range(len(troughs) - 2):
-        left_shoulder = troughs[i]
-        head = troughs[i + 1]
-        right_shoulder = troughs[i + 2]
-        
-        # Head should be lowest
-        if head[1] < left_shoulder[1] and head[1] < right_shoulder[1]:
-            # Shoulders should be similar depth
-            shoulder_diff = abs(left_shoulder[1] - right_shoulder[1]) / max(left_shoulder[1], right_shoulder[1])
-            if shoulder_diff <= 0.03:
-                # Check neckline break
-                if len(close) > right_shoulder[0] + 3:
-                    neckline = max(left_shoulder[1], right_shoulder[1])
-                    if close[-1] > neckline * 1.01:
-                        confidence = 1 - shoulder_diff
-                        return {
-                            "detected": True,
-                            "confidence": confidence,
-                            "signal": "BUY",
-                            "left_shoulder": {"idx": int(left_shoulder[0]), "val": float(left_shoulder[1])},
-                            "head": {"idx": int(head[0]), "val": float(head[1])},
-                            "right_shoulder": {"idx": int(right_shoulder[0]), "val": float(right_shoulder[1])},
-                            "neckline": float(neckline)
-                        }
+    # Every run of three consecutive troughs as (left shoulder, head, right shoulder)
+    values = low[troughs]
+    left, head, right = values[:-2], values[1:-1], values[2:]
+    shoulder_diff = np.abs(left - right) / np.maximum(left, right)
+    neckline = np.maximum(left, right)
+    # Head lowest, shoulders of similar depth and the neckline broken
+    matches = (
+        (head < left) & (head < right)
+        & (shoulder_diff <= 0.03)
+        & (len(close) > troughs[2:] + 3)
+        & (close[-1] > neckline * 1.01)
+    )
+    found = np.flatnonzero(matches)
+    if len(found):
+        i = found[0]
+        return {
+            "detected": True,
+            "confidence": float(1 - shoulder_diff[i]),
+            "signal": "BUY",
+            "left_shoulder": {"idx": int(troughs[i]), "val": float(left[i])},
+            "head": {"idx": int(troughs[i + 1]), "val": float(head[i])},
+            "right_shoulder": {"idx": int(troughs[i + 2]), "val": float(right[i])},
+            "neckline": float(neckline[i])
+        }
     
     return {"detected": False, "confidence": 0}
 
@@ -1144,45 +1313,9 @@ def _detect_support_resistance_levels(high: np.ndarray, low: np.ndarray, close:
     
     current_price = close[-1]
     
-    # Find pivot points
-    resistance_levels = []
-    support_levels = []
-    
-    # Look for pivot highs (resistance)
-    for i in range(2, len(recent_high) - 2):
-        if (recent_high[i] > recent_high[i-1] and recent_high[i] > recent_high[i-2] and
-            recent_high[i] > recent_high[i+1] and recent_high[i] > recent_high[i+2]):
-            
-            # Count how many times this level was tested
-            level = recent_high[i]
-            touches = np.sum(np.abs(recent_high - level) / level < 0.005)  # Within 0.5%
-            
-            if touches >= 2:
-                distance_from_current = abs(level - current_price) / current_price
-                resistance_levels.append({
-                    "level": float(level),
-                    "strength": int(touches),
-                    "distance_from_current": float(distance_from_current),
-                    "index": int(i)
-                })
-    
-    # Look for pivot lows (support)
-    for i in range(2, len(recent_low) - 2):
-        if (recent_low[i] < recent_low[i-1] and recent_low[i] < recent_low[i-2] and
-            recent_low[i] < recent_low[i+1] and recent_low[i] < recent_low[i+2]):
-            
-            # Count how many times this level was tested
-            level = recent_low[i]
-            touches = np.sum(np.abs(recent_low - level) / level < 0.005)  # Within 0.5%
-            
-            if touches >= 2:
-                distance_from_current = abs(level - current_price) / current_price
-                support_levels.append({
-                    "level": float(level),
-                    "strength": int(touches),
-                    "distance_from_current": float(distance_from_current),
-                    "index": int(i)
-                })
+    # Pivot highs (resistance) and pivot lows (support): beyond the 2 candles on either side
+    resistance_levels = _pivot_levels(recent_high, _find_extrema(recent_high, order=2, peaks=True, strict=True), current_price)
+    support_levels = _pivot_levels(recent_low, _find_extrema(recent_low, order=2, peaks=False, strict=True), current_price)
     
     # Sort by strength and proximity
     resistance_levels.sort(key=lambda x: (x['strength'], -x['distance_from_current']), reverse=True)
@@ -1407,7 +1540,7 @@ def _detect_rejection_patterns(open_price: np.ndarray, high: np.ndarray, low: np
 def get_chart_patterns(api, timeframe: int = 60, ticker: str = "EURUSD_otc", num_candles: int = 100) -> Dict:
     """Get chart pattern analysis for a trading pair"""
     try:
-        df = _fetch_candles(api, ticker, timeframe, num_candles)
+        df = _candles(api, ticker, timeframe, num_candles)
         if df.empty:
             return {"error": "No candle data available"}
         
@@ -1460,7 +1593,7 @@ def get_chart_patterns(api, timeframe: int = 60, ticker: str = "EURUSD_otc", num
 def get_price_action_analysis(api, timeframe: int = 60, ticker: str = "EURUSD_otc", num_candles: int = 100) -> Dict:
     """Get comprehensive price action analysis"""
     try:
-        df = _fetch_candles(api, ticker, timeframe, num_candles)
+        df = _candles(api, ticker, timeframe, num_candles)
         if df.empty:
             return {"error": "No candle data available"}
         
@@ -1547,11 +1680,12 @@ def get_price_action_analysis(api, timeframe: int = 60, ticker: str = "EURUSD_ot
 def get_comprehensive_analysis(api, timeframe: int = 60, ticker: str = "EURUSD_otc", num_candles: int = 200) -> Dict:
     """Get comprehensive technical analysis including indicators, patterns, and price action"""
     try:
-        # Get all individual analyses
-        indicators = get_all_indicators(api, timeframe, ticker, num_candles)
-        chart_patterns = get_chart_patterns(api, timeframe, ticker, num_candles)
-        price_action = get_price_action_analysis(api, timeframe, ticker, num_candles)
-        trading_signals = get_trading_signals(api, timeframe, ticker, num_candles)
+        # Fetch candles once and run every analysis on the shared frame
+        ctx = analysis_context(api, timeframe, ticker, num_candles)
+        indicators = get_all_indicators(ctx, timeframe, ticker, num_candles)
+        chart_patterns = get_chart_patterns(ctx, timeframe, ticker, num_candles)
+        price_action = get_price_action_analysis(ctx, timeframe, ticker, num_candles)
+        trading_signals = _summarise_indicator_signals(indicators)
         
         # Combine all signals
         all_buy_signals = 0
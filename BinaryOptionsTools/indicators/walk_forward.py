@@ -0,0 +1,257 @@
+"""
+Walk-forward optimisation of indicator strategies.
+
+Train and test windows slide across a candle history: on every train window the
+best parameters of a grid are picked, then judged on the test window that
+follows. Signals and settled outcomes are computed once per parameter set over
+the whole history and cached, and window statistics come from prefix sums, so
+overlapping train windows never recompute indicators. A full walk costs about
+one backtest per parameter set, however many windows there are.
+
+Example:
+    walk = WalkForward("history-AUDNZD_otc.csv", expiry=60, payout=92)
+    report = walk.run("sma_cross", {"fast_period": range(3, 15), "slow_period": [20, 30, 50]},
+                      train=5000, test=500)
+    print(report["stats"])
+"""
+
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from BinaryOptionsTools.indicators import backtest as bt
+from BinaryOptionsTools.indicators.sweep import SETTLE_PARAMETERS, STRATEGIES, parameter_grid
+
+# Statistics a train window can be ranked by
+RANK_STATISTICS = ("expectancy", "total_profit", "win_rate")
+
+
+def _key(value):
+    """Hashable form of a parameter value (lists and tuples of indicator names)."""
+    return tuple(value) if isinstance(value, (list, tuple)) else value
+
+
+class WalkForward:
+    """Walk-forward runs over one candle history, sharing their cached signals and outcomes.
+
+    Args:
+        candles: Candle history, anything load_history accepts
+        expiry: Trade duration in seconds, unless swept in the grid
+        payout: Payout percentage of a win, unless swept in the grid
+        stake: Amount of every trade
+    """
+
+    def __init__(self, candles: Union[str, pd.DataFrame], expiry: int = 60, payout: float = 92,
+                 stake: float = 1.0):
+        self.candles = bt.load_history(candles)
+        self.columns = {name: self.candles[name].values for name in self.candles.columns}
+        self.expiry = expiry
+        self.payout = payout
+        self.stake = stake
+        # (strategy, params) -> signal; (signal key, expiry, payout) -> prefix sums of the outcomes
+        self.signals: Dict[tuple, np.ndarray] = {}
+        self.outcomes: Dict[tuple, Dict[str, np.ndarray]] = {}
+        self.exit_limits: Dict[int, np.ndarray] = {}
+        self.indicator_columns: Optional[Dict[str, np.ndarray]] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _signal_key(strategy, params: Dict[str, Any]) -> tuple:
+        return strategy, tuple(sorted((name, _key(value)) for name, value in params.items()))
+
+    def signal(self, strategy: Union[str, Callable], params: Dict[str, Any]) -> np.ndarray:
+        """
+        Signal series of a strategy, computed once per parameter set.
+
+        "consensus" votes with get_trading_signals' indicator columns, which are computed once
+        for the history; its parameters are ``strong`` and ``members`` (indicator names, default
+        bt.VOTING_INDICATORS).
+        Other strategies are looked up in sweep.STRATEGIES or called directly.
+        """
+        key = self._signal_key(strategy, params)
+        cached = self.signals.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+
+        if strategy == "consensus":
+            if self.indicator_columns is None:
+                self.indicator_columns = bt.indicator_signals(self.columns)
+            members = params.get("members") or bt.VOTING_INDICATORS
+            signal = bt.consensus_signal([self.indicator_columns[m] for m in members], params.get("strong", False))
+        else:
+            function = STRATEGIES[strategy] if isinstance(strategy, str) else strategy
+            signal = function(self.columns, **params)
+        self.signals[key] = signal
+        return signal
+
+    def _exit_limit(self, expiry: int) -> np.ndarray:
+        """For each candle, the first candle index whose trades settle at or after it (by prefix)."""
+        limit = self.exit_limits.get(expiry)
+        if limit is None:
+            exits = bt.expiry_index(self.columns["time"], expiry)
+            limit = np.where(exits < 0, len(exits), exits)
+            self.exit_limits[expiry] = limit
+        return limit
+
+    def _outcomes(self, strategy, params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Prefix sums of trades, wins, losses and profit of a parameter set, per entry candle."""
+        settle_kwargs = {"expiry": self.expiry, "payout": self.payout}
+        strategy_params = {}
+        for name, value in params.items():
+            if name in SETTLE_PARAMETERS:
+                settle_kwargs[name] = value
+            else:
+                strategy_params[name] = value
+        signal = self.signal(strategy, strategy_params)
+        key = (self._signal_key(strategy, strategy_params), settle_kwargs["expiry"], settle_kwargs["payout"])
+        cached = self.outcomes.get(key)
+        if cached is not None:
+            return cached
+
+        result, profit, exits = bt.candle_outcomes(self.columns, signal, stake=self.stake, **settle_kwargs)
+        traded = (signal != 0) & (exits >= 0)
+
+        def prefix(values):
+            return np.concatenate([[0], np.cumsum(values)])
+
+        cached = {
+            "signal": signal,
+            "result": result,
+            "profit": profit,
+            "traded": traded,
+            "limit": self._exit_limit(settle_kwargs["expiry"]),
+            "trades": prefix(traded.astype(np.int64)),
+            "wins": prefix(result > 0),
+            "losses": prefix(result < 0),
+            "profit_sum": prefix(profit),
+        }
+        self.outcomes[key] = cached
+        return cached
+
+    @staticmethod
+    def _window_ends(outcomes: Dict[str, np.ndarray], ends: np.ndarray) -> np.ndarray:
+        """End (exclusive) of the entries of each window whose trades also settle inside it."""
+        return np.minimum(ends, np.searchsorted(outcomes["limit"], ends, side="left"))
+
+    def _window_statistic(self, outcomes, starts: np.ndarray, ends: np.ndarray, statistic: str,
+                          min_trades: int) -> np.ndarray:
+        stops = np.maximum(self._window_ends(outcomes, ends), starts)
+        trades = outcomes["trades"][stops] - outcomes["trades"][starts]
+        profit = outcomes["profit_sum"][stops] - outcomes["profit_sum"][starts]
+        if statistic == "expectancy":
+            value = profit / np.maximum(trades, 1)
+        elif statistic == "total_profit":
+            value = profit
+        elif statistic == "win_rate":
+            wins = outcomes["wins"][stops] - outcomes["wins"][starts]
+            losses = outcomes["losses"][stops] - outcomes["losses"][starts]
+            value = wins / np.maximum(wins + losses, 1)
+        else:
+            raise ValueError(f"Unknown statistic: {statistic} (use one of {RANK_STATISTICS})")
+        return np.where(trades >= max(min_trades, 1), value, -np.inf)
+
+    def _window_trades(self, outcomes, start: int, end: int) -> pd.DataFrame:
+        stop = max(int(self._window_ends(outcomes, np.array([end]))[0]), start)
+        entries = start + np.flatnonzero(outcomes["traded"][start:stop])
+        return pd.DataFrame({
+            "entry_time": self.columns["time"][entries],
+            "result": outcomes["result"][entries],
+            "profit": outcomes["profit"][entries],
+        })
+
+    def run(self, strategy: Union[str, Callable], grid: Dict[str, Iterable], train: int, test: int,
+            step: Optional[int] = None, rank_by: str = "expectancy", min_trades: int = 30,
+            constraint: Optional[Callable[[Dict], bool]] = None) -> Dict:
+        """
+        Walk train/test windows across the history.
+
+        Args:
+            strategy: "consensus", a name in sweep.STRATEGIES or a ``strategy(candles, **params)``
+            grid: Values per parameter; "expiry" and "payout" may be swept as well
+            train: Candles per train window
+            test: Candles per test window, directly after its train window
+            step: Candles the windows move by (default: ``test``, so test windows tile the history)
+            rank_by: Train statistic the parameters are picked by (see RANK_STATISTICS)
+            min_trades: Parameter sets with fewer train trades are not picked
+            constraint: Keeps only combinations for which ``constraint(params)`` is true
+
+        Returns:
+            {"windows": DataFrame with the picked parameters and the train/test statistics of each
+            window, "stats": out-of-sample statistics and their stability across windows}
+        """
+        step = step or test
+        if step < test:
+            raise ValueError("step must be at least test, out-of-sample windows may not overlap")
+        combinations = parameter_grid(grid, constraint)
+        if not combinations:
+            raise ValueError("The parameter grid is empty")
+        length = len(self.candles)
+        starts = np.arange(0, length - train - test + 1, step)
+        if not len(starts):
+            raise ValueError(f"{length} candles are not enough for a {train} + {test} candle window")
+        test_starts = starts + train
+
+        # One row of train statistics per parameter set, one column per window
+        scores = np.vstack([
+            self._window_statistic(self._outcomes(strategy, params), starts, test_starts, rank_by, min_trades)
+            for params in combinations
+        ])
+        # Prefix sums differ in the last bits; equal statistics go to the first parameter set
+        picked = np.argmax(np.round(scores, 10), axis=0)
+
+        rows: List[Dict] = []
+        oos_trades = []
+        for window, (start, test_start) in enumerate(zip(starts, test_starts)):
+            row = {
+                "window": window,
+                "train_start": int(self.columns["time"][start]),
+                "test_start": int(self.columns["time"][test_start]),
+                "test_end": int(self.columns["time"][test_start + test - 1]),
+            }
+            if not np.isfinite(scores[picked[window], window]):
+                row["error"] = "No parameter set reached min_trades"
+                rows.append(row)
+                continue
+            params = combinations[picked[window]]
+            outcomes = self._outcomes(strategy, params)
+            train_stats = bt.summarise(self._window_trades(outcomes, start, test_start), self.stake)
+            trades = self._window_trades(outcomes, test_start, test_start + test)
+            test_stats = bt.summarise(trades, self.stake)
+            oos_trades.append(trades)
+            row.update(params=params, **{f"train_{name}": train_stats[name] for name in
+                                         ("trades", "win_rate", "expectancy")},
+                       **{f"test_{name}": test_stats[name] for name in
+                          ("trades", "win_rate", "expectancy", "total_profit", "max_drawdown")})
+            rows.append(row)
+
+        windows = pd.DataFrame(rows)
+        return {"windows": windows, "stats": self._stability(windows, oos_trades)}
+
+    def _stability(self, windows: pd.DataFrame, oos_trades: List[pd.DataFrame]) -> Dict:
+        """Out-of-sample statistics over all test windows and how steady they were."""
+        trades = pd.concat(oos_trades, ignore_index=True) if oos_trades else \
+            pd.DataFrame({"result": np.zeros(0, np.int8), "profit": np.zeros(0)})
+        stats = {f"oos_{name}": value for name, value in bt.summarise(trades, self.stake).items()}
+        done = windows.dropna(subset=["test_expectancy"]) if "test_expectancy" in windows else windows.iloc[:0]
+        params = [repr(sorted(p.items())) for p in done["params"]] if len(done) else []
+        picks = Counter(params)
+        train_mean = float(done["train_expectancy"].mean()) if len(done) else 0.0
+        stats.update(
+            windows=len(windows),
+            evaluated_windows=len(done),
+            positive_windows=float((done["test_expectancy"] > 0).mean()) if len(done) else 0.0,
+            test_expectancy_std=float(done["test_expectancy"].std(ddof=0)) if len(done) else 0.0,
+            # Share of the in-sample edge that survived out of sample
+            efficiency=float(done["test_expectancy"].mean()) / train_mean if train_mean > 0 else None,
+            parameter_changes=sum(a != b for a, b in zip(params[:-1], params[1:])),
+            most_picked_share=picks.most_common(1)[0][1] / len(done) if len(done) else 0.0,
+            cached_signals=len(self.signals),
+            cache_hits=self.hits,
+            cache_misses=self.misses,
+        )
+        return stats
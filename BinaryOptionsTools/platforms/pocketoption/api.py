@@ -41,6 +41,10 @@ from BinaryOptionsTools.platforms.pocketoption.ws.channels.buyv3 import Buyv3
 from BinaryOptionsTools.platforms.pocketoption.ws.objects.timesync import TimeSync
 # from pocketoptionapi.ws.objects.profile import Profile
 from BinaryOptionsTools.platforms.pocketoption.ws.objects.candles import Candles
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.pending import PendingRequests
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.history import HistoryRequests
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.deals import Deals
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.ticks import Ticks
 # from pocketoptionapi.ws.objects.listinfodata import ListInfoData
 # from pocketoptionapi.ws.objects.betinfo import Game_betinfo_data
 import BinaryOptionsTools.platforms.pocketoption.global_value as global_value
@@ -107,7 +111,6 @@ class PocketOptionAPI(object):  # pylint: disable=too-many-instance-attributes
     live_deal_data = nested_dict(3, deque)
 
     subscribe_commission_changed_data = nested_dict(2, dict)
-    real_time_candles = nested_dict(3, dict)
     real_time_candles_maxdict_table = nested_dict(2, dict)
     candle_generated_check = nested_dict(2, dict)
     candle_generated_all_size_check = nested_dict(1, dict)
@@ -135,9 +138,13 @@ class PocketOptionAPI(object):  # pylint: disable=too-many-instance-attributes
 
     # ------------------
 
-    def __init__(self, proxies=None, logger: logging.Logger | None = None):
+    def __init__(self, proxies=None, logger: logging.Logger | None = None, tick_capacity=10000, url=None,
+                 recorder=None):
         """
         :param dict proxies: (optional) The http request proxies.
+        :param int tick_capacity: (optional) Real-time ticks kept per asset.
+        :param str url: (optional) Websocket server to use instead of the PocketOption regions.
+        :param recorder: (optional) FrameRecorder or file path recording every websocket frame.
         """
         self.websocket_client = None
         self.websocket_thread = None
@@ -151,8 +158,16 @@ class PocketOptionAPI(object):  # pylint: disable=too-many-instance-attributes
         # If it is false, the last failed
         # If it is true, the last buy order was successful
         self.buy_successful = None
+        # openOrder requests waiting for their acknowledgement, keyed by requestId
+        self.pending_orders = PendingRequests("pendingOrders")
+        # loadHistoryPeriod requests waiting for their candles, keyed by request index
+        self.history_requests = HistoryRequests()
+        # Settled deals pushed by successcloseOrder/updateClosedDeals, keyed by deal id
+        self.deals = Deals()
+        # Bounded per-asset tick history fed by updateStream
+        self.ticks = Ticks(tick_capacity)
         self.loop = asyncio.get_event_loop()
-        self.websocket_client = WebsocketClient(self)
+        self.websocket_client = WebsocketClient(self, url, recorder)
         self.logger = logger or logging.getLogger("PocketOption")
     @property
     def websocket(self):
@@ -172,6 +187,8 @@ class PocketOptionAPI(object):  # pylint: disable=too-many-instance-attributes
         :param request_id:
         :param str name: The websocket request name.
         :param dict msg: The websocket request msg.
+
+        :returns: A :class:`concurrent.futures.Future` resolved once the frame is written.
         """
 
         logger = logging.getLogger(__name__)
@@ -183,22 +200,20 @@ class PocketOptionAPI(object):  # pylint: disable=too-many-instance-attributes
         #     pass
         global_value.ssl_Mutual_exclusion_write = True
 
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-        # Ejecutar la corutina connect dentro del bucle de eventos del nuevo hilo
-        loop.run_until_complete(self.websocket.send_message(data))
+        # Hand the frame to the websocket I/O loop instead of spinning up a loop per message
+        future = self.websocket.submit_message(data)
 
         logger.debug(data)
         global_value.ssl_Mutual_exclusion_write = False
+        return future
 
     def start_websocket(self):
         global_value.websocket_is_connected = False
         global_value.check_websocket_if_error = False
         global_value.websocket_error_reason = None
 
-        # Obtener o crear un nuevo bucle de eventos para este hilo
-        loop = asyncio.new_event_loop()
+        # The websocket client owns the I/O loop; this thread drives it
+        loop = self.websocket.loop
         asyncio.set_event_loop(loop)
 
         # Ejecutar la corutina connect dentro del bucle de eventos del nuevo hilo
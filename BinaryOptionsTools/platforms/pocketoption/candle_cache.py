@@ -0,0 +1,131 @@
+"""
+In-process cache for historical candles (Synchronous version).
+Identical history requests made by different indicators or strategies are
+served from memory, and concurrent identical requests share one download.
+"""
+
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def _copy(df):
+    """Callers may modify the frame they get, the cached one must stay intact."""
+    return df.copy() if df is not None else None
+
+
+class CandleCache:
+    """LRU cache of candle DataFrames with a time to live and request coalescing."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_factor: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Memory budget of the cached frames, least recently used ones are evicted first
+            ttl_factor: Entries live ``ttl_factor`` times the ttl given when they were stored
+            clock: Monotonic time source in seconds
+        """
+        self.max_bytes = max_bytes
+        self.ttl_factor = ttl_factor
+        self.clock = clock
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, nbytes, df)
+        self.in_flight: Dict[Hashable, concurrent.futures.Future] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.lock = threading.Lock()
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any], ttl: float):
+        """
+        Return the cached frame for ``key``, or fetch it once for every concurrent caller.
+
+        Args:
+            key: Request identity, e.g. (asset, period, end_time, count, count_request)
+            fetch: Downloads the frame when it is not cached
+            ttl: Seconds the result stays valid, e.g. the candle period
+
+        Returns:
+            A copy of the frame
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return _copy(entry[2])
+                self._drop(key)
+
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[key] = concurrent.futures.Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return _copy(future.result())
+
+        try:
+            df = fetch()
+        except BaseException as e:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self.lock:
+            self.in_flight.pop(key, None)
+            # Empty frames are failed downloads, the next caller should try again
+            if df is not None and not df.empty:
+                self._store(key, df, ttl)
+        future.set_result(df)
+        return _copy(df)
+
+    def _store(self, key: Hashable, df, ttl: float):
+        nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        self._drop(key)
+        self.entries[key] = (self.clock() + ttl * self.ttl_factor, nbytes, df)
+        self.total_bytes += nbytes
+        while self.total_bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._drop(oldest)
+
+    def _drop(self, key: Hashable):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def invalidate(self, asset: Optional[str] = None):
+        """Drop the entries of one asset (first key element), or every entry."""
+        with self.lock:
+            if asset is None:
+                self.entries.clear()
+                self.total_bytes = 0
+                return
+            for key in [k for k in self.entries if isinstance(k, tuple) and k and k[0] == asset]:
+                self._drop(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get statistics about the cache."""
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "in_flight": len(self.in_flight),
+            }
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,429 @@
+"""
+Local candle warehouse (Synchronous version).
+Candles are persisted per asset and period as append-only column files that are
+memory-mapped for reading, so range queries return NumPy views without parsing
+or copying. Rewrites go to a new version directory that a pointer file switches
+to atomically. Parquet snapshots are available when pyarrow is installed.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import shutil
+import threading
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .ohlc_aggregator import CANDLE_DTYPE
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# One file per column, all of them little-endian so a warehouse can be copied between machines
+COLUMNS = CANDLE_DTYPE.names
+COLUMN_DTYPES = {name: CANDLE_DTYPE[name].newbyteorder("<") for name in COLUMNS}
+# File in a series directory naming the version directory holding its column files
+CURRENT = "CURRENT"
+
+
+def frame_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Columns of a candle DataFrame in warehouse layout.
+
+    Accepts the get_candles format (DatetimeIndex named time) as well as frames with a
+    ``time`` column of datetimes or epoch seconds, e.g. the bundled history CSVs.
+    Missing volume/tick_count columns are filled with zeros.
+    """
+    if "time" in df.columns:
+        times = df["time"]
+    elif isinstance(df.index, pd.DatetimeIndex):
+        times = df.index.to_series()
+    else:
+        raise ValueError("Candle frame needs a time column or a DatetimeIndex")
+    if not pd.api.types.is_numeric_dtype(times):
+        times = pd.to_datetime(times)
+        if times.dt.tz is not None:
+            times = times.dt.tz_convert(None)
+        times = (times - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    columns = {"time": np.asarray(times, dtype=np.int64)}
+    for name in COLUMNS[1:]:
+        if name in df.columns:
+            columns[name] = np.asarray(df[name], dtype=COLUMN_DTYPES[name])
+        else:
+            columns[name] = np.zeros(len(df), dtype=COLUMN_DTYPES[name])
+    return columns
+
+
+def _sorted_unique(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Sort rows by time; of rows with the same time the last one wins."""
+    times = columns["time"]
+    order = np.argsort(times, kind="stable")
+    times = times[order]
+    keep = np.ones(len(times), dtype=bool)
+    keep[:-1] = times[1:] != times[:-1]
+    rows = order[keep]
+    return {name: np.ascontiguousarray(columns[name][rows], dtype=COLUMN_DTYPES[name]) for name in COLUMNS}
+
+
+class CandleWarehouse:
+    """Persistent candle history per (asset, period) in memory-mapped column files."""
+
+    def __init__(self, root: str):
+        """
+        Open (or create) a warehouse.
+
+        Args:
+            root: Directory holding one ``<asset>/<period>/`` folder per series, with the
+                column files in the version directory named by its CURRENT file
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.lock = threading.Lock()
+        # Held by writers and while a series is (re)mapped, so readers never see half a rewrite
+        self.series_locks: Dict[tuple, threading.RLock] = defaultdict(threading.RLock)
+        # (asset, period) -> (version and file signature, mapped columns)
+        self.maps: Dict[tuple, tuple] = {}
+        # Candles waiting for the background writer, see submit()
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    def _dir(self, asset: str, period: int) -> str:
+        if not asset or os.sep in asset or (os.altsep and os.altsep in asset) or asset in (".", ".."):
+            raise ValueError(f"Invalid asset name: {asset!r}")
+        return os.path.join(self.root, asset, str(int(period)))
+
+    def _series_lock(self, key: tuple) -> threading.RLock:
+        with self.lock:
+            return self.series_locks[key]
+
+    @staticmethod
+    def _version(directory: str) -> Optional[str]:
+        try:
+            with open(os.path.join(directory, CURRENT)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _signature(self, directory: str) -> Optional[tuple]:
+        """(version, (inode, size) of every column file) of a series, None if nothing is stored."""
+        version = self._version(directory)
+        while version is not None:
+            try:
+                stats = [os.stat(os.path.join(directory, version, name + ".bin")) for name in COLUMNS]
+                return version, tuple((s.st_ino, s.st_size) for s in stats)
+            except FileNotFoundError:
+                # Replaced by a rewrite in the meantime: follow the pointer again
+                latest = self._version(directory)
+                if latest == version:
+                    return None
+                version = latest
+        return None
+
+    def _columns(self, asset: str, period: int) -> Dict[str, np.ndarray]:
+        """Read-only mapped columns of a series, remapped only when its files changed."""
+        key = (asset, int(period))
+        directory = self._dir(asset, period)
+        with self._series_lock(key):
+            signature = self._signature(directory)
+            cached = self.maps.get(key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+            columns = {}
+            if signature is not None:
+                # A torn append may leave some columns longer than others, only whole rows count
+                version, stats = signature
+                length = min(size // COLUMN_DTYPES[name].itemsize for name, (_, size) in zip(COLUMNS, stats))
+                for name in COLUMNS:
+                    if length:
+                        mapped = np.memmap(os.path.join(directory, version, name + ".bin"), dtype=COLUMN_DTYPES[name],
+                                           mode="r", shape=(length,))
+                        columns[name] = mapped.view(np.ndarray)
+                    else:
+                        columns[name] = np.empty(0, dtype=COLUMN_DTYPES[name])
+            else:
+                columns = {name: np.empty(0, dtype=COLUMN_DTYPES[name]) for name in COLUMNS}
+            self.maps[key] = (signature, columns)
+            return columns
+
+    def write(self, asset: str, period: int, columns: Dict[str, Any], append_only: bool = False) -> int:
+        """
+        Merge candles into a series; for candles with the same time the new values win.
+
+        Candles later than the stored ones, or repeating the stored tail unchanged, are
+        appended. Anything else (revised or older candles) rewrites the series into a new
+        version directory that replaces the old one, so arrays handed out earlier stay valid.
+
+        Args:
+            asset: Asset symbol
+            period: Candle period in seconds
+            columns: Column arrays, at least ``time`` (epoch seconds) and open/high/low/close
+            append_only: Keep only candles later than the stored ones, stored candles always win
+
+        Returns:
+            Number of candles stored in the series
+        """
+        new = {name: np.asarray(columns[name]) if name in columns
+               else np.zeros(len(columns["time"]), dtype=COLUMN_DTYPES[name]) for name in COLUMNS}
+        if not len(new["time"]):
+            return len(self._columns(asset, period)["time"])
+        new = _sorted_unique(new)
+
+        key = (asset, int(period))
+        directory = self._dir(asset, period)
+        with self._series_lock(key):
+            os.makedirs(directory, exist_ok=True)
+            stored = self._columns(asset, period)
+            signature = self.maps[key][0]
+            length = len(stored["time"])
+            if append_only and length:
+                later = new["time"] > stored["time"][-1]
+                if not later.any():
+                    return length
+                new = {name: new[name][later] for name in COLUMNS}
+            whole_rows = signature is not None and all(
+                size == length * COLUMN_DTYPES[name].itemsize for name, (_, size) in zip(COLUMNS, signature[1]))
+
+            pos = int(np.searchsorted(stored["time"], new["time"][0]))
+            repeated = length - pos
+            if whole_rows and repeated <= len(new["time"]) and all(
+                    np.array_equal(stored[name][pos:], new[name][:repeated]) for name in COLUMNS):
+                self._append(os.path.join(directory, signature[0]), {name: new[name][repeated:] for name in COLUMNS})
+            else:
+                merged = _sorted_unique({name: np.concatenate([stored[name], new[name]]) for name in COLUMNS})
+                stored = None
+                self._rewrite(key, directory, merged)
+            return len(self._columns(asset, period)["time"])
+
+    def _append(self, directory: str, columns: Dict[str, np.ndarray]):
+        if not len(columns["time"]):
+            return
+        for name in COLUMNS:
+            with open(os.path.join(directory, name + ".bin"), "ab") as f:
+                f.write(columns[name].tobytes())
+
+    def _rewrite(self, key: tuple, directory: str, columns: Dict[str, np.ndarray]):
+        """Write a series to a new version directory, then switch CURRENT to it with one rename."""
+        version = f"v{uuid.uuid4().hex}"
+        os.makedirs(os.path.join(directory, version))
+        for name in COLUMNS:
+            with open(os.path.join(directory, version, name + ".bin"), "wb") as f:
+                f.write(columns[name].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        pointer = os.path.join(directory, f"{CURRENT}.{version}.tmp")
+        with open(pointer, "w") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        # Mapped files cannot be removed on Windows, the cached maps go before the old version does
+        self.maps.pop(key, None)
+        os.replace(pointer, os.path.join(directory, CURRENT))
+        # Older versions and leftovers of interrupted rewrites; on Windows views handed out
+        # earlier may still hold some of them, those are removed by a later rewrite
+        for entry in os.listdir(directory):
+            path = os.path.join(directory, entry)
+            if entry.startswith("v") and entry != version and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif entry.startswith(CURRENT + ".") and entry.endswith(".tmp"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def store_frame(self, asset: str, period: int, df: pd.DataFrame) -> int:
+        """Store a candle DataFrame, see frame_columns for the accepted layouts."""
+        if df is None or df.empty:
+            return len(self._columns(asset, period)["time"])
+        return self.write(asset, period, frame_columns(df))
+
+    def store_candles(self, asset: str, period: int, candles: List[Any], append_only: bool = False) -> int:
+        """Store OHLCCandle objects or candle dictionaries (``time`` or ``timestamp`` key), see write."""
+        rows = []
+        for candle in candles:
+            if not isinstance(candle, dict):
+                candle = candle.to_dict()
+            rows.append((candle.get("time", candle.get("timestamp")), candle["open"], candle["high"],
+                         candle["low"], candle["close"], candle.get("volume", 0), candle.get("tick_count", 0)))
+        if not rows:
+            return len(self._columns(asset, period)["time"])
+        array = np.array(rows, dtype=CANDLE_DTYPE)
+        return self.write(asset, period, {name: array[name] for name in COLUMNS}, append_only)
+
+    def import_csv(self, path: str, asset: str, period: Optional[int] = None) -> int:
+        """
+        Store a candle CSV such as the bundled ``history-<asset>.csv`` files.
+
+        Args:
+            path: CSV with a time column and open/high/low/close columns
+            asset: Asset symbol to store the candles under
+            period: Candle period in seconds, inferred from the most common time step if omitted
+        """
+        columns = frame_columns(pd.read_csv(path))
+        if period is None:
+            steps = np.diff(np.unique(columns["time"]))
+            if not len(steps):
+                raise ValueError(f"Cannot infer the candle period of {path}")
+            values, counts = np.unique(steps, return_counts=True)
+            period = int(values[np.argmax(counts)])
+        return self.write(asset, period, columns)
+
+    def query(self, asset: str, period: int, start: Optional[int] = None, end: Optional[int] = None,
+              columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Candles with ``start <= time <= end`` as read-only views of the mapped files.
+
+        Args:
+            asset: Asset symbol
+            period: Candle period in seconds
+            start: First epoch second, from the beginning if omitted
+            end: Last epoch second, up to the end if omitted
+            columns: Columns to return (default: all)
+
+        Returns:
+            Dictionary of column name to array; the arrays share memory with the files
+        """
+        stored = self._columns(asset, period)
+        times = stored["time"]
+        lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, side="right"))
+        return {name: stored[name][lo:hi] for name in (columns or COLUMNS)}
+
+    def to_frame(self, asset: str, period: int, start: Optional[int] = None,
+                 end: Optional[int] = None) -> pd.DataFrame:
+        """Candles of query() in the get_candles DataFrame format (copies the data)."""
+        data = self.query(asset, period, start, end)
+        df = pd.DataFrame({name: data[name] for name in COLUMNS[1:]},
+                          index=pd.DatetimeIndex(pd.to_datetime(data["time"], unit="s"), name="time"))
+        return df
+
+    def info(self, asset: str, period: int) -> Dict[str, Any]:
+        """Size and time range of a series."""
+        times = self._columns(asset, period)["time"]
+        return {
+            "asset": asset,
+            "period": int(period),
+            "candles": len(times),
+            "first": int(times[0]) if len(times) else None,
+            "last": int(times[-1]) if len(times) else None,
+        }
+
+    def series(self) -> List[tuple]:
+        """All stored (asset, period) pairs."""
+        found = []
+        for asset in sorted(os.listdir(self.root)):
+            asset_dir = os.path.join(self.root, asset)
+            if not os.path.isdir(asset_dir):
+                continue
+            for period in os.listdir(asset_dir):
+                if period.isdigit() and self._signature(os.path.join(asset_dir, period)) is not None:
+                    found.append((asset, int(period)))
+        return sorted(found)
+
+    def submit(self, asset: str, period: int, candles: List[Any], append_only: bool = False):
+        """
+        Queue candles for store_candles on a background writer thread.
+
+        The caller only pays for a queue put, so this is safe to call from the websocket
+        receive thread; flush() waits until everything submitted is stored.
+        """
+        if self._writer is None:
+            with self.lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._run_writer, name="candle-warehouse", daemon=True)
+                    self._writer.start()
+                    atexit.register(self.close)
+        self._queue.put((asset, int(period), append_only, list(candles)))
+
+    def _run_writer(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # One write per series for everything that queued up meanwhile
+            series: Dict[tuple, list] = defaultdict(list)
+            for item in batch:
+                if item is not None:
+                    series[item[:3]].extend(item[3])
+            for (asset, period, append_only), candles in series.items():
+                try:
+                    self.store_candles(asset, period, candles, append_only)
+                except Exception as e:
+                    logger.warning(f"Error storing candles of {asset} in the warehouse: {e}")
+            for _ in batch:
+                self._queue.task_done()
+            if None in batch:
+                return
+
+    def flush(self):
+        """Wait until the candles passed to submit() are stored."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        """Store the submitted candles and stop the background writer."""
+        with self.lock:
+            writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        self._queue.put(None)
+        writer.join()
+        atexit.unregister(self.close)
+
+    def live_writer(self, period: int, forward: Optional[Callable] = None) -> Callable:
+        """
+        Completion callback that stores every candle of a live CandleAggregator.
+
+        Candles are handed to the background writer (see submit), so the thread
+        completing them does no disk I/O. The first candle of every asset started
+        mid-period and is not stored, and live candles are only appended after the
+        stored ones: downloaded history is never replaced by them.
+
+        Args:
+            period: Timeframe of the aggregator the callback is given to
+            forward: Optional callback called afterwards with the same arguments
+
+        Returns:
+            A ``callback(asset, candle)`` for on_candle_complete
+        """
+        started = set()  # assets whose partial first candle was seen
+
+        def on_candle_complete(asset, candle):
+            try:
+                if asset in started:
+                    self.submit(asset, period, [candle], append_only=True)
+                else:
+                    started.add(asset)
+            finally:
+                if forward is not None:
+                    forward(asset, candle)
+        return on_candle_complete
+
+    def export_parquet(self, asset: str, period: int, path: str):
+        """Write a series to a Parquet file (requires pyarrow)."""
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required for Parquet export")
+        data = self.query(asset, period)
+        pq.write_table(pyarrow.table({name: data[name] for name in COLUMNS}), path)
+
+    def import_parquet(self, path: str, asset: str, period: int) -> int:
+        """Store the candles of a Parquet file written by export_parquet (requires pyarrow)."""
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required for Parquet import")
+        table = pq.read_table(path, memory_map=True)
+        return self.write(asset, period, {name: table.column(name).to_numpy() for name in table.column_names
+                                          if name in COLUMN_DTYPES})
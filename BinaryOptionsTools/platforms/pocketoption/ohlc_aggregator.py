@@ -10,6 +10,20 @@ import threading
 import logging
 from typing import Dict, List, Optional, Callable, Any
 
+import numpy as np
+
+
+# Record layout of candles kept in array storage
+CANDLE_DTYPE = np.dtype([
+    ("time", np.int64),
+    ("open", np.float64),
+    ("high", np.float64),
+    ("low", np.float64),
+    ("close", np.float64),
+    ("volume", np.int64),
+    ("tick_count", np.int64),
+])
+
 
 class OHLCCandle:
     """Represents a single OHLC candle."""
@@ -30,6 +44,25 @@ class OHLCCandle:
         self.close = price
         self.tick_count += 1
         
+    def merge(self, candle: "OHLCCandle"):
+        """Fold a later, finer candle of the same period into this candle."""
+        self.high = max(self.high, candle.high)
+        self.low = min(self.low, candle.low)
+        self.close = candle.close
+        self.volume += candle.volume
+        self.tick_count += candle.tick_count
+        
+    @classmethod
+    def from_candle(cls, timestamp: int, candle: "OHLCCandle") -> "OHLCCandle":
+        """Start a candle at ``timestamp`` from the values of a finer candle."""
+        rolled = cls(timestamp, candle.open)
+        rolled.high = candle.high
+        rolled.low = candle.low
+        rolled.close = candle.close
+        rolled.volume = candle.volume
+        rolled.tick_count = candle.tick_count
+        return rolled
+        
     def to_dict(self) -> Dict[str, Any]:
         """Convert candle to dictionary format."""
         return {
@@ -46,11 +79,52 @@ class OHLCCandle:
         return f"OHLCCandle(time={self.timestamp}, O={self.open}, H={self.high}, L={self.low}, C={self.close})"
 
 
+class CandleBuffer:
+    """Fixed-size ring buffer of completed candles backed by a NumPy structured array.
+    
+    The array holds two copies of the ring and every candle is written to both,
+    so the latest candles are always one contiguous slice, copied out in one go.
+    Readers always get copies: once the ring is full each new candle overwrites
+    the oldest slot, which would change a view held by another thread.
+    """
+    
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.data = np.zeros(2 * capacity, dtype=CANDLE_DTYPE)
+        self.head = 0
+        self.size = 0
+        
+    def append(self, candle: OHLCCandle):
+        """Store a completed candle, overwriting the oldest one when full."""
+        row = (candle.timestamp, candle.open, candle.high, candle.low,
+               candle.close, candle.volume, candle.tick_count)
+        self.data[self.head] = row
+        self.data[self.head + self.capacity] = row
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        
+    def latest(self, count: int = None) -> np.ndarray:
+        """Copy of the latest ``count`` candles, oldest first."""
+        size = self.size if count is None else min(self.size, max(count, 0))
+        end = self.head + self.capacity
+        return self.data[end - size:end].copy()
+        
+    def to_dicts(self, count: int = None) -> List[Dict[str, Any]]:
+        """Latest candles in the same dictionary format as OHLCCandle.to_dict()."""
+        names = CANDLE_DTYPE.names
+        return [dict(zip(names, row)) for row in self.latest(count).tolist()]
+        
+    def __len__(self):
+        return self.size
+
+
 class CandleAggregator:
     """Aggregates real-time tick data into OHLC candles."""
     
     def __init__(self, timeframe_seconds: int = 60, max_candles: int = 1000, 
-                 on_candle_complete: Optional[Callable] = None):
+                 on_candle_complete: Optional[Callable] = None, storage: str = "deque"):
         """
         Initialize the candle aggregator.
         
@@ -58,17 +132,29 @@ class CandleAggregator:
             timeframe_seconds: Timeframe for candles in seconds (default: 60 = 1 minute)
             max_candles: Maximum number of candles to keep in memory
             on_candle_complete: Callback function called when a candle is completed
+            storage: "deque" keeps OHLCCandle objects, "array" keeps completed candles
+                in a preallocated NumPy ring buffer per asset (cheap array/DataFrame reads)
         """
+        if storage not in ("deque", "array"):
+            raise ValueError(f"Unknown candle storage: {storage}")
         self.timeframe = timeframe_seconds
         self.max_candles = max_candles
         self.on_candle_complete = on_candle_complete
+        self.storage = storage
         
         # Store candles per asset
-        self.candles: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_candles))
+        if storage == "array":
+            self.candles: Dict[str, CandleBuffer] = defaultdict(lambda: CandleBuffer(max_candles))
+        else:
+            self.candles: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_candles))
         self.current_candles: Dict[str, OHLCCandle] = {}
+        # Assets whose candles are rolled up from a finer aggregator instead of ticks
+        self.sources: Dict[str, "CandleAggregator"] = {}
         
-        # Threading for thread-safe operations
+        # Threading: one lock per asset so readers of one asset never block ticks of
+        # another; self.lock only guards creation of the per-asset locks
         self.lock = threading.RLock()
+        self.asset_locks: Dict[str, threading.Lock] = {}
         
         # Logging
         self.logger = logging.getLogger(__name__)
@@ -78,10 +164,20 @@ class CandleAggregator:
         # Round down to the nearest timeframe boundary
         return int(timestamp // self.timeframe) * self.timeframe
         
+    def _asset_lock(self, asset: str) -> threading.Lock:
+        """Get the lock guarding one asset's candles."""
+        lock = self.asset_locks.get(asset)
+        if lock is None:
+            with self.lock:
+                lock = self.asset_locks.setdefault(asset, threading.Lock())
+        return lock
+        
     def add_tick(self, asset: str, timestamp: float, price: float) -> Optional[OHLCCandle]:
         """
         Add a new price tick and return completed candle if any.
         
+        The completion callback runs after the asset lock is released.
+        
         Args:
             asset: Asset symbol (e.g., "EURUSD_otc")
             timestamp: Tick timestamp (Unix timestamp)
@@ -90,7 +186,12 @@ class CandleAggregator:
         Returns:
             Completed candle if a candle boundary was crossed, None otherwise
         """
-        with self.lock:
+        completed_candle = self._add_tick(asset, timestamp, price)
+        self._notify(asset, completed_candle)
+        return completed_candle
+        
+    def _add_tick(self, asset: str, timestamp: float, price: float) -> Optional[OHLCCandle]:
+        with self._asset_lock(asset):
             candle_timestamp = self._get_candle_timestamp(timestamp)
             completed_candle = None
             
@@ -102,20 +203,10 @@ class CandleAggregator:
                 
             elif self.current_candles[asset].timestamp != candle_timestamp:
                 # New candle period - close current and start new
-                completed_candle = self.current_candles[asset]
-                self.candles[asset].append(completed_candle)
-                
-                self.logger.debug(f"Completed candle for {asset}: {completed_candle}")
+                completed_candle = self._complete_current(asset)
                 
                 # Start new candle
                 self.current_candles[asset] = OHLCCandle(candle_timestamp, price)
-                
-                # Call completion callback if provided
-                if self.on_candle_complete:
-                    try:
-                        self.on_candle_complete(asset, completed_candle)
-                    except Exception as e:
-                        self.logger.error(f"Error in candle completion callback: {e}")
                         
             else:
                 # Update current candle
@@ -123,6 +214,155 @@ class CandleAggregator:
                 
             return completed_candle
             
+    def add_ticks(self, asset: str, timestamps, prices) -> List[OHLCCandle]:
+        """
+        Add a batch of price ticks for one asset.
+        
+        Ticks are grouped into candle periods with vectorised NumPy operations and
+        the asset lock is taken once, with the same result as calling add_tick for
+        every tick in order. Completion callbacks run after the whole batch.
+        
+        Args:
+            asset: Asset symbol (e.g., "EURUSD_otc")
+            timestamps: Tick timestamps in arrival order (sequence or array)
+            prices: Tick prices, same length as timestamps
+            
+        Returns:
+            Candles completed by the batch, oldest first
+        """
+        completed = self._add_ticks(asset, timestamps, prices)
+        for candle in completed:
+            self._notify(asset, candle)
+        return completed
+        
+    def _add_ticks(self, asset: str, timestamps, prices) -> List[OHLCCandle]:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(timestamps) != len(prices):
+            raise ValueError("timestamps and prices must have the same length")
+        if len(timestamps) == 0:
+            return []
+            
+        # A new group starts wherever the candle period changes from one tick to the next
+        periods = (timestamps // self.timeframe).astype(np.int64) * self.timeframe
+        starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+        ends = np.r_[starts[1:], len(prices)]
+        groups = zip(
+            periods[starts].tolist(),
+            prices[starts].tolist(),
+            np.maximum.reduceat(prices, starts).tolist(),
+            np.minimum.reduceat(prices, starts).tolist(),
+            prices[ends - 1].tolist(),
+            (ends - starts).tolist(),
+        )
+        
+        completed = []
+        with self._asset_lock(asset):
+            for candle_timestamp, open_price, high, low, close, tick_count in groups:
+                current = self.current_candles.get(asset)
+                if current is not None and current.timestamp == candle_timestamp:
+                    current.high = max(current.high, high)
+                    current.low = min(current.low, low)
+                    current.close = close
+                    current.tick_count += tick_count
+                    continue
+                    
+                if current is not None:
+                    completed.append(self._complete_current(asset))
+                candle = OHLCCandle(candle_timestamp, open_price)
+                candle.high = high
+                candle.low = low
+                candle.close = close
+                candle.tick_count = tick_count
+                self.current_candles[asset] = candle
+                
+        return completed
+        
+    def add_candle(self, asset: str, candle: OHLCCandle) -> Optional[OHLCCandle]:
+        """
+        Roll a completed candle of a finer timeframe into this timeframe.
+        
+        Args:
+            asset: Asset symbol
+            candle: Completed candle whose timeframe divides this one
+            
+        Returns:
+            Completed candle if the finer candle starts a new period, None otherwise
+        """
+        completed_candle = self._add_candle(asset, candle)
+        self._notify(asset, completed_candle)
+        return completed_candle
+        
+    def _add_candle(self, asset: str, candle: OHLCCandle) -> Optional[OHLCCandle]:
+        with self._asset_lock(asset):
+            candle_timestamp = self._get_candle_timestamp(candle.timestamp)
+            completed_candle = None
+            current = self.current_candles.get(asset)
+            
+            if current is not None and current.timestamp != candle_timestamp:
+                completed_candle = self._complete_current(asset)
+                current = None
+                
+            if current is None:
+                self.current_candles[asset] = OHLCCandle.from_candle(candle_timestamp, candle)
+            else:
+                current.merge(candle)
+                
+            return completed_candle
+            
+    def roll_over(self, asset: str, timestamp: float) -> Optional[OHLCCandle]:
+        """
+        Close the current candle if ``timestamp`` belongs to a later period.
+        
+        Used for rolled-up timeframes when the finer timeframe starts a candle,
+        so coarse candles complete on the same tick as with direct aggregation.
+        """
+        completed_candle = self._roll_over(asset, timestamp)
+        self._notify(asset, completed_candle)
+        return completed_candle
+        
+    def _roll_over(self, asset: str, timestamp: float) -> Optional[OHLCCandle]:
+        with self._asset_lock(asset):
+            current = self.current_candles.get(asset)
+            if current is None or current.timestamp == self._get_candle_timestamp(timestamp):
+                return None
+            return self._complete_current(asset)
+            
+    def _complete_current(self, asset: str) -> OHLCCandle:
+        """Move the current candle of an asset to the completed candles."""
+        completed_candle = self.current_candles.pop(asset)
+        self.candles[asset].append(completed_candle)
+        self.logger.debug(f"Completed candle for {asset}: {completed_candle}")
+        return completed_candle
+        
+    def _notify(self, asset: str, completed_candle: Optional[OHLCCandle]):
+        """Call the completion callback if provided. Must not be called with a lock held."""
+        if completed_candle is not None and self.on_candle_complete:
+            try:
+                self.on_candle_complete(asset, completed_candle)
+            except Exception as e:
+                self.logger.error(f"Error in candle completion callback: {e}")
+                
+    def _current(self, asset: str) -> Optional[OHLCCandle]:
+        """Current candle of an asset, including the in-progress finer candle when rolled up.
+        
+        Called with the asset lock held.
+        """
+        current = self.current_candles.get(asset)
+        source = self.sources.get(asset)
+        if source is None:
+            return current
+        with source._asset_lock(asset):
+            live = source.current_candles.get(asset)
+            if live is None:
+                return current
+            candle_timestamp = self._get_candle_timestamp(live.timestamp)
+            if current is None or current.timestamp != candle_timestamp:
+                return OHLCCandle.from_candle(candle_timestamp, live)
+            combined = OHLCCandle.from_candle(current.timestamp, current)
+            combined.merge(live)
+            return combined
+            
     def get_candles(self, asset: str, count: int = None) -> List[Dict[str, Any]]:
         """
         Get completed candles for an asset.
@@ -134,23 +374,67 @@ class CandleAggregator:
         Returns:
             List of candles in dictionary format
         """
-        with self.lock:
+        with self._asset_lock(asset):
             if asset not in self.candles:
                 return []
                 
+            if self.storage == "array":
+                return self.candles[asset].to_dicts(count)
+                
             candles_list = list(self.candles[asset])
             
-            if count is not None:
-                candles_list = candles_list[-count:]
+        if count is not None:
+            candles_list = candles_list[-count:]
+            
+        # Completed candles are never modified, so they can be converted unlocked
+        return [candle.to_dict() for candle in candles_list]
+            
+    def get_candles_array(self, asset: str, count: int = None) -> np.ndarray:
+        """
+        Get completed candles for an asset as a NumPy structured array.
+        
+        The array is owned by the caller and never changes as new candles complete.
+        With array storage it is a single slice copy of the ring buffer, with deque
+        storage it is built candle by candle.
+        
+        Args:
+            asset: Asset symbol
+            count: Number of candles to return (None for all)
+            
+        Returns:
+            Structured array with fields time/open/high/low/close/volume/tick_count
+        """
+        with self._asset_lock(asset):
+            if asset not in self.candles:
+                return np.empty(0, dtype=CANDLE_DTYPE)
                 
-            return [candle.to_dict() for candle in candles_list]
+            if self.storage == "array":
+                return self.candles[asset].latest(count)
+                
+            candles_list = list(self.candles[asset])
+            
+        if count is not None:
+            candles_list = candles_list[-count:] if count > 0 else []
+        return np.array(
+            [(c.timestamp, c.open, c.high, c.low, c.close, c.volume, c.tick_count) for c in candles_list],
+            dtype=CANDLE_DTYPE
+        )
+            
+    def get_candles_dataframe(self, asset: str, count: int = None):
+        """
+        Get completed candles for an asset as a pandas DataFrame.
+        
+        The frame is built column-wise from :meth:`get_candles_array`, without
+        going through per-candle dictionaries.
+        """
+        import pandas as pd
+        return pd.DataFrame(self.get_candles_array(asset, count))
             
     def get_current_candle(self, asset: str) -> Optional[Dict[str, Any]]:
         """Get the current incomplete candle for an asset."""
-        with self.lock:
-            if asset in self.current_candles:
-                return self.current_candles[asset].to_dict()
-            return None
+        with self._asset_lock(asset):
+            current = self._current(asset)
+            return current.to_dict() if current is not None else None
             
     def get_latest_candle(self, asset: str, include_current: bool = False) -> Optional[Dict[str, Any]]:
         """
@@ -163,24 +447,29 @@ class CandleAggregator:
         Returns:
             Latest candle or None
         """
-        with self.lock:
+        with self._asset_lock(asset):
             # Try to get the latest completed candle
             if asset in self.candles and len(self.candles[asset]) > 0:
+                if self.storage == "array":
+                    return self.candles[asset].to_dicts(1)[0]
                 return self.candles[asset][-1].to_dict()
                 
             # If no completed candles and include_current is True, return current candle
-            if include_current and asset in self.current_candles:
-                return self.current_candles[asset].to_dict()
+            if include_current:
+                current = self._current(asset)
+                if current is not None:
+                    return current.to_dict()
                 
             return None
             
     def clear_asset_data(self, asset: str):
         """Clear all data for a specific asset."""
-        with self.lock:
+        with self._asset_lock(asset):
             if asset in self.candles:
                 del self.candles[asset]
             if asset in self.current_candles:
                 del self.current_candles[asset]
+            self.sources.pop(asset, None)
             self.logger.debug(f"Cleared all data for {asset}")
             
     def get_assets(self) -> List[str]:
@@ -192,40 +481,58 @@ class CandleAggregator:
             
     def get_stats(self) -> Dict[str, Any]:
         """Get aggregator statistics."""
-        with self.lock:
-            stats = {
-                "timeframe_seconds": self.timeframe,
-                "max_candles": self.max_candles,
-                "assets_count": len(self.get_assets()),
-                "assets": {}
+        assets = self.get_assets()
+        stats = {
+            "timeframe_seconds": self.timeframe,
+            "max_candles": self.max_candles,
+            "storage": self.storage,
+            "assets_count": len(assets),
+            "assets": {}
+        }
+        
+        for asset in assets:
+            with self._asset_lock(asset):
+                completed_count = len(self.candles.get(asset, []))
+                current = self._current(asset)
+            has_current = current is not None
+            current_ticks = current.tick_count if has_current else 0
+            
+            stats["assets"][asset] = {
+                "completed_candles": completed_count,
+                "has_current_candle": has_current,
+                "current_candle_ticks": current_ticks
             }
             
-            for asset in self.get_assets():
-                completed_count = len(self.candles.get(asset, []))
-                has_current = asset in self.current_candles
-                current_ticks = self.current_candles[asset].tick_count if has_current else 0
-                
-                stats["assets"][asset] = {
-                    "completed_candles": completed_count,
-                    "has_current_candle": has_current,
-                    "current_candle_ticks": current_ticks
-                }
-                
-            return stats
+        return stats
 
 
 class SubscriptionManager:
     """Manages multiple candle aggregators for different timeframes."""
     
-    def __init__(self):
+    def __init__(self, cascade: bool = False):
+        """
+        Initialize the subscription manager.
+        
+        Args:
+            cascade: If True, only the finest timeframe of each asset aggregates ticks;
+                coarser timeframes that are multiples of it are rolled up from its
+                candles, with the same output as aggregating every tick.
+        """
         self.aggregators: Dict[int, CandleAggregator] = {}
         self.subscriptions: Dict[str, List[int]] = defaultdict(list)  # asset -> [timeframes]
+        self.cascade = cascade
+        # asset -> (tick-fed timeframes, finest timeframe, rolled-up timeframes); plans are
+        # replaced, never mutated, so tick ingestion can read them without self.lock
+        self.plans: Dict[str, tuple] = {}
+        # self.lock serialises subscription changes; ticks only take their asset's lock
         self.lock = threading.RLock()
+        self.asset_locks: Dict[str, threading.Lock] = {}
         self.logger = logging.getLogger(__name__)
         
     def subscribe_candles_ohlc(self, asset: str, timeframe_seconds: int, 
                               max_candles: int = 1000, 
-                              on_candle_complete: Optional[Callable] = None) -> bool:
+                              on_candle_complete: Optional[Callable] = None,
+                              storage: str = "deque") -> bool:
         """
         Subscribe to OHLC candles for an asset with specific timeframe.
         
@@ -234,6 +541,7 @@ class SubscriptionManager:
             timeframe_seconds: Candle timeframe in seconds
             max_candles: Maximum candles to keep
             on_candle_complete: Callback for completed candles
+            storage: Candle storage of a newly created aggregator ("deque" or "array")
             
         Returns:
             True if subscription successful
@@ -245,12 +553,14 @@ class SubscriptionManager:
                     self.aggregators[timeframe_seconds] = CandleAggregator(
                         timeframe_seconds=timeframe_seconds,
                         max_candles=max_candles,
-                        on_candle_complete=on_candle_complete
+                        on_candle_complete=on_candle_complete,
+                        storage=storage
                     )
                     
                 # Add to subscriptions
                 if timeframe_seconds not in self.subscriptions[asset]:
                     self.subscriptions[asset].append(timeframe_seconds)
+                    self._update_plan(asset)
                     
                 self.logger.info(f"Subscribed {asset} to {timeframe_seconds}s candles")
                 return True
@@ -281,17 +591,20 @@ class SubscriptionManager:
                         if tf in self.aggregators:
                             self.aggregators[tf].clear_asset_data(asset)
                     del self.subscriptions[asset]
+                    self.plans.pop(asset, None)
                     self.logger.info(f"Unsubscribed {asset} from all candle timeframes")
                 else:
                     # Unsubscribe from specific timeframe
                     if timeframe_seconds in self.subscriptions[asset]:
                         self.subscriptions[asset].remove(timeframe_seconds)
+                        # Re-plan first so rolled-up timeframes can take over the live candle
+                        self._update_plan(asset)
                         if timeframe_seconds in self.aggregators:
                             self.aggregators[timeframe_seconds].clear_asset_data(asset)
-                            
+
                     if not self.subscriptions[asset]:
                         del self.subscriptions[asset]
-                        
+
                     self.logger.info(f"Unsubscribed {asset} from {timeframe_seconds}s candles")
                     
                 return True
@@ -300,24 +613,166 @@ class SubscriptionManager:
                 self.logger.error(f"Error unsubscribing {asset} from candles: {e}")
                 return False
                 
+    def _asset_lock(self, asset: str) -> threading.Lock:
+        """Get the lock serialising tick ingestion for one asset."""
+        lock = self.asset_locks.get(asset)
+        if lock is None:
+            with self.lock:
+                lock = self.asset_locks.setdefault(asset, threading.Lock())
+        return lock
+        
+    def _update_plan(self, asset: str):
+        """Work out which timeframes of an asset consume ticks and which are rolled up."""
+        timeframes = [tf for tf in self.subscriptions.get(asset, []) if tf in self.aggregators]
+        with self._asset_lock(asset):
+            if not timeframes:
+                self.plans.pop(asset, None)
+                return
+                
+            finest = min(timeframes)
+            rolled = []
+            if self.cascade:
+                rolled = sorted(tf for tf in timeframes if tf != finest and tf % finest == 0)
+            direct = [tf for tf in timeframes if tf not in rolled]
+            
+            for tf in direct:
+                aggregator = self.aggregators[tf]
+                if asset in aggregator.sources:
+                    # Keep the in-progress data when a timeframe goes back to consuming ticks
+                    with aggregator._asset_lock(asset):
+                        current = aggregator._current(asset)
+                        del aggregator.sources[asset]
+                        if current is not None:
+                            aggregator.current_candles[asset] = current
+            for tf in rolled:
+                self.aggregators[tf].sources[asset] = self.aggregators[finest]
+                
+            self.plans[asset] = (tuple(direct), finest, tuple(rolled))
+        
     def process_tick(self, asset: str, timestamp: float, price: float):
-        """Process a price tick for all relevant aggregators."""
-        with self.lock:
-            if asset in self.subscriptions:
-                for timeframe in self.subscriptions[asset]:
-                    if timeframe in self.aggregators:
-                        self.aggregators[timeframe].add_tick(asset, timestamp, price)
+        """Process a price tick for all relevant aggregators.
+        
+        Only the asset's own lock is taken, and completion callbacks run after it is released.
+        """
+        plan = self.plans.get(asset)
+        if plan is None:
+            return
+        with self._asset_lock(asset):
+            completed = self._ingest_tick(asset, plan, timestamp, price)
+        self._dispatch(asset, completed)
+        
+    def _ingest_tick(self, asset: str, plan: tuple, timestamp: float, price: float) -> list:
+        """Aggregate one tick; returns the (aggregator, candle) pairs completed by it."""
+        direct, finest, rolled = plan
+        completed = []
+        for timeframe in direct:
+            aggregator = self.aggregators[timeframe]
+            candle = aggregator._add_tick(asset, timestamp, price)
+            if candle is not None:
+                completed.append((aggregator, candle))
+            if timeframe == finest and rolled:
+                completed.extend(self._roll_up(asset, finest, rolled, [candle] if candle is not None else []))
+        return completed
+                    
+    def _roll_up(self, asset: str, finest: int, rolled: tuple, completed: List[OHLCCandle],
+                 force: bool = False) -> list:
+        """Feed completed finest-timeframe candles to the rolled-up timeframes."""
+        live = self.aggregators[finest].current_candles.get(asset)
+        # Coarser periods can only change when the finest timeframe starts a candle
+        if not force and not completed and (live is None or live.tick_count > 1):
+            return []
+        rolled_completed = []
+        for timeframe in rolled:
+            aggregator = self.aggregators[timeframe]
+            for candle in completed:
+                coarse = aggregator._add_candle(asset, candle)
+                if coarse is not None:
+                    rolled_completed.append((aggregator, coarse))
+            if live is not None:
+                coarse = aggregator._roll_over(asset, live.timestamp)
+                if coarse is not None:
+                    rolled_completed.append((aggregator, coarse))
+        return rolled_completed
+        
+    def process_ticks(self, batch) -> int:
+        """
+        Process a batch of ticks, e.g. one updateStream frame or a recorded tick file.
+        
+        Ticks are grouped per asset and each asset's lock is taken once per batch;
+        completion callbacks run after the asset's ticks are aggregated.
+        
+        Args:
+            batch: Iterable of ``(asset, timestamp, price)`` rows or tick objects
+                with ``asset``/``timestamp``/``price`` attributes
+                
+        Returns:
+            Number of ticks that reached a subscribed asset
+        """
+        per_asset: Dict[str, tuple] = {}
+        for tick in batch:
+            if isinstance(tick, (list, tuple)):
+                asset, timestamp, price = tick[0], tick[1], tick[2]
+            else:
+                asset, timestamp, price = tick.asset, tick.timestamp, tick.price
+            if asset not in self.plans:
+                continue
+            if asset not in per_asset:
+                per_asset[asset] = ([], [])
+            per_asset[asset][0].append(timestamp)
+            per_asset[asset][1].append(price)
+            
+        processed = 0
+        for asset, (timestamps, prices) in per_asset.items():
+            processed += self.process_asset_ticks(asset, timestamps, prices)
+        return processed
+        
+    def process_asset_ticks(self, asset: str, timestamps, prices) -> int:
+        """
+        Process a batch of ticks for one asset given as arrays.
+        
+        Returns:
+            Number of ticks processed (0 if the asset has no subscription)
+        """
+        plan = self.plans.get(asset)
+        if plan is None or len(timestamps) == 0:
+            return 0
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        
+        direct, finest, rolled = plan
+        completed = []
+        with self._asset_lock(asset):
+            for timeframe in direct:
+                aggregator = self.aggregators[timeframe]
+                candles = aggregator._add_ticks(asset, timestamps, prices)
+                completed.extend((aggregator, candle) for candle in candles)
+                if timeframe == finest and rolled:
+                    completed.extend(self._roll_up(asset, finest, rolled, candles, force=True))
+        self._dispatch(asset, completed)
+        return len(timestamps)
+        
+    def _dispatch(self, asset: str, completed: list):
+        """Run completion callbacks, outside of every lock."""
+        for aggregator, candle in completed:
+            aggregator._notify(asset, candle)
                         
     def get_candles(self, asset: str, timeframe_seconds: int, count: int = None) -> List[Dict[str, Any]]:
         """Get candles for asset and timeframe."""
-        with self.lock:
-            if timeframe_seconds in self.aggregators:
-                return self.aggregators[timeframe_seconds].get_candles(asset, count)
-            return []
+        aggregator = self.aggregators.get(timeframe_seconds)
+        if aggregator is not None:
+            return aggregator.get_candles(asset, count)
+        return []
+            
+    def get_candles_array(self, asset: str, timeframe_seconds: int, count: int = None) -> np.ndarray:
+        """Get candles for asset and timeframe as a NumPy structured array."""
+        aggregator = self.aggregators.get(timeframe_seconds)
+        if aggregator is not None:
+            return aggregator.get_candles_array(asset, count)
+        return np.empty(0, dtype=CANDLE_DTYPE)
             
     def get_current_candle(self, asset: str, timeframe_seconds: int) -> Optional[Dict[str, Any]]:
         """Get current incomplete candle."""
-        with self.lock:
-            if timeframe_seconds in self.aggregators:
-                return self.aggregators[timeframe_seconds].get_current_candle(asset)
-            return None
+        aggregator = self.aggregators.get(timeframe_seconds)
+        if aggregator is not None:
+            return aggregator.get_current_candle(asset)
+        return None
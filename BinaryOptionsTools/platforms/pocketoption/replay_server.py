@@ -0,0 +1,438 @@
+"""
+Local replay server standing in for the PocketOption websocket.
+
+Speaks the Engine.IO / socket.io framing the live servers use (``0{"sid"...}``
+open packet, ``40`` namespace connect, ``451-[...]`` event headers followed by
+their binary payload, ``2``/``3`` pings) and replays tick and deal streams at a
+configurable speed multiplier. loadHistoryPeriod requests are answered from
+local candles and openOrder requests are settled against the replayed prices,
+so the client, the OHLC aggregator and strategies can be load tested offline.
+Sessions recorded with FrameRecorder are replayed with recorded_streams.
+
+Example:
+    server = ReplayServer(ticks=candle_ticks({"EURUSD_otc": "history-EURUSD_otc.csv"}), speed=50)
+    url = server.start()
+    api = PocketOption(ssid, demo=True, url=url)
+    ...
+    server.stop()
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import websockets
+
+from .candle_warehouse import CandleWarehouse, frame_columns
+from .ws.decoder import MSGSPEC_AVAILABLE, decode_json
+from .ws.recorder import read_frames
+
+if MSGSPEC_AVAILABLE:
+    import msgspec
+
+# A tick frame is (stream time, [[asset, timestamp, price], ...]) or (stream time, raw payload bytes)
+TickFrame = Tuple[float, Union[List[list], bytes]]
+
+EVENT_HEADER = '451-["{}",{{"_placeholder":true,"num":0}}]'
+
+# Frames sent between yields to the loop when the stream runs unthrottled or late
+YIELD_EVERY = 256
+
+
+def _encode(payload: Any) -> bytes:
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        return bytes(payload)
+    if MSGSPEC_AVAILABLE:
+        return msgspec.json.encode(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def _candle_columns(source: Union[str, pd.DataFrame, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Candle columns of a CSV path, a candle DataFrame or a dict of column arrays."""
+    if isinstance(source, str):
+        source = pd.read_csv(source)
+    if isinstance(source, dict):
+        source = pd.DataFrame(source)
+    return frame_columns(source)
+
+
+def _merge_frames(times: List[np.ndarray], rows: List[List[list]]) -> List[TickFrame]:
+    """One single-tick frame per row, all assets merged in time order."""
+    all_times = np.concatenate(times) if times else np.zeros(0)
+    all_rows = list(itertools.chain.from_iterable(rows))
+    return [(float(all_times[i]), [all_rows[i]]) for i in np.argsort(all_times, kind="stable")]
+
+
+def synthetic_ticks(assets: Iterable[str], duration: float = 60.0, rate: float = 2.0,
+                    start: Optional[float] = None, seed: int = 0, price: float = 1.1,
+                    volatility: float = 1e-4) -> List[TickFrame]:
+    """
+    Random-walk ticks for several assets, one tick per frame like the live stream.
+
+    Args:
+        assets: Asset names
+        duration: Seconds of stream time
+        rate: Ticks per second and asset
+        start: Timestamp of the first tick (default: now)
+        seed: Seed of the random generator
+        price: Starting price (each asset gets a small offset)
+        volatility: Standard deviation of the relative change per tick
+
+    Returns:
+        Tick frames in time order
+    """
+    rng = np.random.default_rng(seed)
+    start = time.time() if start is None else start
+    count = int(duration * rate)
+    times, rows = [], []
+    for offset, asset in enumerate(assets):
+        stamps = np.round(start + (np.arange(count) + rng.uniform(0, 1, count)) / rate, 3)
+        prices = np.round(price * (1 + offset * 0.01) * np.exp(np.cumsum(rng.normal(0, volatility, count))), 5)
+        times.append(stamps)
+        rows.append([[asset, t, p] for t, p in zip(stamps.tolist(), prices.tolist())])
+    return _merge_frames(times, rows)
+
+
+def candle_ticks(histories: Dict[str, Union[str, pd.DataFrame]]) -> List[TickFrame]:
+    """
+    Ticks re-creating candle histories: open, low/high, high/low and close inside every candle.
+
+    Aggregating the replayed ticks at the history's period gives back its candles, which makes
+    recorded histories (e.g. the bundled CSVs) usable as tick streams.
+
+    Args:
+        histories: Candle history per asset, a CSV path or a candle DataFrame
+
+    Returns:
+        Tick frames in time order
+    """
+    times, rows = [], []
+    for asset, source in histories.items():
+        columns = _candle_columns(source)
+        candle_times = columns["time"]
+        if not len(candle_times):
+            continue
+        period = int(np.median(np.diff(candle_times))) if len(candle_times) > 1 else 1
+        offsets = np.array([0.0, 0.25, 0.5, 0.75]) * period
+        stamps = (candle_times[:, None] + offsets).round(3)
+        rising = columns["close"] >= columns["open"]
+        # Rising candles dip first, falling ones peak first
+        middle = np.where(rising[:, None], np.column_stack([columns["low"], columns["high"]]),
+                          np.column_stack([columns["high"], columns["low"]]))
+        prices = np.column_stack([columns["open"], middle, columns["close"]])
+        times.append(stamps.ravel())
+        rows.append([[asset, t, p] for t, p in zip(stamps.ravel().tolist(), prices.ravel().tolist())])
+    return _merge_frames(times, rows)
+
+
+def recorded_streams(path: str) -> Tuple[List[TickFrame], List[tuple]]:
+    """
+    Tick and deal streams of a session recorded with FrameRecorder, paced as they were received.
+
+    The binary payloads are replayed byte for byte, so the client decodes exactly what it got live.
+
+    Args:
+        path: Recording file written by FrameRecorder
+
+    Returns:
+        (tick frames, deal frames) for ReplayServer's ``ticks`` and ``deals``
+    """
+    ticks, deals = [], []
+    pending = None
+    for frame in read_frames(path):
+        if frame.outbound:
+            continue
+        if isinstance(frame.data, str):
+            pending = json.loads(frame.data[4:])[0] if frame.data.startswith("451-[") else None
+        elif pending == "updateStream":
+            ticks.append((frame.timestamp, frame.data))
+            pending = None
+        elif pending == "updateClosedDeals":
+            deals.append((frame.timestamp, decode_json(frame.data)))
+            pending = None
+    return ticks, deals
+
+
+class _Session:
+    """State of one client connection."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.sid = uuid.uuid4().hex
+        # A header and its binary payload must go out back to back
+        self.lock = asyncio.Lock()
+        self.prices: Dict[str, float] = {}
+        self.orders: List[tuple] = []  # heap of (close stream time, sequence, deal)
+        self.sequence = itertools.count()
+        self.clock: Optional[float] = None  # stream time of the last frame sent
+        self.tasks: List[asyncio.Task] = []
+
+
+class ReplayServer:
+    """Local websocket server replaying tick, history and deal streams in PocketOption framing.
+
+    Every authenticated connection gets its own replay of the streams; pass lists (as returned
+    by synthetic_ticks and candle_ticks) to replay them on every connection, an iterator is
+    consumed by the first one.
+
+    Args:
+        ticks: Tick frames ``(stream time, rows or payload bytes)`` sent as updateStream
+        deals: ``(stream time, [deal, ...])`` frames sent as updateClosedDeals
+        history: Candles answering loadHistoryPeriod, per asset (CSV path or DataFrame) or a CandleWarehouse
+        speed: Stream seconds replayed per second, e.g. 10 or 100; None or 0 sends as fast as possible
+        host: Interface to listen on
+        port: Port to listen on (0 picks a free one)
+        ping_interval: Seconds between Engine.IO pings
+        payout: Payout percentage of the orders settled by the server
+        balance: Demo balance reported after authentication
+    """
+
+    def __init__(self, ticks: Optional[Iterable[TickFrame]] = None, deals: Optional[Iterable[tuple]] = None,
+                 history: Union[Dict[str, Union[str, pd.DataFrame]], CandleWarehouse, None] = None,
+                 speed: Optional[float] = 1.0, host: str = "127.0.0.1", port: int = 0,
+                 ping_interval: float = 25.0, payout: float = 92, balance: float = 10000.0):
+        self.ticks = ticks
+        self.deals = deals
+        self.history = history
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.ping_interval = ping_interval
+        self.payout = payout
+        self.balance = balance
+        self.history_columns: Dict[str, Dict[str, np.ndarray]] = {}
+        self.server = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        # Set when a connection has replayed every stream
+        self.finished = threading.Event()
+        self.stats = {
+            "connections": 0, "frames_received": 0, "frames_sent": 0, "bytes_sent": 0, "events_sent": 0,
+            "ticks_sent": 0, "history_replies": 0, "orders": 0, "pings": 0, "pongs": 0, "stream_seconds": 0.0,
+        }
+
+    @property
+    def url(self) -> str:
+        """Socket.io URL of the server, for ``PocketOption(..., url=...)``."""
+        return f"ws://{self.host}:{self.port}/socket.io/?EIO=4&transport=websocket"
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start_async(self) -> str:
+        """Start listening on the running event loop and return the URL."""
+        self.server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop_async(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    def start(self) -> str:
+        """Start the server on its own thread and event loop and return the URL."""
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        return asyncio.run_coroutine_threadsafe(self.start_async(), self.loop).result()
+
+    def stop(self):
+        """Close every connection and stop the server thread."""
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop_async(), self.loop).result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=10)
+        self.loop.close()
+        self.loop = self.thread = None
+
+    def wait_finished(self, timeout: Optional[float] = None) -> bool:
+        """Block until a connection has replayed every stream."""
+        return self.finished.wait(timeout)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Connection handling
+    # ------------------------------------------------------------------
+
+    async def _handler(self, ws):
+        session = _Session(ws)
+        self.stats["connections"] += 1
+        await ws.send("0" + json.dumps({"sid": session.sid, "upgrades": [], "pingTimeout": 20000,
+                                        "pingInterval": int(self.ping_interval * 1000), "maxPayload": 1000000}))
+        try:
+            async for message in ws:
+                self.stats["frames_received"] += 1
+                if isinstance(message, bytes):
+                    continue
+                if message == "3":
+                    self.stats["pongs"] += 1
+                elif message == "40":
+                    await ws.send("40" + json.dumps({"sid": session.sid}))
+                elif message.startswith("42"):
+                    try:
+                        event = json.loads(message[2:])
+                    except ValueError:
+                        continue
+                    if isinstance(event, list) and event:
+                        await self._on_event(session, event[0], event[1] if len(event) > 1 else None)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for task in session.tasks:
+                task.cancel()
+
+    async def _on_event(self, session: _Session, name: str, data: Any):
+        if name == "auth":
+            await self._emit(session, "successauth", {"id": session.sid})
+            await self._emit(session, "successupdateBalance", {"uid": 1, "balance": self.balance, "isDemo": 1})
+            if not session.tasks:
+                session.tasks.append(asyncio.create_task(self._stream(session)))
+                session.tasks.append(asyncio.create_task(self._ping(session)))
+        elif name == "loadHistoryPeriod" and isinstance(data, dict):
+            await self._emit(session, "loadHistoryPeriod", {"data": self._history_reply(data)})
+            self.stats["history_replies"] += 1
+        elif name == "openOrder" and isinstance(data, dict):
+            await self._open_order(session, data)
+
+    async def _emit(self, session: _Session, event: str, payload: Any):
+        """Send a socket.io binary event: the 451 header, then its payload."""
+        raw = _encode(payload)
+        async with session.lock:
+            await session.ws.send(EVENT_HEADER.format(event))
+            await session.ws.send(raw)
+        self.stats["frames_sent"] += 2
+        self.stats["bytes_sent"] += len(raw)
+        self.stats["events_sent"] += 1
+
+    async def _ping(self, session: _Session):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            async with session.lock:
+                await session.ws.send("2")
+            self.stats["pings"] += 1
+
+    # ------------------------------------------------------------------
+    # Streams
+    # ------------------------------------------------------------------
+
+    def _events(self) -> Iterable[tuple]:
+        """Every stream merged into (stream time, event, payload) in time order."""
+        streams = []
+        if self.ticks is not None:
+            streams.append((t, "updateStream", rows) for t, rows in self.ticks)
+        if self.deals is not None:
+            streams.append((t, "updateClosedDeals", deals) for t, deals in self.deals)
+        return heapq.merge(*streams, key=lambda event: event[0])
+
+    async def _stream(self, session: _Session):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first = None
+        since_yield = 0
+        for stream_time, event, payload in self._events():
+            if first is None:
+                first = stream_time
+            slept = False
+            if self.speed:
+                delay = started + (stream_time - first) / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    slept = True
+            since_yield = 0 if slept else since_yield + 1
+            if since_yield >= YIELD_EVERY:
+                # Let pongs and order requests in while running flat out
+                await asyncio.sleep(0)
+                since_yield = 0
+
+            session.clock = stream_time
+            if session.orders and session.orders[0][0] <= stream_time:
+                await self._close_orders(session, stream_time)
+            if event == "updateStream":
+                rows = decode_json(payload) if isinstance(payload, (bytes, bytearray, memoryview)) else payload
+                for row in rows:
+                    session.prices[row[0]] = row[2]
+                self.stats["ticks_sent"] += len(rows)
+            await self._emit(session, event, payload)
+
+        # Orders still open when the streams end settle at the last prices
+        if session.orders:
+            await self._close_orders(session, float("inf"))
+        self.stats["stream_seconds"] = loop.time() - started
+        self.finished.set()
+
+    def _history_reply(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Candles of ``end - offset < time <= end`` as [time, open, close, high, low] rows."""
+        asset, period = request.get("asset"), int(request.get("period") or 60)
+        end = int(request.get("time") or 0)
+        start = end - int(request.get("offset") or 0)
+        columns = None
+        if isinstance(self.history, CandleWarehouse):
+            columns = self.history.query(asset, period, start + 1, end)
+        elif self.history is not None and asset in self.history:
+            if asset not in self.history_columns:
+                self.history_columns[asset] = _candle_columns(self.history[asset])
+            columns = self.history_columns[asset]
+            times = columns["time"]
+            rows = slice(np.searchsorted(times, start, side="right"), np.searchsorted(times, end, side="right"))
+            columns = {name: values[rows] for name, values in columns.items()}
+        candles = [] if columns is None else np.column_stack(
+            [columns[name] for name in ("time", "open", "close", "high", "low")]).tolist()
+        return {"asset": asset, "period": period, "index": request.get("index"), "candles": candles}
+
+    # ------------------------------------------------------------------
+    # Orders
+    # ------------------------------------------------------------------
+
+    async def _open_order(self, session: _Session, request: Dict[str, Any]):
+        self.stats["orders"] += 1
+        asset = request.get("asset")
+        opened = session.clock if session.clock is not None else time.time()
+        duration = float(request.get("time") or 60)
+        deal = {
+            "id": uuid.uuid4().hex,
+            "requestId": request.get("requestId"),
+            "asset": asset,
+            "amount": request.get("amount", 1),
+            "command": 0 if request.get("action") == "call" else 1,
+            "percentProfit": self.payout,
+            "openPrice": session.prices.get(asset, 0.0),
+            "openTimestamp": opened,
+            "closeTimestamp": opened + duration,
+            "isDemo": request.get("isDemo", 1),
+        }
+        heapq.heappush(session.orders, (opened + duration, next(session.sequence), deal))
+        await self._emit(session, "successopenOrder", deal)
+
+    async def _close_orders(self, session: _Session, until: float):
+        """Settle every order expiring at or before ``until`` against the last replayed price."""
+        closed = []
+        while session.orders and session.orders[0][0] <= until:
+            _, _, deal = heapq.heappop(session.orders)
+            price = session.prices.get(deal["asset"], deal["openPrice"])
+            move = (price - deal["openPrice"]) * (1 if deal["command"] == 0 else -1)
+            if move > 0:
+                profit = round(deal["amount"] * deal["percentProfit"] / 100, 2)
+            elif move < 0:
+                profit = -deal["amount"]
+            else:
+                profit = 0
+            closed.append(dict(deal, closePrice=price, profit=profit))
+        await self._emit(session, "successcloseOrder",
+                         {"profit": sum(deal["profit"] for deal in closed), "deals": closed})
@@ -1,6 +1,7 @@
 # Made by © Vigo Walker and © Alexandre Portner at Chipa
 
 import asyncio
+import concurrent.futures
 import threading
 import sys
 from tzlocal import get_localzone
@@ -11,7 +12,7 @@ from BinaryOptionsTools.platforms.pocketoption.api import PocketOptionAPI
 import time
 import logging
 import BinaryOptionsTools.platforms.pocketoption.global_value as global_value
-from collections import defaultdict
+from collections import defaultdict, deque
 # from pocketoptionapi.expiration import get_expiration_time, get_remaning_time
 import pandas as pd
 
@@ -34,7 +35,9 @@ def get_balance():
 class PocketOption:
     __version__ = "1.0.0"
 
-    def __init__(self, ssid,demo):
+    def __init__(self, ssid, demo, tick_capacity=10000, ohlc_cascade=False, candle_cache_bytes=64 * 1024 * 1024,
+                 candle_series_max=20000, warehouse=None, url=None,
+                 recorder=None):
         self.size = [1, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800,
                      3600, 7200, 14400, 28800, 43200, 86400, 604800, 2592000]
         global_value.SSID = ssid
@@ -54,14 +57,34 @@ class PocketOption:
             "User-Agent": r"Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
                           r"Chrome/66.0.3359.139 Safari/537.36"}
         self.SESSION_COOKIE = {}
-        self.api = PocketOptionAPI()
+        # url points the client at another server, e.g. a local ReplayServer; recorder logs
+        # every websocket frame (a FrameRecorder or a file path) for offline replay
+        self.api = PocketOptionAPI(tick_capacity=tick_capacity, url=url, recorder=recorder)
         self.loop = asyncio.get_event_loop()
         self.logger = logging.getLogger("PocketOption")
 
-        # Initialize OHLC aggregation system
+        # Initialize OHLC aggregation system; with ohlc_cascade coarser timeframes
+        # are rolled up from the finest subscribed one instead of re-reading ticks
         from .ohlc_aggregator import SubscriptionManager
-        self.ohlc_manager = SubscriptionManager()
+        self.ohlc_manager = SubscriptionManager(cascade=ohlc_cascade)
         self.ohlc_subscriptions = {}  # Track OHLC subscriptions
+        # The websocket client feeds ticks to the aggregator through the api object
+        self.api.ohlc_manager = self.ohlc_manager
+        self.api.ohlc_subscriptions = self.ohlc_subscriptions
+        self._scanner = None
+        # get_candles results shared between callers asking for the same history (0 disables)
+        from .candle_cache import CandleCache
+        self.candle_cache = CandleCache(candle_cache_bytes) if candle_cache_bytes else None
+        # Local history per (asset, period), repeated get_candles calls only download the new tail
+        self.candle_series_max = candle_series_max
+        self.candle_series = {}
+        self._series_lock = threading.Lock()
+        # Optional on-disk history (a CandleWarehouse or its directory): downloaded candles
+        # and completed OHLC candles of subscriptions are merged into it
+        from .candle_warehouse import CandleWarehouse
+        if isinstance(warehouse, str):
+            warehouse = CandleWarehouse(warehouse)
+        self.warehouse = warehouse
 
         #
 
@@ -85,10 +108,7 @@ class PocketOption:
 
     def get_async_order(self, buy_order_id):
         # name': 'position-changed', 'microserviceName': "portfolio"/"digital-options"
-        if self.api.order_async["deals"][0]["id"] == buy_order_id:
-            return self.api.order_async["deals"][0]
-        else:
-            return None
+        return self.api.deals.get(buy_order_id)
 
     def get_async_order_id(self, buy_order_id):
         return self.api.order_async["deals"][0][buy_order_id]
@@ -98,6 +118,12 @@ class PocketOption:
     def disconnect(self):
         """Gracefully close the WebSocket connection and clean up."""
         try:
+            if self._scanner is not None:
+                self._scanner.close()
+                self._scanner = None
+            if self.api.websocket_client.recorder is not None:
+                self.api.websocket_client.recorder.close()
+
             # Close the WebSocket connection
             if global_value.websocket_is_connected:
                 asyncio.run(self.api.close())  # Use the close method from the PocketOptionAPI class
@@ -196,72 +222,82 @@ class PocketOption:
         return pack[0]
     
     
-    def buy(self, amount, active, action, expirations):
-        self.api.buy_multi_option = {}
+    def buy(self, amount, active, action, expirations, timeout=5):
+        """
+        Place an order and wait for the server acknowledgement.
+
+        Each call uses its own requestId, so several orders can be in flight at
+        once from different threads without overwriting each other.
+
+        :param amount: The trade amount.
+        :param active: The asset, e.g. "EURUSD_otc".
+        :param action: "call" or "put".
+        :param expirations: The expiration in seconds.
+        :param timeout: Seconds to wait for the acknowledgement.
+        :return: (True, order id) on success, (False, None) otherwise.
+        """
         self.api.buy_successful = None
-        req_id = "buy"
+        req_id = self.api.pending_orders.new_id()
+        order = self.api.pending_orders.register(req_id)
 
         try:
-            if req_id not in self.api.buy_multi_option:
-                self.api.buy_multi_option[req_id] = {"id": None}
-            else:
-                self.api.buy_multi_option[req_id]["id"] = None
+            self.api.buyv3(amount, active, action, expirations, req_id)
+            order_data = order.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            logging.error("Unknown error occurred during buy operation")
+            return False, None
         except Exception as e:
-            logging.error(f"Error initializing buy_multi_option: {e}")
+            logging.error(f"Error sending buy order: {e}")
             return False, None
+        finally:
+            self.api.pending_orders.discard(req_id)
 
-        global_value.order_data = None
-        global_value.result = None
+        if "error" in order_data:
+            logging.error(order_data["error"])
+            self.api.buy_successful = False
+            return False, None
 
-        
+        global_value.result = True
+        self.api.buy_successful = True
+        return True, order_data.get("id", None)
 
-        self.api.buyv3(amount, active, action, expirations, req_id)
+    def check_win(self, id_number, timeout=120):
+        """Return amount of deals and win/lose status."""
 
-        start_t = time.time()
-        while True:
-            if global_value.result is not None and global_value.order_data is not None:
-                break
-            if time.time() - start_t >= 5:
-                if isinstance(global_value.order_data, dict) and "error" in global_value.order_data:
-                    logging.error(global_value.order_data["error"])
-                else:
-                    logging.error("Unknown error occurred during buy operation")
-                return False, None
-            time.sleep(0.1)  # Sleep for a short period to prevent busy-waiting
+        order_info = self.api.deals.wait(id_number, timeout=timeout)
+        if order_info is None:
+            logging.error("Timeout: Could not retrieve order info in time.")
+            return None, "unknown"
 
-        return global_value.result, global_value.order_data.get("id", None)
+        return self._deal_result(order_info)
 
-    def check_win(self, id_number):
-        """Return amount of deals and win/lose status."""
+    async def check_win_async(self, id_number, timeout=120):
+        """Awaitable version of :meth:`check_win`."""
 
-        start_t = time.time()
-        order_info = None
+        order_info = await self.api.deals.wait_async(id_number, timeout=timeout)
+        if order_info is None:
+            logging.error("Timeout: Could not retrieve order info in time.")
+            return None, "unknown"
 
-        while True:
-            try:
-                order_info = self.get_async_order(id_number)
-                if order_info and "id" in order_info and order_info["id"] is not None:
-                    break
-            except Exception as e:
-                self.logger.debug(f"CheckWin: error: {e}")
-                pass
-            # except Exception as e:
-            #    logging.error(f"Error retrieving order info: {e}")
+        return self._deal_result(order_info)
 
-            if time.time() - start_t >= 120:
-                logging.error("Timeout: Could not retrieve order info in time.")
-                return None, "unknown"
+    def on_trade_closed(self, id_number, callback):
+        """
+        Call ``callback(profit, status)`` once the deal settles, without blocking.
 
-            time.sleep(0.1)  # Sleep for a short period to prevent busy-waiting
+        The callback runs on the websocket thread, so it should return quickly.
+        """
+        return self.api.deals.add_callback(id_number, lambda deal: callback(*self._deal_result(deal)))
 
+    @staticmethod
+    def _deal_result(order_info):
         if order_info and "profit" in order_info:
-            status = "win" if order_info["profit"] > 0 else "lose"
             if order_info["profit"] > 0:
                 status = "win"
             elif order_info["profit"] == 0:
-                status == "draw"
+                status = "draw"
             else:
-                status == "loss"
+                status = "lose"
             return order_info["profit"], status
         else:
             logging.error("Invalid order info retrieved.")
@@ -274,7 +310,7 @@ class PocketOption:
         timestamp_redondeado = (timestamp // period) * period
         return int(timestamp_redondeado)
 
-    def get_candles(self, active, period, start_time=None, count=6000, count_request=1):
+    def get_candles(self, active, period, start_time=None, count=6000, count_request=1, use_cache=True):
         """
         Obtiene datos históricos de velas usando suscripción a candles y peticiones históricas.
         Devuelve un DataFrame ordenado de menor a mayor por la columna 'time'.
@@ -284,103 +320,117 @@ class PocketOption:
         :param count: El número de segundos a obtener en cada petición, max: 9000 = 150 datos de 1 min.
         :param start_time: El tiempo final para la última vela.
         :param count_request: El número de peticiones para obtener más datos históricos.
+        :param use_cache: Reutiliza velas ya descargadas: el resultado de una petición idéntica reciente
+            (válido durante un periodo) y la serie local del activo, de la que solo se pide la parte nueva.
         """
+        if start_time is None:
+            time_red = self.last_time(self.get_server_timestamp(), period)
+        else:
+            time_red = start_time
+
+        if not use_cache:
+            return self._download_candles(active, period, time_red, count, count_request)
+        if self.candle_cache is None:
+            return self._load_candles(active, period, time_red, count, count_request)
+        # Same asset, period, aligned end time and size: reuse the frame or join the download in flight
+        key = (active, period, time_red, count, count_request)
+        return self.candle_cache.get_or_fetch(
+            key, lambda: self._load_candles(active, period, time_red, count, count_request), ttl=period)
+
+    def _load_candles(self, active, period, time_red, count, count_request):
+        """Candles of get_candles, downloading only what the local series of (active, period) lacks."""
+        if not self.candle_series_max:
+            return self._download_candles(active, period, time_red, count, count_request)
+
+        key = (active, period)
+        window_start = time_red - count * count_request
+        series = self.candle_series.get(key)
+        if series is not None and not series.empty:
+            first = int(series.index[0].timestamp())
+            last = int(series.index[-1].timestamp())
+            # A request covers (time_red - count * count_request, time_red]
+            covers_start = first <= window_start + period
+            # The last stored candle may still have been in progress, so it is never served from the series
+            if covers_start and time_red < last:
+                return self._series_window(series, window_start, time_red)
+            if covers_start and time_red - last < count:
+                # Only the tail is missing; start at the last known candle, it may have been in progress
+                tail = self._download_candles(active, period, time_red, time_red - last + period, 1)
+                if not tail.empty and int(tail.index[0].timestamp()) <= last:
+                    series = self._store_series(key, tail)
+                    return self._series_window(series, window_start, time_red)
+                # The tail does not join the series (gap or failed request): download everything
+
+        df = self._download_candles(active, period, time_red, count, count_request)
+        if not df.empty:
+            self._store_series(key, df)
+        return df
+
+    def _store_series(self, key, df):
+        """Merge downloaded candles into the local series, newer values win."""
+        with self._series_lock:
+            series = self.candle_series.get(key)
+            if (series is None or series.empty or df.index[0] > series.index[-1] + pd.Timedelta(seconds=key[1])
+                    or df.index[-1] < series.index[0]):
+                # Nothing to join with: the download replaces the series
+                merged = df
+            else:
+                merged = pd.concat([series, df])
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+            merged = merged.iloc[-self.candle_series_max:]
+            self.candle_series[key] = merged
+            return merged
+
+    @staticmethod
+    def _series_window(series, window_start, time_red):
+        """Candles of a local series after ``window_start`` up to and including ``time_red``."""
+        start = pd.Timestamp(window_start, unit='s')
+        end = pd.Timestamp(time_red, unit='s')
+        return series[(series.index > start) & (series.index <= end)].copy()
+
+    def _download_candles(self, active, period, time_red, count, count_request):
+        """Request the history of get_candles from the server."""
+        # A live OHLC subscription on the asset already streams it and must outlive this download
+        owns_stream = active not in self.ohlc_subscriptions
         try:
             # Subscribe to candles for real-time data first
-            self.subscribe_candles(active)
-            
-            if start_time is None:
-                time_sync = self.get_server_timestamp()
-                time_red = self.last_time(time_sync, period)
+            if owns_stream:
+                self.subscribe_candles(active)
+
+            if period == 1 and self.api.ticks.count(active) > 0:
+                # Real-time ticks are a fallback for 1s candles, the server gets one short chance
+                all_candles = self._download_pages(active, period, time_red, count, count_request,
+                                                   timeout=0.1, max_retries=1)
+                if not all_candles:
+                    # Use real-time ticks as fallback, one 1s candle per tick
+                    print(f"Using real-time candle data for {active}")
+                    timestamps, prices = self.api.ticks.get_ticks(active, count // period)
+                    for timestamp, price in zip(timestamps.tolist(), prices.tolist()):
+                        all_candles.append({
+                            'time': int(timestamp),
+                            'open': price,
+                            'close': price,
+                            'high': price,
+                            'low': price,
+                            'volume': 0
+                        })
             else:
-                time_red = start_time
-                time_sync = self.get_server_timestamp()
-
-            all_candles = []
-            max_retries = 3
-            retry_delay = 0.5
-
-            for request_num in range(count_request):
-                self.api.history_data = None
-                retries = 0
-                
-                while retries < max_retries:
-                    try:
-                        # Send candle request
-                        self.api.getcandles(active, period, count, time_red)
-                        
-                        # Wait for history_data with improved timeout handling
-                        timeout_counter = 0
-                        max_timeout = 150  # Increased timeout for better reliability
-                        
-                        while self.api.history_data is None and timeout_counter < max_timeout:
-                            time.sleep(0.1)
-                            timeout_counter += 1
-                            
-                            # Check if we have real-time candle data available
-                            if (hasattr(self.api, 'real_time_candles') and
-                                active in self.api.real_time_candles and 
-                                period in self.api.real_time_candles[active] and
-                                len(self.api.real_time_candles[active][period]) > 0):
-                                
-                                # Use real-time candle data as fallback
-                                print(f"Using real-time candle data for {active}")
-                                real_time_data = list(self.api.real_time_candles[active][period].values())
-                                if real_time_data:
-                                    # Convert real-time data to the expected format
-                                    formatted_data = []
-                                    for candle in real_time_data[-min(len(real_time_data), count//period):]:
-                                        if isinstance(candle, dict):
-                                            formatted_data.append({
-                                                'time': candle.get('time', 0),
-                                                'open': candle.get('open', 0),
-                                                'close': candle.get('close', 0),
-                                                'high': candle.get('high', 0),
-                                                'low': candle.get('low', 0),
-                                                'volume': candle.get('volume', 0)
-                                            })
-                                    
-                                    if formatted_data:
-                                        all_candles.extend(formatted_data)
-                                        break
-
-                        if self.api.history_data is not None:
-                            all_candles.extend(self.api.history_data)
-                            break
-                        elif timeout_counter >= max_timeout:
-                            print(f"Timeout waiting for history data, attempt {retries + 1}/{max_retries}")
-                            retries += 1
-                            if retries < max_retries:
-                                time.sleep(retry_delay)
-                            else:
-                                print(f"Failed to get candles after {max_retries} attempts")
-                                break
-
-                    except Exception as e:
-                        print(f"Error in get_candles request {request_num + 1}: {e}")
-                        retries += 1
-                        if retries < max_retries:
-                            time.sleep(retry_delay)
-                        else:
-                            break
-
-                # Sort candles and update time_red for next request
-                if all_candles:
-                    all_candles = sorted(all_candles, key=lambda x: x.get("time", 0))
-                    # Use the earliest time for the next request
-                    time_red = all_candles[0]["time"]
+                # Replies are matched to their own request, so pages are requested concurrently
+                all_candles = self._download_pages(active, period, time_red, count, count_request)
 
             # Unsubscribe from candles to clean up
-            try:
-                self.unsubscribe_candles(active)
-            except:
-                pass
+            if owns_stream:
+                try:
+                    self.unsubscribe_candles(active)
+                except:
+                    pass
 
             if not all_candles:
                 print(f"No candles received for {active}")
                 return pd.DataFrame()
 
-            # Remove duplicates based on time
+            # Merge pages with a single sort, then remove duplicates based on time
+            all_candles.sort(key=lambda x: x.get("time", 0))
             unique_candles = []
             seen_times = set()
             for candle in all_candles:
@@ -407,18 +457,84 @@ class PocketOption:
             df_candles['time'] = pd.to_datetime(df_candles['time'], unit='s')
             df_candles.set_index('time', inplace=True)
             df_candles.index = df_candles.index.floor('1s')
+
+            if self.warehouse is not None:
+                # Only finished candles are persisted; the newest one may still be forming
+                stored = df_candles
+                if df_candles.index[-1] + pd.Timedelta(seconds=period) > pd.Timestamp(self.get_server_timestamp(), unit='s'):
+                    stored = df_candles.iloc[:-1]
+                try:
+                    self.warehouse.store_frame(active, period, stored)
+                except Exception as e:
+                    self.logger.warning(f"Error storing candles of {active} in the warehouse: {e}")
             
             return df_candles
             
         except Exception as e:
             print(f"Error in get_candles: {e}")
             # Ensure cleanup
-            try:
-                self.unsubscribe_candles(active)
-            except:
-                pass
+            if owns_stream:
+                try:
+                    self.unsubscribe_candles(active)
+                except:
+                    pass
             return pd.DataFrame()
 
+    def _download_pages(self, active, period, time_red, count, count_request, max_in_flight=4, timeout=15,
+                        max_retries=3):
+        """
+        Download ``count_request`` history pages of ``count`` seconds ending at ``time_red``, going back.
+        
+        Up to ``max_in_flight`` loadHistoryPeriod requests are outstanding at once; replies are
+        matched to their page by the request index, or by asset, period and time window when the
+        server does not echo it. Pages that time out are requested again.
+        
+        Returns:
+            Candle dictionaries of every page received, unsorted
+        """
+        pending = self.api.history_requests
+        ends = [time_red - page * count for page in range(count_request)]
+        queue = deque((end, 1) for end in ends)
+        in_flight = {}  # request index -> (page end, attempt, future, deadline)
+        pages = {}
+
+        while queue or in_flight:
+            while queue and len(in_flight) < max_in_flight:
+                end, attempt = queue.popleft()
+                request_id = pending.new_id()
+                future = pending.register(request_id, active, period, end, count)
+                try:
+                    self.api.getcandles(active, period, count, end, int(request_id))
+                except Exception as e:
+                    pending.discard(request_id)
+                    print(f"Error requesting candles ending at {end}: {e}")
+                    if attempt < max_retries:
+                        queue.append((end, attempt + 1))
+                    continue
+                in_flight[request_id] = (end, attempt, future, time.monotonic() + timeout)
+            if not in_flight:
+                continue
+
+            next_deadline = min(deadline for _, _, _, deadline in in_flight.values())
+            concurrent.futures.wait([future for _, _, future, _ in in_flight.values()],
+                                    timeout=max(next_deadline - time.monotonic(), 0),
+                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            now = time.monotonic()
+            for request_id, (end, attempt, future, deadline) in list(in_flight.items()):
+                if future.done():
+                    del in_flight[request_id]
+                    pages[end] = future.result() or []
+                elif deadline <= now:
+                    del in_flight[request_id]
+                    pending.discard(request_id)
+                    if attempt < max_retries:
+                        print(f"Timeout waiting for candles ending at {end}, attempt {attempt}/{max_retries}")
+                        queue.append((end, attempt + 1))
+                    else:
+                        print(f"Failed to get candles ending at {end} after {max_retries} attempts")
+
+        return [candle for end in ends for candle in pages.get(end, [])]
+
     @staticmethod
     def process_data_history(data, period):
         """
@@ -492,7 +608,8 @@ class PocketOption:
     def sync_datetime(self):
         return self.api.synced_datetime
 
-    def subscribe_candles(self, active, create_ohlc=False, timeframe_seconds=60, max_candles=1000, on_candle_complete=None):
+    def subscribe_candles(self, active, create_ohlc=False, timeframe_seconds=60, max_candles=1000, on_candle_complete=None,
+                          candle_storage="deque"):
         """
         Subscribe to candle data for a trading pair.
         
@@ -502,6 +619,8 @@ class PocketOption:
             timeframe_seconds: Timeframe for OHLC candles in seconds (default: 60)
             max_candles: Maximum number of OHLC candles to keep in memory
             on_candle_complete: Callback function called when an OHLC candle is completed
+            candle_storage: "deque" (default) or "array" to keep OHLC candles in NumPy
+                ring buffers, see get_ohlc_candles_array
             
         Returns:
             Result of candle subscription request
@@ -512,11 +631,15 @@ class PocketOption:
             
             # If OHLC aggregation is requested, set it up
             if create_ohlc:
+                candle_callback = on_candle_complete
+                if self.warehouse is not None:
+                    candle_callback = self.warehouse.live_writer(timeframe_seconds, on_candle_complete)
                 success = self.ohlc_manager.subscribe_candles_ohlc(
                     asset=active,
                     timeframe_seconds=timeframe_seconds,
                     max_candles=max_candles,
-                    on_candle_complete=on_candle_complete
+                    on_candle_complete=candle_callback,
+                    storage=candle_storage
                 )
                 
                 if success:
@@ -580,6 +703,25 @@ class PocketOption:
             self.logger.warning(f"Error getting OHLC candles for {active}: {e}")
             return []
     
+    def get_ohlc_candles_array(self, active, timeframe_seconds=60, count=None):
+        """
+        Get aggregated OHLC candles for a trading pair as a NumPy structured array.
+        
+        Args:
+            active: Trading pair (e.g., "AEDCNY_otc")
+            timeframe_seconds: Timeframe in seconds
+            count: Number of candles to return (None for all)
+            
+        Returns:
+            Structured array with time/open/high/low/close/volume/tick_count fields
+            (a copy, safe to keep while new candles complete)
+        """
+        try:
+            return self.ohlc_manager.get_candles_array(active, timeframe_seconds, count)
+        except Exception as e:
+            self.logger.warning(f"Error getting OHLC candles for {active}: {e}")
+            return None
+    
     def get_current_ohlc_candle(self, active, timeframe_seconds=60):
         """
         Get the current incomplete OHLC candle for a trading pair.
@@ -665,6 +807,55 @@ class PocketOption:
         except Exception as e:
             return {"error": f"Comprehensive analysis failed: {str(e)}"}
     
+    def scan_markets(self, assets, timeframes=(60,), num_candles=200, processes=None, fetch_workers=8,
+                     timeout=None, detailed=False):
+        """
+        Run the comprehensive analysis on many assets and timeframes at once.
+        
+        Candles are fetched on a thread pool and analysed in a process pool, which is
+        kept for the next scan until disconnect().
+        
+        Args:
+            assets: Trading pairs (e.g., ["EURUSD_otc", "GBPUSD_otc"])
+            timeframes: Candle periods in seconds
+            num_candles: Candles analysed per asset and timeframe
+            processes: Analysis processes (None for one per CPU, 0 to analyse in threads)
+            fetch_workers: Candle fetches running at the same time
+            timeout: Seconds the whole scan may take (None waits for everything)
+            detailed: Keep the full analysis of each pair in an "analysis" column
+            
+        Returns:
+            DataFrame ranked by signal strength, see BinaryOptionsTools.indicators.scanner
+        """
+        try:
+            from BinaryOptionsTools.indicators.scanner import MarketScanner
+            scanner = self._scanner
+            if scanner is None or scanner.processes != processes or scanner.fetch_workers != fetch_workers:
+                if scanner is not None:
+                    scanner.close()
+                scanner = self._scanner = MarketScanner(fetch=self._scan_candles, fetch_workers=fetch_workers,
+                                                        processes=processes)
+            return scanner.scan(assets, timeframes, num_candles, detailed=detailed, timeout=timeout)
+        except ImportError:
+            return {"error": "Technical analysis module not available"}
+        except Exception as e:
+            return {"error": f"Market scan failed: {str(e)}"}
+    
+    def _scan_candles(self, active, timeframe, num_candles):
+        """Candles for the scanner: live OHLC aggregates when there are enough, else history."""
+        candles = self.get_ohlc_candles_array(active, timeframe, num_candles)
+        if candles is not None and len(candles) >= num_candles:
+            return pd.DataFrame(candles)
+        # get_candles counts seconds, at most 9000 per request
+        seconds = num_candles * timeframe
+        df = self.get_candles(active, timeframe, count=min(seconds, 9000),
+                              count_request=max(1, -(-seconds // 9000)))
+        if df is None or df.empty:
+            return pd.DataFrame()
+        df = df.reset_index()
+        df['time'] = (df['time'] - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+        return df.iloc[-num_candles:]
+    
     # Individual Indicator Methods
     
     def get_sma(self, active="EURUSD_otc", timeframe=60, period=20, num_candles=50):
@@ -21,19 +21,22 @@ class GetCandles(Base):
 
     name = "sendMessage"
 
-    def __call__(self, active_id, interval, count, end_time):
+    def __call__(self, active_id, interval, count, end_time, index=None):
         """Method to send message to candles websocket chanel.
 
         :param active_id: The active/asset identifier.
         :param interval: The candle duration (timeframe for the candles).
         :param count: The number of candles you want to have
+        :param index: (optional) Request index echoed in the reply, generated when omitted.
+        :returns: The request index.
         """
 
         #      {"asset": "AUDNZD_otc", "index": 171201484810, "time": 1712002800, "offset": 9000, "period": 60}]
-        rand = str(random.randint(10, 99))
-        cu = int(time.time())
-        t = str(cu + (2 * 60 * 60))
-        index = int(t + rand)
+        if index is None:
+            rand = str(random.randint(10, 99))
+            cu = int(time.time())
+            t = str(cu + (2 * 60 * 60))
+            index = int(t + rand)
         data = {
             "asset": str(active_id),
             "index": index,
@@ -44,3 +47,4 @@ class GetCandles(Base):
 
         data = ["loadHistoryPeriod", data]
         self.send_websocket_request(self.name, data)
+        return index
@@ -1,4 +1,6 @@
 import asyncio
+import concurrent.futures
+import inspect
 
 import websockets
 import json
@@ -10,6 +12,10 @@ import BinaryOptionsTools.platforms.pocketoption.global_value as global_value
 from BinaryOptionsTools.platforms.pocketoption.constants import REGION
 from BinaryOptionsTools.platforms.pocketoption.ws.objects.timesync import TimeSync
 from BinaryOptionsTools.platforms.pocketoption.ws.objects.time_sync import TimeSynchronizer
+from BinaryOptionsTools.platforms.pocketoption.ws.decoder import (
+    HistoryPayload, decode_history, decode_json, decode_ticks, ticks_from_lists
+)
+from BinaryOptionsTools.platforms.pocketoption.ws.recorder import FrameRecorder
 
 import re
 
@@ -80,32 +86,45 @@ async def process_message(message):
 
 
 class WebsocketClient(object):
-    def __init__(self, api) -> None:
+    def __init__(self, api, url=None, recorder=None) -> None:
         """
         Inicializa el cliente WebSocket.
 
         :param api: Instancia de la clase PocketOptionApi
+        :param str url: (optional) Server to connect to instead of the PocketOption regions,
+            e.g. a local ReplayServer.
+        :param recorder: (optional) A :class:`FrameRecorder`, or the path of a file to record
+            every frame sent and received to.
         """
 
-        self.updateHistoryNew = None
-        self.updateStream = None
-        self.history_data_ready = None
-        self.successCloseOrder = False
         self.api = api
         self.message = None
         self.url = None
+        self.server_url = url
+        if isinstance(recorder, str):
+            recorder = FrameRecorder(recorder)
+        self.recorder = recorder
         self.ssid: str = global_value.SSID
         self.websocket: websockets.asyncio.client.ClientConnection = None
         self.region = REGION()
-        self.loop = asyncio.get_event_loop()
-        self.wait_second_message = False
-        self._updateClosedDeals = False
+        # Long-lived I/O loop owned by the client. It is driven by the websocket
+        # thread (see PocketOptionAPI.start_websocket) and every outgoing frame is
+        # handed to it through ``submit_message``.
+        self.loop = asyncio.new_event_loop()
+        self._outgoing: asyncio.Queue = asyncio.Queue()
         try:
             self.logger = self.api.logger
         except Exception as e:
             self.logger = logger
             self.logger.debug(f"Logger not found in api, creating new one, {e}")
 
+        # Event name of the last 451 header, i.e. whose binary payload comes next
+        self._pending_event = None
+        self.event_handlers = {}
+        self.payload_handlers = {}
+        self.payload_decoders = {}
+        self._register_default_handlers()
+
     async def websocket_listener(self, ws):
         try:
             async for message in ws:
@@ -125,7 +144,15 @@ class WebsocketClient(object):
             pass
 
         while not global_value.websocket_is_connected:
-            if global_value.IS_DEMO is False:
+            if self.server_url is not None:
+                # Plain ws:// servers (e.g. a local ReplayServer) take no TLS context
+                await self._run_connection(
+                    self.server_url,
+                    ssl=ssl_context if self.server_url.startswith("wss") else None,
+                    max_size=None
+                )
+                await asyncio.sleep(1)
+            elif global_value.IS_DEMO is False:
                 user_agent = get_user_agent(self.ssid)
                 if user_agent:
                     user_agent = user_agent["full"]
@@ -133,71 +160,93 @@ class WebsocketClient(object):
                     user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
                 for url in self.region.get_regions(True):
                     print(url)
-                    try:
-                        async with websockets.connect(
-                                url,
-                                ssl=ssl_context,
-                                extra_headers={"Origin": "https://pocketoption.com", "Cache-Control": "no-cache"},
-                                user_agent_header=user_agent
-                        ) as ws:
-
-                            # print("Connected a: ", url)
-                            self.websocket = ws
-                            self.url = url
-                            global_value.websocket_is_connected = True
-
-                            # Crear y ejecutar tareas
-                            # process_message_task = asyncio.create_task(process_message(self.message))
-                            on_message_task = asyncio.create_task(self.websocket_listener(ws))
-                            sender_task = asyncio.create_task(self.send_message(self.message))
-                            ping_task = asyncio.create_task(send_ping(ws))
-
-                            await asyncio.gather(on_message_task, sender_task, ping_task)
-
-                    except websockets.ConnectionClosed as e:
-                        global_value.websocket_is_connected = False
-                        await self.on_close(e)
-                        logger.warning("Trying another server")
-
-                    except Exception as e:
-                        global_value.websocket_is_connected = False
-                        await self.on_error(e)
+                    await self._run_connection(
+                        url,
+                        ssl=ssl_context,
+                        extra_headers={"Origin": "https://pocketoption.com", "Cache-Control": "no-cache"},
+                        user_agent_header=user_agent
+                    )
 
                 await asyncio.sleep(1)  # Esperar antes de intentar reconectar
             elif global_value.IS_DEMO:
-                try:
-                    async with websockets.connect(
-                            REGION.DEMO_REGION,
-                            ssl=ssl_context,
-                            extra_headers={"Origin": "https://pocketoption.com", "Cache-Control": "no-cache"},
-                            user_agent_header="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, "
-                                            "like Gecko) Chrome/124.0.0.0 Safari/537.36"
-                    ) as ws:
-
-                        # print("Connected a: ", url)
-                        self.websocket = ws
-                        self.url = REGION.DEMO_REGION
-                        global_value.websocket_is_connected = True
-
-                        # Crear y ejecutar tareas
-                        # process_message_task = asyncio.create_task(process_message(self.message))
-                        on_message_task = asyncio.create_task(self.websocket_listener(ws))
-                        sender_task = asyncio.create_task(self.send_message(self.message))
-                        ping_task = asyncio.create_task(send_ping(ws))
-
-                        await asyncio.gather(on_message_task, sender_task, ping_task)
-
-                except websockets.ConnectionClosed as e:
-                    global_value.websocket_is_connected = False
-                    await self.on_close(e)
-                    logger.warning("Trying another server")
-
-                except Exception as e:
-                    global_value.websocket_is_connected = False
-                    await self.on_error(e)
+                await self._run_connection(
+                    REGION.DEMO_REGION,
+                    ssl=ssl_context,
+                    extra_headers={"Origin": "https://pocketoption.com", "Cache-Control": "no-cache"},
+                    user_agent_header="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, "
+                                    "like Gecko) Chrome/124.0.0.0 Safari/537.36"
+                )
 
         return True
 
+    async def _run_connection(self, url, **kwargs):
+        """Connect to ``url`` and serve the connection (listener, sender and pings) until it ends."""
+        try:
+            async with websockets.connect(url, **kwargs) as ws:
+                if self.recorder is not None:
+                    ws = self.recorder.wrap(ws)
+
+                self.websocket = ws
+                self.url = url
+                global_value.websocket_is_connected = True
+
+                # Crear y ejecutar tareas
+                on_message_task = asyncio.create_task(self.websocket_listener(ws))
+                sender_task = asyncio.create_task(self.websocket_sender(ws))
+                ping_task = asyncio.create_task(send_ping(ws))
+                tasks = (on_message_task, sender_task, ping_task)
+
+                try:
+                    await asyncio.gather(*tasks)
+                finally:
+                    # gather leaves the others running when one fails; a stale
+                    # sender would keep draining frames meant for the next socket
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+
+        except websockets.ConnectionClosed as e:
+            global_value.websocket_is_connected = False
+            await self.on_close(e)
+            logger.warning("Trying another server")
+
+        except Exception as e:
+            global_value.websocket_is_connected = False
+            await self.on_error(e)
+
+    async def websocket_sender(self, ws):
+        """Drain the outgoing queue onto the socket, resolving each caller's future."""
+        while True:
+            message, future = await self._outgoing.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                await ws.send(message)
+            except asyncio.CancelledError:
+                future.set_exception(websockets.ConnectionClosed(None, None))
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                if isinstance(e, websockets.ConnectionClosed):
+                    raise
+                logger.warning(f"Error sending message: {e}")
+            else:
+                self.message = message
+                future.set_result(True)
+
+    def submit_message(self, message) -> concurrent.futures.Future:
+        """Queue a frame for sending from any thread.
+
+        The frame is written by the I/O loop as soon as a connection is up, so
+        messages submitted before connecting are flushed once it is established.
+
+        :param str message: The raw frame to send.
+        :returns: A :class:`concurrent.futures.Future` resolved once the frame is written.
+        """
+        future = concurrent.futures.Future()
+        self.loop.call_soon_threadsafe(self._outgoing.put_nowait, (message, future))
+        return future
+
     async def send_message(self, message):
         while global_value.websocket_is_connected is False:
             await asyncio.sleep(0.1)
@@ -229,158 +278,80 @@ class WebsocketClient(object):
     #                 # del mini key
     #                 del dict[key1][key2][sorted(dict[key1][key2].keys(), reverse=False)[0]]
 
+    def register_handler(self, event, on_payload=None, on_event=None, decoder=None):
+        """
+        Register handlers for a socket.io event.
+
+        PocketOption announces every binary event with a ``451-["<event>", ...]``
+        text frame and sends the data in the next binary frame. ``on_event`` is
+        called with the decoded header when it arrives and ``on_payload`` with
+        the decoded binary payload that follows it. Either may be a plain
+        function or a coroutine function.
+
+        :param str event: The event name, e.g. "updateStream".
+        :param on_payload: Handler for the binary payload.
+        :param on_event: Handler for the 451 header.
+        :param decoder: Callable turning the raw payload bytes into the object
+            passed to ``on_payload`` (defaults to plain JSON decoding).
+        """
+        if on_payload is not None:
+            self.payload_handlers[event] = on_payload
+        else:
+            self.payload_handlers.pop(event, None)
+        if on_event is not None:
+            self.event_handlers[event] = on_event
+        else:
+            self.event_handlers.pop(event, None)
+        if decoder is not None:
+            self.payload_decoders[event] = decoder
+        else:
+            self.payload_decoders.pop(event, None)
+
+    def _register_default_handlers(self):
+        self.register_handler("successauth", on_event=self._on_successauth)
+        self.register_handler("successupdateBalance", self._handle_balance, self._on_successupdate_balance)
+        self.register_handler("successopenOrder", self._handle_open_order, self._on_successopen_order)
+        self.register_handler("successcloseOrder", self._handle_close_order)
+        self.register_handler("updateClosedDeals", self._handle_closed_deals, self._on_update_closed_deals)
+        self.register_handler("loadHistoryPeriod", self._handle_history_period, decoder=decode_history)
+        self.register_handler("updateStream", self._handle_update_stream, decoder=decode_ticks)
+        self.register_handler("updateHistoryNew", self._handle_history_new)
+        self.register_handler("updateAssets", self._handle_assets)
+
     async def on_message(self, message):  # pylint: disable=unused-argument
         """Method to process websocket messages."""
         # global_value.ssl_Mutual_exclusion = True
         self.logger.debug(message)
 
         if type(message) is bytes:
-            message2 = message.decode('utf-8')
-            message = message.decode('utf-8')
-            message = json.loads(message)
-
-            # print(message, type(message))
-            if "balance" in message:
-                if "uid" in message:
-                    global_value.balance_id = message["uid"]
-                global_value.balance = message["balance"]
-                global_value.balance_type = message["isDemo"]
-
-            elif "requestId" in message and message["requestId"] == 'buy':
-                global_value.order_data = message
-
-            elif self.wait_second_message and isinstance(message, list):
-                self.wait_second_message = False  # Restablecer para futuros mensajes
-                self._updateClosedDeals = False  # Restablecer el estado
-
-            elif isinstance(message, dict) and self.successCloseOrder:
-                self.api.order_async = message
-                self.successCloseOrder = False  # Restablecer para futuros mensajes
-
-            elif self.history_data_ready and isinstance(message, dict):
-                self.history_data_ready = False
-                # Enhanced parsing for candle data
-                if "data" in message:
-                    data = message["data"]
-                    # Check if data contains candles in the format you provided
-                    if isinstance(data, dict) and "candles" in data:
-                        # Convert candles format: [timestamp, open, close, high, low] to standard format
-                        candles = data["candles"]
-                        formatted_candles = []
-                        
-                        self.logger.debug(f"Processing {len(candles)} candles from historical data")
-                        
-                        for candle in candles:
-                            if len(candle) >= 5:
-                                formatted_candle = {
-                                    "time": int(candle[0]) if candle[0] else 0,
-                                    "open": float(candle[1]) if candle[1] else 0.0,
-                                    "close": float(candle[2]) if candle[2] else 0.0,
-                                    "high": float(candle[3]) if candle[3] else 0.0,
-                                    "low": float(candle[4]) if candle[4] else 0.0,
-                                    "volume": 0
-                                }
-                                formatted_candles.append(formatted_candle)
-                            else:
-                                self.logger.warning(f"Skipping incomplete candle data: {candle}")
-                        
-                        self.api.history_data = formatted_candles
-                        self.logger.debug(f"Stored {len(formatted_candles)} formatted candles")
-                        
-                        # Also store asset and period info if available
-                        if "asset" in data:
-                            self.api.last_candle_asset = data["asset"]
-                        if "period" in data:
-                            self.api.last_candle_period = data["period"]
-                    
-                    # Handle alternative format where candles might be directly in data
-                    elif isinstance(data, list) and len(data) > 0 and isinstance(data[0], list):
-                        # Check if this looks like candle data [timestamp, open, close, high, low]
-                        formatted_candles = []
-                        for candle in data:
-                            if len(candle) >= 5:
-                                formatted_candle = {
-                                    "time": int(candle[0]) if candle[0] else 0,
-                                    "open": float(candle[1]) if candle[1] else 0.0,
-                                    "close": float(candle[2]) if candle[2] else 0.0,
-                                    "high": float(candle[3]) if candle[3] else 0.0,
-                                    "low": float(candle[4]) if candle[4] else 0.0,
-                                    "volume": 0
-                                }
-                                formatted_candles.append(formatted_candle)
-                        
-                        if formatted_candles:
-                            self.api.history_data = formatted_candles
-                            self.logger.debug(f"Stored {len(formatted_candles)} candles from direct data array")
-                    else:
-                        # Fallback to original data format
-                        self.api.history_data = data
-                        self.logger.debug("Using fallback data format")
-                else:
-                    self.api.history_data = message
-                    self.logger.debug("Storing raw message as history data")
-
-            elif self.updateStream and isinstance(message, list):
-                self.updateStream = False
-                self.api.time_sync.server_timestamp = message[0][1]
-
-            elif self.updateHistoryNew and isinstance(message, dict):
-                self.updateHistoryNew = False
-                self.api.historyNew = message
-            
-            # Handle real-time candle streaming data
-            elif isinstance(message, list) and len(message) > 0:
-                # Check for real-time candle format: [["ASSET", timestamp, price]]
-                processed_items = 0
-                for item in message:
-                    if isinstance(item, list) and len(item) >= 3:
-                        try:
-                            asset = str(item[0])
-                            timestamp = int(item[1]) if item[1] else 0
-                            price = float(item[2]) if item[2] else 0.0
-                            
-                            # Store in real_time_candles for fallback use
-                            if hasattr(self.api, 'real_time_candles'):
-                                if asset not in self.api.real_time_candles:
-                                    self.api.real_time_candles[asset] = {}
-                                
-                                # Assume 1-second period for real-time data
-                                period = 1
-                                if period not in self.api.real_time_candles[asset]:
-                                    self.api.real_time_candles[asset][period] = {}
-                                
-                                # Create candle entry
-                                candle_data = {
-                                    "time": timestamp,
-                                    "open": price,
-                                    "close": price,
-                                    "high": price,
-                                    "low": price,
-                                    "volume": 0
-                                }
-                                
-                                self.api.real_time_candles[asset][period][timestamp] = candle_data
-                                processed_items += 1
-                            
-                            # Feed to OHLC aggregator if available
-                            if hasattr(self.api, 'ohlc_manager') and asset in getattr(self.api, 'ohlc_subscriptions', {}):
-                                self.api.ohlc_manager.process_tick(asset, timestamp, price)
-                            
-                        except (ValueError, IndexError, TypeError) as e:
-                            self.logger.warning(f"Error processing real-time item {item}: {e}")
-                
-                if processed_items > 0:
-                    self.logger.debug(f"Processed {processed_items} real-time candle items")
-            
-            elif '[[5,"#AAPL","Apple","stock' in message2:
-                global_value.PayoutData = message2
+            event, self._pending_event = self._pending_event, None
+            handler = self.payload_handlers.get(event, self._handle_unrouted)
+            decode = self.payload_decoders.get(event, decode_json)
+            try:
+                payload = decode(message)
+            except ValueError as e:
+                self.logger.warning(f"Could not decode payload for {event}: {e}")
+                return
+            result = handler(payload)
+            if inspect.isawaitable(result):
+                await result
             return
 
-        else:
-            pass
-            # print(message)
+        if message.startswith('451-['):
+            json_part = message.split("-", 1)[1]  # Eliminar el prefijo numérico y el guion para obtener el JSON válido
 
-        if message.startswith('0') and "sid" in message:
+            # Convertir la parte JSON a un objeto Python
+            header = json.loads(json_part)
+            event = header[0]
+            # The data for this event arrives in the next binary frame
+            self._pending_event = event
+            handler = self.event_handlers.get(event)
+            if handler is not None:
+                result = handler(header)
+                if inspect.isawaitable(result):
+                    await result
+
+        elif message.startswith('0') and "sid" in message:
             await self.websocket.send("40")
 
         elif message == "2":
@@ -389,46 +360,181 @@ class WebsocketClient(object):
         elif "40" in message and "sid" in message:
             await self.websocket.send(self.ssid)
 
-        elif message.startswith('451-['):
-            json_part = message.split("-", 1)[1]  # Eliminar el prefijo numérico y el guion para obtener el JSON válido
-
-            # Convertir la parte JSON a un objeto Python
-            message = json.loads(json_part)
-
-            if message[0] == "successauth":
-                await on_open()
-
-            elif message[0] == "successupdateBalance":
-                global_value.balance_updated = True
-            elif message[0] == "successopenOrder":
-                global_value.result = True
-
-                # Si es el primer mensaje de interés
-            elif message[0] == "updateClosedDeals":
-                # Establecemos que hemos recibido el primer mensaje de interés
-                self._updateClosedDeals = True
-                self.wait_second_message = True  # Establecemos que esperamos el segundo mensaje de interés
-                await self.websocket.send('42["changeSymbol",{"asset":"AUDNZD_otc","period":60}]')
-
-            elif message[0] == "successcloseOrder":
-                self.successCloseOrder = True
-                self.wait_second_message = True  # Establecemos que esperamos el segundo mensaje de interés
-
-            elif message[0] == "loadHistoryPeriod":
-                self.history_data_ready = True
-
-            elif message[0] == "updateStream":
-                self.updateStream = True
-
-            elif message[0] == "updateHistoryNew":
-                self.updateHistoryNew = True
-                # self.api.historyNew = None
-
         elif message.startswith("42") and "NotAuthorized" in message:
             self.logger.error("User not Authorized: Please Change SSID for one valid")
             global_value.ssl_Mutual_exclusion = False
             await self.websocket.close()
 
+    # ------------------------------------------------------------------
+    # 451 header handlers
+    # ------------------------------------------------------------------
+
+    async def _on_successauth(self, header):
+        await on_open()
+
+    def _on_successupdate_balance(self, header):
+        global_value.balance_updated = True
+
+    def _on_successopen_order(self, header):
+        global_value.result = True
+
+    async def _on_update_closed_deals(self, header):
+        await self.websocket.send('42["changeSymbol",{"asset":"AUDNZD_otc","period":60}]')
+
+    # ------------------------------------------------------------------
+    # Binary payload handlers
+    # ------------------------------------------------------------------
+
+    def _handle_balance(self, message):
+        if isinstance(message, dict) and "balance" in message:
+            if "uid" in message:
+                global_value.balance_id = message["uid"]
+            global_value.balance = message["balance"]
+            global_value.balance_type = message["isDemo"]
+
+    def _handle_open_order(self, message):
+        if isinstance(message, dict) and "requestId" in message:
+            global_value.order_data = message
+            self.api.pending_orders.resolve(message["requestId"], message)
+
+    def _handle_close_order(self, message):
+        if isinstance(message, dict):
+            self.api.order_async = message
+            self.api.deals.add_closed_many(message.get("deals", []))
+
+    def _handle_closed_deals(self, message):
+        if isinstance(message, list):
+            self.api.deals.add_closed_many(message)
+
+    def _handle_history_new(self, message):
+        if isinstance(message, dict):
+            self.api.historyNew = message
+
+    def _handle_assets(self, message):
+        global_value.PayoutData = json.dumps(message)
+
+    def _handle_update_stream(self, ticks):
+        if ticks:
+            self.api.time_sync.server_timestamp = ticks[-1].timestamp
+            self._handle_ticks(ticks)
+
+    def _handle_history_period(self, message):
+        if HistoryPayload is not None and isinstance(message, HistoryPayload):
+            # Typed fast path: values are already floats
+            data = message.data
+            self.api.history_data = [
+                {"time": int(c[0]), "open": c[1], "close": c[2], "high": c[3], "low": c[4], "volume": 0}
+                for c in data.candles if len(c) >= 5
+            ]
+            self.logger.debug(f"Stored {len(self.api.history_data)} formatted candles")
+            if data.asset is not None:
+                self.api.last_candle_asset = data.asset
+            if data.period is not None:
+                self.api.last_candle_period = data.period
+            index = data.index if data.index is not None else message.index
+            self._deliver_history(index, self.api.history_data, data.asset, data.period)
+            return
+        if not isinstance(message, dict):
+            return
+        # Enhanced parsing for candle data
+        if "data" in message:
+            data = message["data"]
+            # Check if data contains candles in the format you provided
+            if isinstance(data, dict) and "candles" in data:
+                # Convert candles format: [timestamp, open, close, high, low] to standard format
+                candles = data["candles"]
+                self.logger.debug(f"Processing {len(candles)} candles from historical data")
+
+                formatted_candles = self._format_candles(candles)
+
+                self.api.history_data = formatted_candles
+                self.logger.debug(f"Stored {len(formatted_candles)} formatted candles")
+
+                # Also store asset and period info if available
+                if "asset" in data:
+                    self.api.last_candle_asset = data["asset"]
+                if "period" in data:
+                    self.api.last_candle_period = data["period"]
+                self._deliver_history(data.get("index", message.get("index")), formatted_candles,
+                                      data.get("asset"), data.get("period"))
+
+            # Handle alternative format where candles might be directly in data
+            elif isinstance(data, list) and len(data) > 0 and isinstance(data[0], list):
+                # Check if this looks like candle data [timestamp, open, close, high, low]
+                formatted_candles = self._format_candles(data)
+
+                if formatted_candles:
+                    self.api.history_data = formatted_candles
+                    self.logger.debug(f"Stored {len(formatted_candles)} candles from direct data array")
+                    self._deliver_history(message.get("index"), formatted_candles)
+            else:
+                # Fallback to original data format
+                self.api.history_data = data
+                self.logger.debug("Using fallback data format")
+        else:
+            self.api.history_data = message
+            self.logger.debug("Storing raw message as history data")
+
+    def _deliver_history(self, index, candles, asset=None, period=None):
+        """Hand candles to the history request they answer, matched by index, asset and period."""
+        history_requests = getattr(self.api, "history_requests", None)
+        if history_requests is not None and not history_requests.deliver(candles, index, asset, period):
+            self.logger.debug(f"No pending history request for index={index} asset={asset} period={period}")
+
+    def _format_candles(self, candles):
+        formatted_candles = []
+        for candle in candles:
+            if len(candle) >= 5:
+                formatted_candles.append({
+                    "time": int(candle[0]) if candle[0] else 0,
+                    "open": float(candle[1]) if candle[1] else 0.0,
+                    "close": float(candle[2]) if candle[2] else 0.0,
+                    "high": float(candle[3]) if candle[3] else 0.0,
+                    "low": float(candle[4]) if candle[4] else 0.0,
+                    "volume": 0
+                })
+            else:
+                self.logger.warning(f"Skipping incomplete candle data: {candle}")
+        return formatted_candles
+
+    def _handle_ticks(self, ticks):
+        # Real-time ticks, decoded from [["ASSET", timestamp, price], ...]
+        processed_items = 0
+        ohlc_subscriptions = getattr(self.api, 'ohlc_subscriptions', {})
+        tick_store = getattr(self.api, 'ticks', None)
+        ohlc_batch = []
+        for tick in ticks:
+            asset = tick.asset
+            price = tick.price
+
+            # Keep the raw tick in the bounded store for fallback use
+            if tick_store is not None:
+                tick_store.add_tick(asset, tick.timestamp, price)
+                processed_items += 1
+
+            if asset in ohlc_subscriptions:
+                ohlc_batch.append((asset, int(tick.timestamp), price))
+
+        # Feed the whole frame to the OHLC aggregator at once
+        if ohlc_batch:
+            self.api.ohlc_manager.process_ticks(ohlc_batch)
+
+        if processed_items > 0:
+            self.logger.debug(f"Processed {processed_items} real-time ticks")
+
+    def _handle_unrouted(self, message):
+        """Fallback for binary payloads without a registered event handler."""
+        if isinstance(message, dict):
+            if "balance" in message:
+                self._handle_balance(message)
+            elif "requestId" in message and message["requestId"] in self.api.pending_orders:
+                self._handle_open_order(message)
+        elif isinstance(message, list) and message:
+            if isinstance(message[0], list) and len(message[0]) > 3 and message[0][1] == "#AAPL":
+                self._handle_assets(message)
+            else:
+                self._handle_ticks(ticks_from_lists(message))
+
     async def on_error(self, error):  # pylint: disable=unused-argument
         logger.error(error)
         global_value.websocket_error_reason = str(error)
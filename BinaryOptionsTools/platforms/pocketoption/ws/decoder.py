@@ -0,0 +1,104 @@
+"""
+Payload decoders for PocketOption websocket binary frames.
+
+Payloads are decoded with msgspec when it is installed, using typed structs
+for the hot paths (ticks and history candles). Without msgspec every decoder
+falls back to the standard json module and produces the same shapes.
+"""
+
+import json
+import logging
+from typing import Any, List, NamedTuple, Optional
+
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+if MSGSPEC_AVAILABLE:
+    class Tick(msgspec.Struct, array_like=True, frozen=True):
+        """A real-time tick, sent as ``[asset, timestamp, price]``."""
+        asset: str
+        timestamp: float
+        price: float
+
+    class HistoryData(msgspec.Struct):
+        """The ``data`` object of a loadHistoryPeriod reply."""
+        candles: List[List[float]]
+        asset: Optional[str] = None
+        period: Optional[int] = None
+        index: Optional[int] = None
+
+    class HistoryPayload(msgspec.Struct):
+        """A loadHistoryPeriod reply whose candles are ``[time, open, close, high, low]`` rows."""
+        data: HistoryData
+        index: Optional[int] = None
+
+    _generic_decoder = msgspec.json.Decoder()
+    _ticks_decoder = msgspec.json.Decoder(List[Tick])
+    _history_decoder = msgspec.json.Decoder(HistoryPayload)
+
+else:
+    class Tick(NamedTuple):
+        """A real-time tick, sent as ``[asset, timestamp, price]``."""
+        asset: str
+        timestamp: float
+        price: float
+
+    HistoryPayload = None
+
+
+def decode_json(raw: bytes) -> Any:
+    """Decode any payload into plain Python objects."""
+    if MSGSPEC_AVAILABLE:
+        return _generic_decoder.decode(raw)
+    return json.loads(raw)
+
+
+def ticks_from_lists(rows: list) -> List[Tick]:
+    """Convert ``[asset, timestamp, price]`` rows to ticks, skipping malformed rows."""
+    ticks = []
+    for item in rows:
+        if isinstance(item, list) and len(item) >= 3:
+            try:
+                ticks.append(Tick(
+                    str(item[0]),
+                    float(item[1]) if item[1] else 0.0,
+                    float(item[2]) if item[2] else 0.0
+                ))
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Error processing real-time item {item}: {e}")
+    return ticks
+
+
+def decode_ticks(raw: bytes) -> List[Tick]:
+    """Decode an updateStream payload into a list of :class:`Tick`."""
+    if MSGSPEC_AVAILABLE:
+        try:
+            return _ticks_decoder.decode(raw)
+        except msgspec.ValidationError:
+            # Odd rows (nulls, short rows): take the tolerant path below
+            pass
+    message = decode_json(raw)
+    if not isinstance(message, list):
+        return []
+    return ticks_from_lists(message)
+
+
+def decode_history(raw: bytes) -> Any:
+    """Decode a loadHistoryPeriod payload.
+
+    Returns a :class:`HistoryPayload` when the reply has the usual candle
+    layout and msgspec is available, otherwise the plain decoded message.
+    """
+    if MSGSPEC_AVAILABLE:
+        try:
+            return _history_decoder.decode(raw)
+        except msgspec.ValidationError:
+            pass
+    return decode_json(raw)
+
@@ -0,0 +1,149 @@
+"""Module for Pocket Option closed deals websocket object."""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from collections import OrderedDict
+
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.base import Base
+
+
+class Deals(Base):
+    """Class for Pocket Option settled deals.
+
+    Closed deals pushed by the server (``successcloseOrder`` and
+    ``updateClosedDeals``) are indexed by deal id. Code interested in a trade
+    result can block on :meth:`wait`, register a callback with
+    :meth:`add_callback` or await :meth:`wait_async`; no polling thread is
+    needed per open position.
+    """
+
+    def __init__(self, max_closed=10000):
+        """
+        :param int max_closed: Number of closed deals kept for late lookups.
+        """
+        super(Deals, self).__init__()
+        self.__name = "deals"
+        self.__max_closed = max_closed
+        self.__closed = OrderedDict()
+        self.__waiters = {}
+        self.__lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def name(self):
+        """Property to get websocket object name.
+
+        :returns: The name of websocket object.
+        """
+        return self.__name
+
+    def add_closed(self, deal):
+        """Method to record a closed deal and wake everything waiting on it.
+
+        :param dict deal: The deal payload, must contain an ``id``.
+        :returns: True if the deal was recorded.
+        """
+        if not isinstance(deal, dict) or deal.get("id") is None:
+            return False
+
+        deal_id = str(deal["id"])
+        with self.__lock:
+            self.__closed[deal_id] = deal
+            self.__closed.move_to_end(deal_id)
+            while len(self.__closed) > self.__max_closed:
+                self.__closed.popitem(last=False)
+            waiters = self.__waiters.pop(deal_id, [])
+
+        for future in waiters:
+            if not future.done():
+                future.set_result(deal)
+        return True
+
+    def add_closed_many(self, deals):
+        """Method to record a batch of closed deals.
+
+        :param list deals: The deal payloads.
+        :returns: The number of deals recorded.
+        """
+        return sum(1 for deal in deals if self.add_closed(deal))
+
+    def get(self, deal_id):
+        """Method to get a closed deal without waiting.
+
+        :returns: The deal payload or None if it has not closed yet.
+        """
+        with self.__lock:
+            return self.__closed.get(str(deal_id))
+
+    def future(self, deal_id):
+        """Method to get a future resolved with the deal once it closes.
+
+        :returns: A :class:`concurrent.futures.Future`.
+        """
+        future = concurrent.futures.Future()
+        deal_id = str(deal_id)
+        with self.__lock:
+            deal = self.__closed.get(deal_id)
+            if deal is None:
+                self.__waiters.setdefault(deal_id, []).append(future)
+        if deal is not None:
+            future.set_result(deal)
+        return future
+
+    def wait(self, deal_id, timeout=None):
+        """Method to block until a deal closes.
+
+        :param deal_id: The deal id returned by ``buy``.
+        :param timeout: Seconds to wait, None to wait forever.
+        :returns: The deal payload or None on timeout.
+        """
+        future = self.future(deal_id)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            self.__discard(deal_id, future)
+            return None
+
+    async def wait_async(self, deal_id, timeout=None):
+        """Coroutine resolved with the deal once it closes, None on timeout."""
+        future = self.future(deal_id)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self.__discard(deal_id, future)
+            return None
+
+    def add_callback(self, deal_id, callback):
+        """Method to call ``callback(deal)`` once the deal closes.
+
+        The callback runs on the thread that delivers the deal (usually the
+        websocket thread), or immediately if the deal is already closed.
+        """
+        def _done(future):
+            if future.cancelled():
+                return
+            try:
+                callback(future.result())
+            except Exception as e:
+                self.logger.error(f"Error in deal callback for {deal_id}: {e}")
+
+        future = self.future(deal_id)
+        future.add_done_callback(_done)
+        return future
+
+    def pending_count(self):
+        """Method to get the number of deals with someone waiting on them."""
+        with self.__lock:
+            return len(self.__waiters)
+
+    def __discard(self, deal_id, future):
+        deal_id = str(deal_id)
+        with self.__lock:
+            waiters = self.__waiters.get(deal_id)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self.__waiters[deal_id]
+        future.cancel()
@@ -0,0 +1,110 @@
+"""Module for Pocket Option history requests websocket object."""
+
+import concurrent.futures
+
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.pending import RequestRegistry
+
+
+class HistoryRequest(object):
+    """A loadHistoryPeriod request waiting for its candles."""
+
+    __slots__ = ("index", "asset", "period", "end_time", "offset", "future")
+
+    def __init__(self, index, asset, period, end_time, offset):
+        self.index = str(index)
+        self.asset = asset
+        self.period = period
+        self.end_time = end_time
+        self.offset = offset
+        self.future = concurrent.futures.Future()
+
+    def covers(self, timestamp):
+        """Whether a candle time falls inside the requested window."""
+        return self.end_time - self.offset < timestamp <= self.end_time
+
+
+class HistoryRequests(RequestRegistry):
+    """Class for Pocket Option loadHistoryPeriod requests waiting for a reply.
+
+    Every request gets a :class:`concurrent.futures.Future` resolved with the
+    candles of its own reply. Replies are matched by the echoed request index;
+    replies without one are matched by asset and period and, when several
+    requests for the same asset and period are open, by the time window their
+    candles fall in. Overlapping history requests therefore never receive each
+    other's candles.
+    """
+
+    def __init__(self, name="historyRequests"):
+        super(HistoryRequests, self).__init__(name)
+
+    def register(self, index, asset=None, period=None, end_time=None, offset=None):
+        """Method to register a request before it is sent.
+
+        :param index: The request index sent to the server.
+        :param str asset: The requested asset.
+        :param int period: The candle period in seconds.
+        :param int end_time: The ``time`` of the request.
+        :param int offset: The ``offset`` of the request, in seconds.
+        :returns: The future resolved with the candles of the reply.
+        """
+        request = HistoryRequest(index, asset, period, end_time, offset)
+        self._add(request.index, request)
+        return request.future
+
+    def _future(self, entry):
+        return entry.future
+
+    def _match(self, index, asset, period, candles):
+        if index is not None and str(index) in self._requests:
+            return self._requests[str(index)]
+        candidates = [
+            request for request in self._requests.values()
+            if (asset is None or request.asset is None or request.asset == asset)
+            and (period is None or request.period is None or request.period == period)
+        ]
+        if index is not None or not candidates:
+            # An index we did not send (or no longer wait for) belongs to somebody else
+            return None
+        if len(candidates) > 1 and (asset is None or period is None):
+            # Without asset and period the reply can only be attributed when it is unambiguous
+            return None
+        if len(candidates) > 1 and candles:
+            first_time, last_time = _candle_time(candles[0]), _candle_time(candles[-1])
+            windowed = [r for r in candidates if r.end_time is not None and r.offset is not None]
+            in_window = [r for r in windowed if first_time is not None and last_time is not None
+                         and r.covers(first_time) and r.covers(last_time)]
+            if in_window:
+                # Same end time, different sizes: the tightest window that holds every candle
+                return min(in_window, key=lambda r: r.offset)
+            in_window = [r for r in windowed if last_time is not None and r.covers(last_time)]
+            if in_window:
+                candidates = in_window
+        # Oldest matching request first, replies come back roughly in order
+        return candidates[0]
+
+    def deliver(self, candles, index=None, asset=None, period=None):
+        """Method to deliver a reply to the request it answers.
+
+        :param list candles: The candles of the reply.
+        :param index: The request index echoed by the server, if any.
+        :param str asset: The asset of the reply, if known.
+        :param int period: The period of the reply, if known.
+        :returns: True if a waiting request was found.
+        """
+        with self._lock:
+            request = self._match(index, asset, period, candles)
+            if request is None:
+                return False
+            del self._requests[request.index]
+        if request.future.done():
+            return False
+        request.future.set_result(candles)
+        return True
+
+
+def _candle_time(candle):
+    if isinstance(candle, dict):
+        return candle.get("time")
+    if isinstance(candle, (list, tuple)) and candle:
+        return candle[0]
+    return None
@@ -0,0 +1,112 @@
+"""Module for Pocket Option pending requests websocket object."""
+
+import concurrent.futures
+import itertools
+import threading
+import time
+
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.base import Base
+
+
+class RequestRegistry(Base):
+    """Base class for requests waiting for a server reply.
+
+    Requests are kept under the id sent to the server, as a string, behind one
+    lock. Subclasses decide what is stored per request and how replies find it;
+    :meth:`_future` gives the future a stored entry resolves.
+    """
+
+    def __init__(self, name):
+        super(RequestRegistry, self).__init__()
+        self.__name = name
+        self._requests = {}
+        self._lock = threading.Lock()
+        self.__counter = itertools.count(int(time.time() * 1000))
+
+    @property
+    def name(self):
+        """Property to get websocket object name.
+
+        :returns: The name of websocket object.
+        """
+        return self.__name
+
+    def new_id(self):
+        """Method to generate a request id unique for this process.
+
+        :returns: The request id.
+        """
+        return str(next(self.__counter))
+
+    def _add(self, request_id, entry):
+        with self._lock:
+            self._requests[str(request_id)] = entry
+
+    def _pop(self, request_id):
+        with self._lock:
+            return self._requests.pop(str(request_id), None)
+
+    def _future(self, entry):
+        return entry
+
+    def discard(self, request_id):
+        """Method to forget a request, e.g. after its waiter timed out."""
+        entry = self._pop(request_id)
+        if entry is not None:
+            self._future(entry).cancel()
+
+    def __contains__(self, request_id):
+        with self._lock:
+            return str(request_id) in self._requests
+
+    def __len__(self):
+        with self._lock:
+            return len(self._requests)
+
+
+class PendingRequests(RequestRegistry):
+    """Class for Pocket Option requests waiting for a server reply.
+
+    Every request is registered under a unique id and gets a
+    :class:`concurrent.futures.Future` that the websocket dispatcher resolves
+    with the matching reply, so any number of requests can be in flight at once.
+    """
+
+    def __init__(self, name="pendingRequests"):
+        super(PendingRequests, self).__init__(name)
+
+    def register(self, request_id):
+        """Method to register a request before it is sent.
+
+        :param request_id: The request id sent to the server.
+        :returns: The future resolved with the server reply.
+        """
+        future = concurrent.futures.Future()
+        self._add(request_id, future)
+        return future
+
+    def resolve(self, request_id, result):
+        """Method to deliver a server reply to its request.
+
+        :param request_id: The request id echoed by the server.
+        :param result: The reply payload.
+        :returns: True if a waiting request was found.
+        """
+        future = self._pop(request_id)
+        if future is None or future.done():
+            return False
+        future.set_result(result)
+        return True
+
+    def fail(self, request_id, error):
+        """Method to fail a request with an exception.
+
+        :param request_id: The request id.
+        :param Exception error: The exception raised to the waiter.
+        :returns: True if a waiting request was found.
+        """
+        future = self._pop(request_id)
+        if future is None or future.done():
+            return False
+        future.set_exception(error)
+        return True
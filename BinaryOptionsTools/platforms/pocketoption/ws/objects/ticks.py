@@ -0,0 +1,158 @@
+"""Module for Pocket Option real-time ticks websocket object."""
+
+import threading
+
+import numpy as np
+
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.base import Base
+
+
+class TickBuffer(object):
+    """Fixed-capacity ring buffer of (timestamp, price) ticks for one asset.
+
+    Columns are preallocated NumPy arrays of twice the capacity and every tick
+    is written to both halves, so the latest ``n`` ticks always form one
+    contiguous slice that is copied out with a single slice copy per column.
+    Readers get copies: once the buffer is full every append overwrites the
+    oldest slot, so a view would change under a reader on another thread.
+    """
+
+    __slots__ = ("capacity", "_timestamps", "_prices", "_head", "_size", "_lock")
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._timestamps = np.zeros(2 * capacity, dtype=np.float64)
+        self._prices = np.zeros(2 * capacity, dtype=np.float64)
+        self._head = 0
+        self._size = 0
+        # The websocket thread writes while strategy threads read
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, price):
+        """Add one tick, overwriting the oldest one when full."""
+        with self._lock:
+            i = self._head
+            mirror = i + self.capacity
+            self._timestamps[i] = self._timestamps[mirror] = timestamp
+            self._prices[i] = self._prices[mirror] = price
+            self._head = i + 1 if i + 1 < self.capacity else 0
+            if self._size < self.capacity:
+                self._size += 1
+
+    def extend(self, timestamps, prices):
+        """Add a batch of ticks in arrival order."""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(timestamps) > self.capacity:
+            timestamps = timestamps[-self.capacity:]
+            prices = prices[-self.capacity:]
+        n = len(timestamps)
+        if n == 0:
+            return
+        with self._lock:
+            slots = (self._head + np.arange(n)) % self.capacity
+            self._timestamps[slots] = timestamps
+            self._timestamps[slots + self.capacity] = timestamps
+            self._prices[slots] = prices
+            self._prices[slots + self.capacity] = prices
+            self._head = int((self._head + n) % self.capacity)
+            self._size = min(self._size + n, self.capacity)
+
+    def view(self, count=None):
+        """Return copies of (timestamps, prices) of the latest ``count`` ticks, oldest first."""
+        with self._lock:
+            size = self._size
+            if count is not None:
+                size = min(size, max(count, 0))
+            end = self._head + self.capacity
+            start = end - size
+            return self._timestamps[start:end].copy(), self._prices[start:end].copy()
+
+    def __len__(self):
+        return self._size
+
+
+class Ticks(Base):
+    """Class for Pocket Option real-time ticks, one bounded buffer per asset.
+
+    Arrays returned by :meth:`get_ticks` are copies owned by the caller, so
+    ticks arriving later never change them.
+    """
+
+    def __init__(self, capacity=10000):
+        """
+        :param int capacity: Ticks kept per asset.
+        """
+        super(Ticks, self).__init__()
+        self.__name = "ticks"
+        self.capacity = capacity
+        self.__buffers = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def name(self):
+        """Property to get websocket object name.
+
+        :returns: The name of websocket object.
+        """
+        return self.__name
+
+    def _buffer(self, asset):
+        buffer = self.__buffers.get(asset)
+        if buffer is None:
+            with self.__lock:
+                buffer = self.__buffers.get(asset)
+                if buffer is None:
+                    buffer = self.__buffers[asset] = TickBuffer(self.capacity)
+        return buffer
+
+    def add_tick(self, asset, timestamp, price):
+        """Method to store a tick for an asset."""
+        self._buffer(asset).append(timestamp, price)
+
+    def add_ticks(self, asset, timestamps, prices):
+        """Method to store a batch of ticks for an asset."""
+        self._buffer(asset).extend(timestamps, prices)
+
+    def get_ticks(self, asset, count=None):
+        """Method to get the latest ticks of an asset.
+
+        :param str asset: The asset, e.g. "EURUSD_otc".
+        :param count: Number of ticks (None for everything kept).
+        :returns: (timestamps, prices) NumPy arrays (copies), oldest first.
+        """
+        buffer = self.__buffers.get(asset)
+        if buffer is None:
+            empty = np.empty(0, dtype=np.float64)
+            return empty, empty
+        return buffer.view(count)
+
+    def latest(self, asset):
+        """Method to get the latest (timestamp, price) of an asset, or None."""
+        buffer = self.__buffers.get(asset)
+        if buffer is None or len(buffer) == 0:
+            return None
+        timestamps, prices = buffer.view(1)
+        return float(timestamps[0]), float(prices[0])
+
+    def count(self, asset):
+        """Method to get the number of ticks kept for an asset."""
+        buffer = self.__buffers.get(asset)
+        return len(buffer) if buffer is not None else 0
+
+    def assets(self):
+        """Method to get the assets with stored ticks."""
+        return list(self.__buffers.keys())
+
+    def clear(self, asset=None):
+        """Method to drop the ticks of one asset, or of every asset."""
+        with self.__lock:
+            if asset is None:
+                self.__buffers.clear()
+            else:
+                self.__buffers.pop(asset, None)
+
+    def __contains__(self, asset):
+        return asset in self.__buffers
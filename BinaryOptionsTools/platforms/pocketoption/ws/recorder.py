@@ -0,0 +1,259 @@
+"""
+Websocket frame recorder.
+
+Every inbound and outbound frame of a session is stamped with
+``time.monotonic()`` and handed to a background writer thread, so the
+listener only pays for a deque append. The log is a header followed by
+length-prefixed records and may be gzip or zstd compressed; read it back
+with :func:`read_frames` or feed it to the replay server.
+"""
+
+import atexit
+import collections
+import gzip
+import json
+import logging
+import struct
+import threading
+import time
+from typing import Iterator, NamedTuple, Union
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Raised by the decompressors when a compressed recording ends mid-stream
+TRUNCATED_ERRORS = (EOFError, zstandard.ZstdError) if ZSTD_AVAILABLE else (EOFError,)
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"POFRAMES"
+VERSION = 1
+# Record: monotonic timestamp, flags, payload length
+RECORD = struct.Struct("<dBI")
+HEADER_LENGTH = struct.Struct("<I")
+
+OUTBOUND = 1  # flag: frame sent by the client
+BINARY = 2  # flag: binary frame, else UTF-8 text
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class RecordedFrame(NamedTuple):
+    """A recorded websocket frame: text frames are ``str``, binary ones ``bytes``."""
+    timestamp: float
+    outbound: bool
+    data: Union[str, bytes]
+
+
+def _open_writer(path, compression, level):
+    if compression is None:
+        return open(path, "wb")
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=level or 6)
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is required for zstd compressed recordings")
+        return zstandard.ZstdCompressor(level=level or 3).stream_writer(open(path, "wb"), closefd=True)
+    raise ValueError(f"Unknown compression: {compression} (use None, 'gzip' or 'zstd')")
+
+
+def _open_reader(path):
+    with open(path, "rb") as f:
+        start = f.read(4)
+    if start.startswith(GZIP_MAGIC):
+        return gzip.open(path, "rb")
+    if start == ZSTD_MAGIC:
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is required to read zstd compressed recordings")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def _read_exactly(f, size):
+    data = f.read(size)
+    while len(data) < size:
+        chunk = f.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def read_header(path) -> dict:
+    """Method to read the metadata of a recording.
+
+    :param str path: The recording file.
+    :returns: The header dict (``version``, wall clock ``started`` and the ``monotonic`` time it matches).
+    """
+    with _open_reader(path) as f:
+        return _read_header(f)
+
+
+def _read_header(f) -> dict:
+    if _read_exactly(f, len(MAGIC)) != MAGIC:
+        raise ValueError("Not a websocket frame recording")
+    (length,) = HEADER_LENGTH.unpack(_read_exactly(f, HEADER_LENGTH.size))
+    return json.loads(_read_exactly(f, length))
+
+
+def read_frames(path) -> Iterator[RecordedFrame]:
+    """Method to iterate over the frames of a recording, in the order they were recorded.
+
+    A recording cut short (e.g. by a crash) ends at its last complete record; for
+    compressed ones that is the last record of the last block the writer flushed.
+
+    :param str path: The recording file, compressed or not.
+    :returns: An iterator of :class:`RecordedFrame`.
+    """
+    with _open_reader(path) as f:
+        _read_header(f)
+        while True:
+            try:
+                head = _read_exactly(f, RECORD.size)
+                if len(head) < RECORD.size:
+                    return
+                timestamp, flags, length = RECORD.unpack(head)
+                data = _read_exactly(f, length)
+            except TRUNCATED_ERRORS:
+                return
+            if len(data) < length:
+                return
+            yield RecordedFrame(timestamp, bool(flags & OUTBOUND), data if flags & BINARY else data.decode())
+
+
+class FrameRecorder(object):
+    """Class to record websocket frames to a length-prefixed log.
+
+    :meth:`inbound` and :meth:`outbound` only timestamp the frame and append it
+    to a deque; a daemon thread drains the deque every ``flush_interval``
+    seconds and does the encoding, compression and disk writes.
+    """
+
+    def __init__(self, path, compression=None, level=None, flush_interval=0.5, max_pending=1000000):
+        """
+        :param str path: The file to write.
+        :param str compression: (optional) None, "gzip" or "zstd" (needs zstandard).
+        :param int level: (optional) The compression level.
+        :param float flush_interval: (optional) Seconds between writer passes.
+        :param int max_pending: (optional) Frames buffered before new ones are dropped,
+            bounds the memory used when the disk falls behind.
+        """
+        self.path = path
+        self.compression = compression
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.frames = 0
+        self.bytes = 0
+        self.dropped = 0
+        self._pending = collections.deque()
+        self._stop = threading.Event()
+        self._file = _open_writer(path, compression, level)
+        header = json.dumps({"version": VERSION, "started": time.time(), "monotonic": time.monotonic()}).encode()
+        self._file.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+        self._flush()
+        self._thread = threading.Thread(target=self._run, name="frame-recorder", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def inbound(self, message):
+        """Method to record a frame received from the server."""
+        if len(self._pending) < self.max_pending:
+            self._pending.append((time.monotonic(), 0, message))
+        else:
+            self.dropped += 1
+
+    def outbound(self, message):
+        """Method to record a frame sent to the server."""
+        if len(self._pending) < self.max_pending:
+            self._pending.append((time.monotonic(), OUTBOUND, message))
+        else:
+            self.dropped += 1
+
+    def wrap(self, ws):
+        """Method to wrap a websocket connection so every frame it carries is recorded.
+
+        :returns: A :class:`RecordingConnection` delegating to ``ws``.
+        """
+        return RecordingConnection(ws, self)
+
+    def _drain(self):
+        pending = self._pending
+        chunks = []
+        written = 0
+        while pending:
+            timestamp, flags, message = pending.popleft()
+            if isinstance(message, str):
+                data = message.encode()
+            else:
+                data = bytes(message)
+                flags |= BINARY
+            chunks.append(RECORD.pack(timestamp, flags, len(data)))
+            chunks.append(data)
+            written += len(data)
+        if chunks:
+            self._file.write(b"".join(chunks))
+            self.frames += len(chunks) // 2
+            self.bytes += written
+        return bool(chunks)
+
+    def _flush(self):
+        # Ends the current compressed block so everything written so far can be read back after a crash
+        if self.compression == "zstd":
+            self._file.flush(zstandard.FLUSH_BLOCK)
+        else:
+            # GzipFile.flush() is a Z_SYNC_FLUSH
+            self._file.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                if self._drain():
+                    self._flush()
+            except Exception as e:
+                logger.warning(f"Error writing websocket recording {self.path}: {e}")
+        self._drain()
+
+    def close(self):
+        """Method to write the buffered frames and close the file."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self._file.close()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RecordingConnection(object):
+    """Websocket connection proxy recording every frame sent and received."""
+
+    def __init__(self, ws, recorder):
+        self._ws = ws
+        self._recorder = recorder
+
+    async def send(self, message):
+        await self._ws.send(message)
+        self._recorder.outbound(message)
+
+    async def recv(self, *args, **kwargs):
+        message = await self._ws.recv(*args, **kwargs)
+        self._recorder.inbound(message)
+        return message
+
+    async def __aiter__(self):
+        inbound = self._recorder.inbound
+        async for message in self._ws:
+            inbound(message)
+            yield message
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
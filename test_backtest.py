@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorised backtest engine: signal series against the live indicator
+functions, trade settlement and the summary statistics.
+"""
+
+import sys
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from BinaryOptionsTools.indicators import backtest as bt
+from BinaryOptionsTools.indicators import technical_analysis as ta
+from BinaryOptionsTools.indicators.sweep import STRATEGIES, ParameterSweep, parameter_grid
+from BinaryOptionsTools.indicators.walk_forward import WalkForward
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DIRECTIONS = {"BUY": 1, "STRONG_BUY": 1, "SELL": -1, "STRONG_SELL": -1}
+
+
+def test_signals_match_live_indicators():
+    """Every candle gets the signal the live functions give on the history up to it."""
+    print("=" * 60)
+    print("Testing backtest signal series")
+    print("=" * 60)
+
+    candles = bt.load_history(os.path.join(HERE, "history-EURUSD_otc.csv"))
+    signals = bt.indicator_signals(candles)
+    overall = bt.trading_signal_series(candles)
+
+    for i in np.random.default_rng(0).integers(40, len(candles), 30):
+        df = candles.iloc[:i + 1].copy()
+        df["time"] = pd.to_datetime(df["time"], unit="s")
+        ctx = ta.AnalysisContext(df)
+        n = len(df)
+        live = {
+            "sma_20": ta.sma(ctx, period=20, num_candles=n)["signal"],
+            "ema_20": ta.ema(ctx, period=20, num_candles=n)["signal"],
+            "rsi": ta.rsi(ctx, period=14, num_candles=n)["signal"],
+            "bollinger_bands": ta.bollinger_bands(ctx, period=20, num_candles=n)["signal"],
+            "stochastic": ta.stochastic(ctx, num_candles=n)["signal"],
+            "williams_r": ta.williams_r(ctx, num_candles=n)["signal"],
+            "macd": ta.macd(ctx, num_candles=n)["trade_signal"],
+        }
+        for name, signal in live.items():
+            assert signals[name][i] == DIRECTIONS.get(signal, 0), (i, name, signal)
+        assert overall[i] == DIRECTIONS.get(ta.get_trading_signals(ctx, num_candles=n)["overall_signal"], 0)
+
+    # The sweep strategies run the same signal series
+    columns = {name: candles[name].values for name in candles.columns}
+    assert np.array_equal(STRATEGIES["macd"](columns), signals["macd"])
+    assert np.array_equal(STRATEGIES["stochastic"](columns), signals["stochastic"])
+    assert np.array_equal(STRATEGIES["consensus"](columns), overall)
+
+
+def test_history_formats():
+    """CSV histories and get_candles frames load to the same layout."""
+    csv = bt.load_history(os.path.join(HERE, "history-AUDJPY_otc.csv"))
+    frame = csv.copy()
+    frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop("time"), unit="s"), name="time")
+    assert bt.load_history(frame).equals(csv)
+    assert bt.load_history({name: csv[name].values for name in csv.columns}).equals(csv)
+    assert csv["time"].is_monotonic_increasing and csv["time"].dtype == np.int64
+
+
+def test_settlement():
+    """Wins, losses and draws at expiry, payout percentages and non-overlapping trades."""
+    times = 1735000000 + np.arange(8) * 60
+    close = np.array([1.0, 1.1, 1.1, 1.0, 1.2, 1.3, 1.3, 1.4])
+    candles = pd.DataFrame({"time": times, "open": close, "high": close, "low": close, "close": close})
+    signal = np.array([1, -1, 1, 1, -1, 0, 1, 1])
+
+    trades = bt.settle(candles, signal, expiry=60, payout=90)
+    # The signal of the last candle expires after the history ends
+    assert trades["entry_time"].tolist() == times[[0, 1, 2, 3, 4, 6]].tolist()
+    assert trades["result"].tolist() == [1, 0, -1, 1, -1, 1]
+    assert np.allclose(trades["profit"], [0.9, 0.0, -1.0, 0.9, -1.0, 0.9])
+
+    # Two candle expiry, exits two candles later
+    trades = bt.settle(candles, signal, expiry=120, payout=np.full(8, 80.0), stake=10)
+    assert trades["exit_price"].tolist() == [1.1, 1.0, 1.2, 1.3, 1.3]
+    assert np.allclose(trades["profit"], [8.0, 10.0 * 0.8, 8.0, 8.0, -10.0])
+
+    # Without overlap the next trade opens at or after the expiry of the previous one
+    trades = bt.settle(candles, signal, expiry=120, overlap=False)
+    assert trades["entry_time"].tolist() == times[[0, 2, 4]].tolist()
+
+    # A gap in the history: trades whose exit candle is missing are not settled
+    gapped = candles.drop(index=[1, 2]).reset_index(drop=True)
+    trades = bt.settle(gapped, np.array([1, 1, 0, 0, 0, 0]), expiry=120)
+    assert trades["entry_time"].tolist() == [times[3]]
+    assert trades["exit_price"].tolist() == [1.3] and trades["result"].tolist() == [1]
+    result, profit, exits = bt.candle_outcomes(gapped, np.array([1, 1, 0, 0, 0, 0]), expiry=120)
+    assert exits.tolist() == [-1, 3, 4, 5, -1, -1] and result.tolist() == [0, 1, 0, 0, 0, 0]
+
+
+def test_summary():
+    """Win rate, expectancy, drawdown and losing streaks of a known trade list."""
+    trades = pd.DataFrame({"result": [1, -1, -1, 0, 1, -1, -1, -1, 1],
+                           "profit": [0.9, -1, -1, 0, 0.9, -1, -1, -1, 0.9]})
+    stats = bt.summarise(trades)
+    assert stats["trades"] == 9 and stats["wins"] == 3 and stats["losses"] == 5 and stats["draws"] == 1
+    assert np.isclose(stats["win_rate"], 3 / 8)
+    assert np.isclose(stats["expectancy"], (2.7 - 5) / 9)
+    assert np.isclose(stats["breakeven_win_rate"], 1 / 1.9)
+    # Peak 0.9 after the first trade, trough -3.2 after the eighth
+    assert np.isclose(stats["max_drawdown"], 4.1)
+    assert stats["max_consecutive_losses"] == 3
+    assert bt.summarise(trades.iloc[:0])["trades"] == 0
+
+
+def test_full_history_speed():
+    """The consensus strategy over 60k+ candles is evaluated in one vectorised pass."""
+    candles = bt.load_history(os.path.join(HERE, "history-AUDNZD_otc.csv"))
+    started = time.perf_counter()
+    result = bt.backtest(candles, expiry=60, payout=92)
+    elapsed = time.perf_counter() - started
+    stats = result["stats"]
+    assert len(candles) > 60000
+    assert stats["trades"] == len(result["trades"]) > 0
+    assert elapsed < 5
+    print(f"   {len(candles)} candles, {stats['trades']} trades in {elapsed * 1000:.0f} ms: "
+          f"win rate {stats['win_rate']:.3f}, expectancy {stats['expectancy']:.4f}")
+
+    table = bt.backtest_many(candles, {
+        "sma_cross_9_14": bt.sma_cross_signal(candles["close"].values, 9, 14),
+        "rsi_14": bt.rsi_signal(candles["close"].values, 14),
+    }, expiry=60)
+    assert table["strategy"].tolist() and table["expectancy"].is_monotonic_decreasing
+
+
+
+def test_parameter_sweep():
+    """Worker processes read the shared candles and agree with direct backtests."""
+    print("=" * 60)
+    print("Testing parameter sweep")
+    print("=" * 60)
+
+    histories = {asset: os.path.join(HERE, f"history-{asset}.csv") for asset in ("EURUSD_otc", "AUDJPY_otc")}
+    grid = {"fast_period": [3, 5, 9], "slow_period": [5, 14, 30], "expiry": [5, 30]}
+    fast_below_slow = lambda params: params["fast_period"] < params["slow_period"]
+    assert len(parameter_grid(grid, fast_below_slow)) == 14
+
+    started = time.perf_counter()
+    with ParameterSweep(histories, processes=2) as sweep:
+        table = sweep.run("sma_cross", grid, constraint=fast_below_slow, chunk_size=5)
+        block_names = [name for name, _ in sweep.layout.values()]
+    elapsed = time.perf_counter() - started
+    with ParameterSweep(histories, processes=0) as sweep:
+        local = sweep.run("sma_cross", grid, constraint=fast_below_slow)
+
+    assert len(table) == 28 and "error" not in table.columns
+    assert table["expectancy"].is_monotonic_decreasing
+    key = ["asset", "fast_period", "slow_period", "expiry"]
+    assert table.sort_values(key).reset_index(drop=True).equals(local.sort_values(key).reset_index(drop=True))
+    # Shared blocks are freed with the sweep
+    assert not any(os.path.exists(os.path.join("/dev/shm", name.lstrip("/"))) for name in block_names)
+
+    best = table.iloc[0]
+    candles = bt.load_history(histories[best["asset"]])
+    direct = bt.backtest(candles, bt.sma_cross_signal(candles["close"].values, best["fast_period"],
+                                                      best["slow_period"]), expiry=best["expiry"])["stats"]
+    assert direct["trades"] == best["trades"] and np.isclose(direct["expectancy"], best["expectancy"])
+    print(f"   {len(table)} backtests on 2 processes in {elapsed:.2f}s, best: "
+          f"{best['asset']} fast={best['fast_period']} slow={best['slow_period']} expiry={best['expiry']}")
+
+def test_parameter_sweeps_share_asset_names():
+    """In-process sweeps open at the same time keep their own candles for the same asset name."""
+    grid = {"fast_period": [3, 5], "slow_period": [14, 30]}
+    eurusd = os.path.join(HERE, "history-EURUSD_otc.csv")
+    audjpy = os.path.join(HERE, "history-AUDJPY_otc.csv")
+    with ParameterSweep({"EURUSD_otc": audjpy}, processes=0) as sweep:
+        expected = sweep.run("sma_cross", grid)
+
+    key = ["fast_period", "slow_period"]
+    with ParameterSweep({"EURUSD_otc": eurusd}, processes=0) as first, \
+            ParameterSweep({"EURUSD_otc": audjpy}, processes=0) as second:
+        first.run("sma_cross", grid)
+        table = second.run("sma_cross", grid)
+    assert table.sort_values(key).reset_index(drop=True).equals(expected.sort_values(key).reset_index(drop=True))
+
+
+def test_walk_forward():
+    """Windows pick the parameters a full re-evaluation would pick, from cached signals."""
+    print("=" * 60)
+    print("Testing walk-forward optimisation")
+    print("=" * 60)
+
+    walk = WalkForward(os.path.join(HERE, "history-AUDJPY_otc.csv"), expiry=30)
+    grid = {"fast_period": [3, 5, 9], "slow_period": [14, 30]}
+    started = time.perf_counter()
+    report = walk.run("sma_cross", grid, train=3000, test=1000)
+    elapsed = time.perf_counter() - started
+    windows, stats = report["windows"], report["stats"]
+
+    candles = walk.candles
+    times = candles["time"].values
+    assert len(windows) == (len(candles) - 4000) // 1000 + 1
+    assert walk.misses == 6 and stats["cached_signals"] == 6
+
+    for window in windows.itertuples():
+        train_start = int(np.searchsorted(times, window.train_start))
+        test_start = int(np.searchsorted(times, window.test_start))
+        assert test_start - train_start == 3000
+
+        def window_trades(params, start, end):
+            """Trades opened and settled inside [start, end), from a full backtest."""
+            trades = bt.settle(candles, bt.sma_cross_signal(candles["close"].values, **params), expiry=30)
+            entry = np.searchsorted(times, trades["entry_time"].values)
+            exit_candle = np.searchsorted(times, trades["exit_time"].values - 5, side="right") - 1
+            return trades[(entry >= start) & (entry < end) & (exit_candle < end)]
+
+        best = max(parameter_grid(grid), key=lambda p: round(window_trades(p, train_start, test_start)["profit"].mean(), 10))
+        assert window.params == best
+        test = window_trades(best, test_start, test_start + 1000)
+        assert window.test_trades == len(test) and np.isclose(window.test_expectancy, test["profit"].mean())
+
+    assert stats["oos_trades"] == windows["test_trades"].sum()
+    assert 0 <= stats["positive_windows"] <= 1 and 0 < stats["most_picked_share"] <= 1
+
+    # A second walk with other windows reuses every signal
+    walk.run("sma_cross", grid, train=2000, test=500)
+    assert walk.misses == 6
+    consensus = walk.run("consensus", {"strong": [False, True]}, train=3000, test=1000, min_trades=10)
+    assert consensus["stats"]["evaluated_windows"] == len(windows)
+    print(f"   {len(windows)} windows x {len(parameter_grid(grid))} parameter sets in {elapsed * 1000:.0f} ms, "
+          f"out-of-sample expectancy {stats['oos_expectancy']:.4f}")
+
+
+if __name__ == "__main__":
+    test_signals_match_live_indicators()
+    test_history_formats()
+    test_settlement()
+    test_summary()
+    test_full_history_speed()
+    test_parameter_sweep()
+    test_parameter_sweeps_share_asset_names()
+    test_walk_forward()
+    print("All backtest tests passed")
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Tests for historical candle downloads: the cache in front of PocketOption.get_candles,
+incremental top-up and paged downloads.
+"""
+
+import sys
+import os
+import asyncio
+import concurrent.futures
+import json
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from BinaryOptionsTools.platforms.pocketoption.candle_cache import CandleCache
+from BinaryOptionsTools.platforms.pocketoption.ws.decoder import decode_history
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.history import HistoryRequests
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_frame(rows=100, start=1735145820, period=60):
+    rng = np.random.default_rng(rows)
+    close = 1.04 + np.cumsum(rng.normal(0, 0.0002, rows))
+    return pd.DataFrame({
+        "time": start + np.arange(rows) * period,
+        "open": close, "high": close + 0.0001, "low": close - 0.0001, "close": close,
+    })
+
+
+def test_ttl_and_copies():
+    """Entries are served until their ttl runs out, always as independent copies."""
+    print("=" * 60)
+    print("Testing candle cache")
+    print("=" * 60)
+
+    clock = FakeClock()
+    cache = CandleCache(clock=clock)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return make_frame()
+
+    first = cache.get_or_fetch(("EURUSD_otc", 60, 1735145820, 6000, 1), fetch, ttl=60)
+    first["close"] = 0.0
+    clock.now += 59
+    second = cache.get_or_fetch(("EURUSD_otc", 60, 1735145820, 6000, 1), fetch, ttl=60)
+    assert len(calls) == 1
+    assert (second["close"] != 0.0).all()
+
+    clock.now += 2
+    cache.get_or_fetch(("EURUSD_otc", 60, 1735145820, 6000, 1), fetch, ttl=60)
+    assert len(calls) == 2
+
+    # Failed downloads (empty frames) are not kept
+    assert cache.get_or_fetch(("GBPUSD_otc", 60, 0, 6000, 1), pd.DataFrame, ttl=60).empty
+    assert len(cache) == 1
+    cache.invalidate("EURUSD_otc")
+    assert len(cache) == 0 and cache.total_bytes == 0
+    print(f"   {cache.get_stats()}")
+
+
+def test_lru_memory_budget():
+    """The least recently used frames are evicted once the byte budget is exceeded."""
+    frame_bytes = int(make_frame().memory_usage(deep=True).sum())
+    cache = CandleCache(max_bytes=3 * frame_bytes)
+    for i in range(3):
+        cache.get_or_fetch(i, make_frame, ttl=60)
+    cache.get_or_fetch(0, make_frame, ttl=60)  # 0 becomes the most recently used
+    cache.get_or_fetch(3, make_frame, ttl=60)
+
+    assert list(cache.entries) == [2, 0, 3]
+    assert cache.total_bytes == 3 * frame_bytes
+    # A frame larger than the whole budget is returned but not cached
+    assert len(cache.get_or_fetch("big", lambda: make_frame(10000), ttl=60)) == 10000
+    assert "big" not in cache.entries
+
+
+def test_concurrent_requests_coalesce():
+    """Concurrent identical requests share one download, errors reach every waiter."""
+    cache = CandleCache()
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        release.wait(5)
+        return make_frame()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("key", slow_fetch, ttl=60)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while cache.get_stats()["coalesced"] < 7:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 8 and all(r.equals(results[0]) for r in results)
+    assert len({id(r) for r in results}) == 8
+
+    errors = []
+
+    def failing_fetch():
+        time.sleep(0.1)
+        raise ConnectionError("socket closed")
+
+    def call():
+        try:
+            cache.get_or_fetch("failing", failing_fetch, ttl=60)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 4
+    assert "failing" not in cache.entries and not cache.in_flight
+
+
+class FakeHistoryServer:
+    """Answers history requests from a fixed candle history, in the format _download_candles returns."""
+
+    def __init__(self, period=60, start=1735000000, rows=2000):
+        self.period = period
+        self.candles = make_frame(rows, start, period)
+        self.requests = []
+
+    def download(self, active, period, time_red, count, count_request):
+        self.requests.append((time_red, count, count_request))
+        times = self.candles["time"]
+        df = self.candles[(times > time_red - count * count_request) & (times <= time_red)].copy()
+        df["time"] = pd.to_datetime(df["time"], unit="s")
+        return df.set_index("time")
+
+
+def new_pocket_option(**kwargs):
+    from BinaryOptionsTools.platforms.pocketoption.stable_api import PocketOption
+
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    return PocketOption("test_ssid", demo=True, **kwargs)
+
+
+def test_get_candles_uses_cache():
+    """PocketOption.get_candles downloads identical requests once unless use_cache=False."""
+    api = new_pocket_option(candle_series_max=0)
+    server = FakeHistoryServer()
+    downloads = []
+
+    def download(active, period, time_red, count, count_request):
+        downloads.append((active, period, time_red, count, count_request))
+        return server.download(active, period, time_red, count, count_request)
+
+    api._download_candles = download
+    a = api.get_candles("EURUSD_otc", 60, start_time=1735060000, count=3600)
+    b = api.get_candles("EURUSD_otc", 60, start_time=1735060000, count=3600)
+    assert a.equals(b) and len(downloads) == 1
+    api.get_candles("EURUSD_otc", 60, start_time=1735060000, count=1800)
+    api.get_candles("EURUSD_otc", 60, start_time=1735060000, count=3600, use_cache=False)
+    assert len(downloads) == 3
+
+    uncached = new_pocket_option(candle_cache_bytes=0, candle_series_max=0)
+    uncached._download_candles = download
+    uncached.get_candles("EURUSD_otc", 60, start_time=1735060000, count=3600)
+    uncached.get_candles("EURUSD_otc", 60, start_time=1735060000, count=3600)
+    assert len(downloads) == 5
+
+
+def test_incremental_top_up():
+    """Polling get_candles downloads only the new tail and returns what a full download would."""
+    print("=" * 60)
+    print("Testing incremental history top-up")
+    print("=" * 60)
+
+    server = FakeHistoryServer()
+    api = new_pocket_option(candle_cache_bytes=0)
+    api._download_candles = server.download
+    end = 1735000000 + 1000 * 60
+
+    first = api.get_candles("EURUSD_otc", 60, start_time=end, count=6000)
+    assert server.requests[-1] == (end, 6000, 1)
+    for step in (0, 1, 2, 5):
+        # The latest candle moved while it was in progress; the refetch must pick that up
+        server.candles.loc[server.candles["time"] == end, "close"] += 0.001
+        end += step * 60
+        polled = api.get_candles("EURUSD_otc", 60, start_time=end, count=6000)
+        assert server.requests[-1][1] == (step + 1) * 60, server.requests[-1]
+        assert polled.equals(server.download("EURUSD_otc", 60, end, 6000, 1))
+
+    # A window inside the known series needs no request at all
+    requests = len(server.requests)
+    inside = api.get_candles("EURUSD_otc", 60, start_time=end - 600, count=1800)
+    assert len(server.requests) == requests
+    assert inside.equals(server.download("EURUSD_otc", 60, end - 600, 1800, 1))
+
+    # Too far behind for one small request: full download again
+    end += 200 * 60
+    api.get_candles("EURUSD_otc", 60, start_time=end, count=6000)
+    assert server.requests[-1] == (end, 6000, 1)
+    assert len(first) == 100
+    print(f"   {len(server.requests)} requests, tails of {[r[1] for r in server.requests[1:4]]} seconds")
+
+
+def test_top_up_gap_and_limits():
+    """A tail that does not join the series falls back to a full download; the series stays bounded."""
+    server = FakeHistoryServer()
+    api = new_pocket_option(candle_cache_bytes=0, candle_series_max=150)
+    end = 1735000000 + 1000 * 60
+    api._download_candles = server.download
+    api.get_candles("EURUSD_otc", 60, start_time=end, count=6000)
+
+    # Server returns only the newest candle: there is a gap behind it
+    api._download_candles = lambda active, period, time_red, count, count_request: (
+        server.download(active, period, time_red, count, count_request)
+        if count_request > 1 or count >= 6000 else server.download(active, period, time_red, 60, 1))
+    end += 5 * 60
+    result = api.get_candles("EURUSD_otc", 60, start_time=end, count=6000)
+    assert result.equals(server.download("EURUSD_otc", 60, end, 6000, 1))
+
+    api._download_candles = server.download
+    api.get_candles("EURUSD_otc", 60, start_time=end, count=6000, count_request=3)
+    assert len(api.candle_series[("EURUSD_otc", 60)]) == 150
+
+    disabled = new_pocket_option(candle_cache_bytes=0, candle_series_max=0)
+    disabled._download_candles = server.download
+    disabled.get_candles("EURUSD_otc", 60, start_time=end, count=6000)
+    disabled.get_candles("EURUSD_otc", 60, start_time=end + 60, count=6000)
+    assert server.requests[-1] == (end + 60, 6000, 1) and not disabled.candle_series
+
+
+class FakeSocketServer:
+    """Answers loadHistoryPeriod frames like the server: later, in any order, echoing the index."""
+
+    def __init__(self, api, candles, drop=(), seed=0, echo_index=True):
+        self.api = api
+        self.candles = candles  # one frame, or a dict of frames keyed by asset
+        self.echo_index = echo_index
+        self.drop = set(drop)  # page end times whose first request gets no reply
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = []
+        self.subscriptions = []  # subfor/unsubfor frames, in order
+        api.api.send_websocket_request = self.send
+
+    def send(self, name, msg, request_id=""):
+        event, request = msg
+        if event in ("subfor", "unsubfor"):
+            self.subscriptions.append((event, request))
+            return
+        assert event == "loadHistoryPeriod"
+        with self.lock:
+            self.requests.append(request)
+            if request["time"] in self.drop:
+                self.drop.discard(request["time"])
+                return
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        threading.Timer(self.rng.uniform(0.01, 0.05), self.reply, args=(request,)).start()
+
+    def reply(self, request):
+        candles = self.candles[request["asset"]] if isinstance(self.candles, dict) else self.candles
+        times = candles["time"]
+        rows = candles[(times > request["time"] - request["offset"]) & (times <= request["time"])]
+        payload = {"data": {
+            "asset": request["asset"], "period": request["period"],
+            "candles": rows[["time", "open", "close", "high", "low"]].values.tolist(),
+        }}
+        if self.echo_index:
+            payload["data"]["index"] = request["index"]
+        with self.lock:
+            self.in_flight -= 1
+        self.api.api.websocket_client._handle_history_period(decode_history(json.dumps(payload).encode()))
+
+
+def test_paged_download():
+    """Pages are requested several at a time, matched by index and merged in order."""
+    print("=" * 60)
+    print("Testing paged history download")
+    print("=" * 60)
+
+    candles = make_frame(3000, 1735000000, 60)
+    end = int(candles["time"].iloc[-1])
+    api = new_pocket_option(candle_cache_bytes=0, candle_series_max=0)
+    api.subscribe_candles = api.unsubscribe_candles = lambda active: None
+    server = FakeSocketServer(api, candles)
+
+    started = time.perf_counter()
+    df = api.get_candles("EURUSD_otc", 60, start_time=end, count=3000, count_request=40)
+    elapsed = time.perf_counter() - started
+
+    expected = candles.iloc[-2000:]
+    assert len(df) == 2000
+    assert df.index.is_monotonic_increasing
+    assert np.allclose(df["close"].values, expected["close"].values)
+    assert sorted(r["time"] for r in server.requests) == [end - page * 3000 for page in range(40)][::-1]
+    assert 1 < server.max_in_flight <= 4
+    assert len(api.api.history_requests) == 0
+    print(f"   40 pages in {elapsed:.2f}s, {server.max_in_flight} in flight")
+
+
+def test_download_keeps_live_subscription():
+    """A history download leaves a live OHLC subscription on the asset running."""
+    candles = make_frame(100, 1735000000, 60)
+    end = int(candles["time"].iloc[-1])
+    api = new_pocket_option(candle_cache_bytes=0, candle_series_max=0)
+    server = FakeSocketServer(api, {"EURUSD_otc": candles, "GBPUSD_otc": candles})
+
+    api.subscribe_candles("EURUSD_otc", create_ohlc=True, timeframe_seconds=5)
+    df = api.get_candles("EURUSD_otc", 60, start_time=end, count=3000)
+    assert len(df) == 50
+    assert "EURUSD_otc" in api.ohlc_subscriptions
+    assert server.subscriptions == [("subfor", "EURUSD_otc")]
+
+    # Assets without a live subscription are still subscribed for the download only
+    api.get_candles("GBPUSD_otc", 60, start_time=end, count=3000)
+    assert server.subscriptions[1:] == [("subfor", "GBPUSD_otc"), ("unsubfor", "GBPUSD_otc")]
+
+
+def test_paged_download_retries():
+    """A page without reply is requested again after its timeout; the others are unaffected."""
+    candles = make_frame(600, 1735000000, 60)
+    end = int(candles["time"].iloc[-1])
+    api = new_pocket_option()
+    server = FakeSocketServer(api, candles, drop=[end - 3000, end - 6000])
+
+    pages = api._download_pages("EURUSD_otc", 60, end, 3000, 8, timeout=0.3)
+    times = sorted(c["time"] for c in pages)
+    assert times == candles["time"].iloc[-400:].tolist()
+    assert len(server.requests) == 10
+    assert len(api.api.history_requests) == 0
+
+
+
+def test_history_reply_matching():
+    """Replies go to their own request: by index, else by asset, period and time window."""
+    requests = HistoryRequests()
+    first = requests.register("1", "EURUSD_otc", 60, 1000, 300)
+    second = requests.register("2", "EURUSD_otc", 60, 700, 300)
+    other = requests.register("3", "AUDJPY_otc", 60, 1000, 300)
+
+    # Out of order and without an index
+    assert requests.deliver([{"time": 660}, {"time": 700}], asset="EURUSD_otc", period=60)
+    assert second.result(0) == [{"time": 660}, {"time": 700}]
+    assert not first.done()
+    assert requests.deliver([{"time": 1000}], index=3)
+    assert other.result(0) == [{"time": 1000}]
+    # Unknown index or asset: nobody's reply
+    assert not requests.deliver([{"time": 1000}], index=99, asset="EURUSD_otc", period=60)
+    assert not requests.deliver([{"time": 1000}], asset="GBPUSD_otc", period=60)
+    assert not first.done()
+    assert requests.deliver([{"time": 1000}], asset="EURUSD_otc", period=60)
+    assert first.result(0) == [{"time": 1000}]
+    assert len(requests) == 0
+
+
+def test_overlapping_history_requests():
+    """Concurrent get_candles calls for different assets never get each other's candles."""
+    print("=" * 60)
+    print("Testing overlapping history requests")
+    print("=" * 60)
+
+    assets = ["EURUSD_otc", "AUDJPY_otc", "AUDNZD_otc", "GBPUSD_otc"]
+    frames = {}
+    for offset, asset in enumerate(assets):
+        frames[asset] = make_frame(600, 1735000000, 60)
+        frames[asset][["open", "high", "low", "close"]] += 100 * offset
+    end = int(frames[assets[0]]["time"].iloc[-1])
+
+    for echo_index in (True, False):
+        api = new_pocket_option(candle_cache_bytes=0, candle_series_max=0)
+        api.subscribe_candles = api.unsubscribe_candles = lambda active: None
+        FakeSocketServer(api, frames, seed=1, echo_index=echo_index)
+
+        with concurrent.futures.ThreadPoolExecutor(len(assets) * 2) as pool:
+            jobs = {(asset, count): pool.submit(api.get_candles, asset, 60, end, count, 1)
+                    for asset in assets for count in (6000, 3000)}
+            for (asset, count), job in jobs.items():
+                df = job.result()
+                expected = frames[asset].iloc[-(count // 60):]
+                assert np.allclose(df["close"].values, expected["close"].values), (asset, echo_index)
+        assert len(api.api.history_requests) == 0
+        print(f"echo_index={echo_index}: {len(jobs)} overlapping requests matched")
+
+
+if __name__ == "__main__":
+    test_ttl_and_copies()
+    test_lru_memory_budget()
+    test_concurrent_requests_coalesce()
+    test_get_candles_uses_cache()
+    test_incremental_top_up()
+    test_top_up_gap_and_limits()
+    test_paged_download()
+    test_download_keeps_live_subscription()
+    test_paged_download_retries()
+    test_history_reply_matching()
+    test_overlapping_history_requests()
+    print("All candle cache tests passed")
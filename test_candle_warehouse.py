@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Tests for the local candle warehouse: CSV import, zero-copy range queries,
+merging of overlapping downloads and of live aggregator output.
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from BinaryOptionsTools.platforms.pocketoption.candle_warehouse import CandleWarehouse
+from BinaryOptionsTools.platforms.pocketoption.ohlc_aggregator import CandleAggregator
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def epoch(times):
+    return ((pd.to_datetime(times) - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy()
+
+
+def make_columns(start, rows, period=60, shift=0.0):
+    times = start + np.arange(rows) * period
+    close = 1.1 + (times - 1735000000) / period * 0.0001 + shift
+    return {"time": times, "open": close, "high": close + 0.0002,
+            "low": close - 0.0002, "close": close}
+
+
+def column_path(root, asset, period, name):
+    """Column file of the version a series currently uses."""
+    directory = os.path.join(root, asset, str(period))
+    with open(os.path.join(directory, "CURRENT")) as f:
+        return os.path.join(directory, f.read(), name + ".bin")
+
+
+def test_import_csv_and_query():
+    """The bundled CSVs are imported once and queried as views of the mapped files."""
+    print("=" * 60)
+    print("Testing candle warehouse")
+    print("=" * 60)
+
+    path = os.path.join(HERE, "history-AUDNZD_otc.csv")
+    with tempfile.TemporaryDirectory() as root:
+        warehouse = CandleWarehouse(root)
+        started = time.perf_counter()
+        csv = pd.read_csv(path)
+        csv_elapsed = time.perf_counter() - started
+        stored = warehouse.import_csv(path, "AUDNZD_otc")
+
+        times = epoch(csv["time"])
+        assert warehouse.series() == [("AUDNZD_otc", 1)]
+        assert stored == len(np.unique(times))
+
+        start, end = int(times[1000]), int(times[20000])
+        started = time.perf_counter()
+        reopened = CandleWarehouse(root)
+        data = reopened.query("AUDNZD_otc", 1, start, end)
+        query_elapsed = time.perf_counter() - started
+
+        expected = csv[(times >= start) & (times <= end)]
+        assert np.array_equal(data["time"], epoch(expected["time"]))
+        assert np.allclose(data["close"], expected["close"])
+        assert not data["close"].flags.writeable
+        # Zero copy: queries share memory with the mapping instead of copying rows
+        assert np.shares_memory(data["close"], reopened.query("AUDNZD_otc", 1)["close"])
+
+        df = reopened.to_frame("AUDNZD_otc", 1, start, end)
+        assert isinstance(df.index, pd.DatetimeIndex) and len(df) == len(expected)
+        print(f"   read_csv: {csv_elapsed * 1000:.1f} ms, open + query: {query_elapsed * 1000:.2f} ms")
+
+
+def test_merge_rules():
+    """Repeated tails are appended, revisions and backfills rewrite without breaking old views."""
+    with tempfile.TemporaryDirectory() as root:
+        warehouse = CandleWarehouse(root)
+        warehouse.write("EURUSD_otc", 60, make_columns(1735000000, 100))
+        inode = os.stat(column_path(root, "EURUSD_otc", 60, "close")).st_ino
+
+        # Overlapping download repeating the stored tail: plain append
+        warehouse.write("EURUSD_otc", 60, make_columns(1735000000 + 90 * 60, 20))
+        assert warehouse.info("EURUSD_otc", 60)["candles"] == 110
+        assert os.stat(column_path(root, "EURUSD_otc", 60, "close")).st_ino == inode
+
+        # Revised last candle: new values win, earlier views keep the old ones
+        before = warehouse.query("EURUSD_otc", 60)
+        revised = make_columns(1735000000 + 109 * 60, 1, shift=0.5)
+        assert warehouse.write("EURUSD_otc", 60, revised) == 110
+        after = warehouse.query("EURUSD_otc", 60)
+        assert after["close"][-1] == revised["close"][0]
+        assert before["close"][-1] != revised["close"][0]
+
+        # Backfill of older candles
+        assert warehouse.write("EURUSD_otc", 60, make_columns(1735000000 - 50 * 60, 60)) == 160
+        times = warehouse.query("EURUSD_otc", 60)["time"]
+        assert np.all(np.diff(times) == 60)
+
+        # Torn append (one column longer than the others) only counts whole rows
+        with open(column_path(root, "EURUSD_otc", 60, "open"), "ab") as f:
+            f.write(np.float64(1.0).tobytes())
+        assert warehouse.info("EURUSD_otc", 60)["candles"] == 160
+        assert warehouse.write("EURUSD_otc", 60, make_columns(1735000000 + 110 * 60, 1)) == 161
+        sizes = {os.path.getsize(column_path(root, "EURUSD_otc", 60, name)) for name in ("time", "open")}
+        assert sizes == {161 * 8}
+
+        # A rewrite interrupted before the switch leaves the series as it was; the next one cleans up
+        directory = os.path.join(root, "EURUSD_otc", "60")
+        os.makedirs(os.path.join(directory, "vinterrupted"))
+        with open(os.path.join(directory, "vinterrupted", "time.bin"), "wb") as f:
+            f.write(np.arange(5, dtype=np.int64).tobytes())
+        with open(os.path.join(directory, "CURRENT.vinterrupted.tmp"), "w") as f:
+            f.write("vinterrupted")
+        assert CandleWarehouse(root).info("EURUSD_otc", 60)["candles"] == 161
+        warehouse.write("EURUSD_otc", 60, make_columns(1735000000, 1, shift=0.5))
+        assert sorted(os.listdir(directory)) == sorted(["CURRENT", os.path.basename(
+            os.path.dirname(column_path(root, "EURUSD_otc", 60, "time")))])
+        assert np.all(np.diff(warehouse.query("EURUSD_otc", 60)["time"]) == 60)
+
+
+def test_concurrent_rewrite():
+    """Queries running during rewrites see every column of the same version of the series."""
+    with tempfile.TemporaryDirectory() as root:
+        warehouse = CandleWarehouse(root)
+        warehouse.write("EURUSD_otc", 60, make_columns(1735000000, 500))
+        stop = threading.Event()
+
+        def revise():
+            shift = 0
+            while not stop.is_set():
+                shift += 1
+                # Every value changes, so each write replaces all column files
+                warehouse.write("EURUSD_otc", 60, make_columns(1735000000, 500, shift=shift * 0.01))
+
+        writer = threading.Thread(target=revise)
+        writer.start()
+        try:
+            deadline = time.perf_counter() + 1.0
+            queries = 0
+            while time.perf_counter() < deadline:
+                data = warehouse.query("EURUSD_otc", 60)
+                assert len(data["time"]) == 500
+                assert np.array_equal(data["open"], data["close"])
+                assert np.allclose(data["high"] - data["low"], 0.0004)
+                queries += 1
+        finally:
+            stop.set()
+            writer.join()
+        print(f"   {queries} consistent queries during rewrites")
+
+
+def test_live_aggregator_merge():
+    """Completed candles of a live aggregator extend the stored history and reach the user callback."""
+    with tempfile.TemporaryDirectory() as root:
+        warehouse = CandleWarehouse(root)
+        history = make_columns(1735000020, 4, shift=0.5)
+        warehouse.write("EURUSD_otc", 60, history)
+        writers = set()
+        store_candles = warehouse.store_candles
+        warehouse.store_candles = lambda *args: writers.add(threading.current_thread().name) or store_candles(*args)
+        rewrites = []
+        rewrite = warehouse._rewrite
+        warehouse._rewrite = lambda *args: rewrites.append(1) or rewrite(*args)
+        completed = []
+        aggregator = CandleAggregator(60, on_candle_complete=warehouse.live_writer(
+            60, lambda asset, candle: completed.append(candle)))
+        start = 1735000020 + 30  # half way into a minute
+        for second in range(0, 600, 5):
+            aggregator.add_tick("EURUSD_otc", start + second, 1.1 + second * 1e-5)
+
+        # Disk writes happen on the background writer, not on the thread adding ticks
+        warehouse.flush()
+        assert writers == {"candle-warehouse"}
+        data = warehouse.query("EURUSD_otc", 60)
+        assert len(completed) == 10 and len(data["time"]) == 10
+        # The partial first candle and the live candles the history already has are not stored
+        assert data["close"][:4].tolist() == history["close"].tolist()
+        assert data["time"][4:].tolist() == [c.timestamp for c in completed[4:]]
+        assert data["close"][4:].tolist() == [c.close for c in completed[4:]]
+        assert data["tick_count"][4:].tolist() == [12] * 6
+        assert not rewrites
+        warehouse.close()
+
+
+def test_get_candles_persists():
+    """PocketOption(warehouse=...) keeps the finished candles of every download on disk."""
+    from BinaryOptionsTools.platforms.pocketoption.stable_api import PocketOption
+
+    with tempfile.TemporaryDirectory() as root:
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        api = PocketOption("test_ssid", demo=True, warehouse=root)
+        api.subscribe_candles = api.unsubscribe_candles = lambda active: None
+        columns = make_columns(1735000000, 50)
+        api._download_pages = lambda active, period, time_red, count, count_request, **kwargs: [
+            {"time": int(t), "open": c, "high": c, "low": c, "close": c, "volume": 0}
+            for t, c in zip(columns["time"], columns["close"])]
+
+        end = int(columns["time"][-1])
+        # The newest candle is still forming by the server clock: it is returned but not stored
+        api.api.time_sync.server_timestamp = end + 30
+        df = api.get_candles("EURUSD_otc", 60, start_time=end, count=3000)
+        assert len(df) == 50
+        stored = CandleWarehouse(root).to_frame("EURUSD_otc", 60)
+        assert stored.index.equals(df.index[:-1])
+        assert np.allclose(stored["close"], df["close"].iloc[:-1])
+
+        # Once its period is over the next download stores its final values
+        columns["close"][-1] += 0.01
+        api.api.time_sync.server_timestamp = end + 60
+        df = api.get_candles("EURUSD_otc", 60, start_time=end, count=3000, use_cache=False)
+        stored = CandleWarehouse(root).to_frame("EURUSD_otc", 60)
+        assert stored.index.equals(df.index)
+        assert np.allclose(stored["close"], df["close"])
+
+
+if __name__ == "__main__":
+    test_import_csv_and_query()
+    test_merge_rules()
+    test_concurrent_rewrite()
+    test_live_aggregator_merge()
+    test_get_candles_persists()
+    print("All candle warehouse tests passed")
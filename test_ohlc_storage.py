@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Tests for the OHLC aggregator storage backends and multi-timeframe aggregation.
+"""
+
+import sys
+import os
+import threading
+
+import numpy as np
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from BinaryOptionsTools.platforms.pocketoption.ohlc_aggregator import CandleAggregator, SubscriptionManager
+
+
+def make_ticks(count=500, start=1735145820, step=0.7, seed=7):
+    """Deterministic random-walk ticks."""
+    rng = np.random.default_rng(seed)
+    timestamps = start + np.arange(count) * step
+    prices = 1.04 + np.cumsum(rng.normal(0, 0.0002, count))
+    return timestamps.tolist(), prices.round(5).tolist()
+
+
+def test_array_storage_matches_deque():
+    """Array storage returns exactly what deque storage returns, also after the ring wraps."""
+    print("=" * 60)
+    print("Testing columnar candle storage")
+    print("=" * 60)
+
+    deque_agg = CandleAggregator(timeframe_seconds=5, max_candles=20)
+    array_agg = CandleAggregator(timeframe_seconds=5, max_candles=20, storage="array")
+    for timestamp, price in zip(*make_ticks()):
+        deque_agg.add_tick("EURUSD_otc", timestamp, price)
+        array_agg.add_tick("EURUSD_otc", timestamp, price)
+
+    assert array_agg.get_candles("EURUSD_otc") == deque_agg.get_candles("EURUSD_otc")
+    assert array_agg.get_candles("EURUSD_otc", 3) == deque_agg.get_candles("EURUSD_otc", 3)
+    assert array_agg.get_latest_candle("EURUSD_otc") == deque_agg.get_latest_candle("EURUSD_otc")
+    assert len(array_agg.get_candles("EURUSD_otc")) == 20
+    print(f"   {len(array_agg.get_candles('EURUSD_otc'))} candles identical in both modes")
+
+
+def test_candles_array():
+    """get_candles_array hands out arrays that match the dictionaries and outlive new candles."""
+    agg = CandleAggregator(timeframe_seconds=5, max_candles=10, storage="array")
+    for timestamp, price in zip(*make_ticks(200)):
+        agg.add_tick("EURUSD_otc", timestamp, price)
+
+    arr = agg.get_candles_array("EURUSD_otc", 4)
+    dicts = agg.get_candles("EURUSD_otc", 4)
+    assert arr["close"].tolist() == [c["close"] for c in dicts]
+    assert arr["time"].tolist() == [c["time"] for c in dicts]
+
+    # The ring is full: later candles overwrite its oldest slots, not the caller's array
+    held = agg.get_candles_array("EURUSD_otc")
+    before = held.copy()
+    for timestamp, price in zip(*make_ticks(30, start=make_ticks(200)[0][-1] + 1)):
+        agg.add_tick("EURUSD_otc", timestamp, price)
+    assert agg.get_candles_array("EURUSD_otc", 1)["time"][0] > before["time"][-1]
+    assert np.array_equal(held, before)
+
+    df = agg.get_candles_dataframe("EURUSD_otc")
+    assert list(df.columns) == ["time", "open", "high", "low", "close", "volume", "tick_count"]
+    assert len(df) == 10
+
+    deque_agg = CandleAggregator(timeframe_seconds=5, max_candles=10)
+    for timestamp, price in zip(*make_ticks(200)):
+        deque_agg.add_tick("EURUSD_otc", timestamp, price)
+    assert np.array_equal(deque_agg.get_candles_array("EURUSD_otc", 4), arr)
+    assert len(agg.get_candles_array("GBPUSD_otc")) == 0
+
+
+def test_subscription_manager_array_storage():
+    manager = SubscriptionManager()
+    manager.subscribe_candles_ohlc("EURUSD_otc", 5, max_candles=50, storage="array")
+    for timestamp, price in zip(*make_ticks(100)):
+        manager.process_tick("EURUSD_otc", timestamp, price)
+
+    arr = manager.get_candles_array("EURUSD_otc", 5)
+    assert len(arr) == len(manager.get_candles("EURUSD_otc", 5)) > 0
+    assert len(manager.get_candles_array("EURUSD_otc", 60)) == 0
+
+
+def run_manager(cascade, timeframes, ticks):
+    """Feed ticks through a manager and record every completed candle."""
+    completed = []
+    manager = SubscriptionManager(cascade=cascade)
+    for timeframe in timeframes:
+        manager.subscribe_candles_ohlc(
+            "EURUSD_otc", timeframe, max_candles=100,
+            on_candle_complete=lambda asset, candle: completed.append((asset, candle.to_dict()))
+        )
+    currents = []
+    for timestamp, price in zip(*ticks):
+        manager.process_tick("EURUSD_otc", timestamp, price)
+        currents.append([manager.get_current_candle("EURUSD_otc", tf) for tf in timeframes])
+    return manager, completed, currents
+
+
+def test_cascade_matches_direct():
+    """Rolled-up timeframes produce the same candles, callbacks and current candles as direct aggregation."""
+    print("=" * 60)
+    print("Testing cascading multi-timeframe aggregation")
+    print("=" * 60)
+
+    timeframes = [5, 15, 60, 300]
+    ticks = make_ticks(3000, step=0.9)
+    direct, direct_completed, direct_currents = run_manager(False, timeframes, ticks)
+    cascade, cascade_completed, cascade_currents = run_manager(True, timeframes, ticks)
+
+    assert cascade.plans["EURUSD_otc"] == ((5,), 5, (15, 60, 300))
+    for timeframe in timeframes:
+        assert cascade.get_candles("EURUSD_otc", timeframe) == direct.get_candles("EURUSD_otc", timeframe)
+    assert sorted(map(str, cascade_completed)) == sorted(map(str, direct_completed))
+    assert cascade_currents == direct_currents
+    print(f"   {len(cascade_completed)} completed candles identical across {timeframes}")
+
+
+def test_cascade_resubscribe():
+    """Timeframes that do not divide evenly, or lose their source, go back to consuming ticks."""
+    manager = SubscriptionManager(cascade=True)
+    for timeframe in (10, 30, 45):
+        manager.subscribe_candles_ohlc("EURUSD_otc", timeframe)
+    assert manager.plans["EURUSD_otc"] == ((10, 45), 10, (30,))
+
+    timestamps, prices = make_ticks(100, step=1.0)
+    for timestamp, price in zip(timestamps[:50], prices[:50]):
+        manager.process_tick("EURUSD_otc", timestamp, price)
+    before = manager.get_current_candle("EURUSD_otc", 30)
+
+    manager.unsubscribe_candles_ohlc("EURUSD_otc", 10)
+    assert manager.plans["EURUSD_otc"] == ((30, 45), 30, ())
+    # The in-progress 30s candle survives the switch to direct aggregation
+    assert manager.get_current_candle("EURUSD_otc", 30) == before
+
+    reference = SubscriptionManager()
+    reference.subscribe_candles_ohlc("EURUSD_otc", 30)
+    for timestamp, price in zip(timestamps, prices):
+        reference.process_tick("EURUSD_otc", timestamp, price)
+    for timestamp, price in zip(timestamps[50:], prices[50:]):
+        manager.process_tick("EURUSD_otc", timestamp, price)
+    assert manager.get_candles("EURUSD_otc", 30) == reference.get_candles("EURUSD_otc", 30)
+
+
+def test_callbacks_run_outside_locks():
+    """Completion callbacks can read candles, even from another thread, without deadlocking."""
+    manager = SubscriptionManager(cascade=True)
+    seen = []
+
+    def on_complete(asset, candle):
+        # Another thread reading the same asset must not wait for the ingesting thread
+        reader = threading.Thread(target=lambda: seen.append(len(manager.get_candles(asset, 5))))
+        reader.start()
+        reader.join(timeout=2)
+        assert not reader.is_alive(), "reader blocked while a callback was running"
+        manager.get_current_candle(asset, 15)
+
+    manager.subscribe_candles_ohlc("EURUSD_otc", 5, on_candle_complete=on_complete)
+    manager.subscribe_candles_ohlc("EURUSD_otc", 15)
+    for timestamp, price in zip(*make_ticks(60, step=1.0)):
+        manager.process_tick("EURUSD_otc", timestamp, price)
+    assert seen and seen == sorted(seen)
+
+
+def test_concurrent_readers():
+    """Readers on strategy threads see consistent candles while ticks stream in."""
+    manager = SubscriptionManager(cascade=True)
+    assets = ["EURUSD_otc", "GBPUSD_otc", "AUDJPY_otc"]
+    for asset in assets:
+        for timeframe in (5, 15, 60):
+            manager.subscribe_candles_ohlc(asset, timeframe, storage="array")
+
+    errors = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            for asset in assets:
+                candles = manager.get_candles(asset, 15)
+                times = [c["time"] for c in candles]
+                if times != sorted(times) or any(c["low"] > c["high"] for c in candles):
+                    errors.append(candles)
+
+    def write(asset, seed):
+        for timestamp, price in zip(*make_ticks(2000, step=0.5, seed=seed)):
+            manager.process_tick(asset, timestamp, price)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    writers = [threading.Thread(target=write, args=(asset, i)) for i, asset in enumerate(assets)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors
+    for i, asset in enumerate(assets):
+        reference = SubscriptionManager()
+        reference.subscribe_candles_ohlc(asset, 15)
+        for timestamp, price in zip(*make_ticks(2000, step=0.5, seed=i)):
+            reference.process_tick(asset, timestamp, price)
+        assert manager.get_candles(asset, 15) == reference.get_candles(asset, 15)
+
+
+def test_bulk_ticks_match_single_ticks():
+    """add_ticks/process_ticks give the same candles as feeding ticks one by one."""
+    print("=" * 60)
+    print("Testing bulk tick ingestion")
+    print("=" * 60)
+
+    timestamps, prices = make_ticks(2000, step=0.8)
+    # Include an out-of-order tick, which starts a candle of its own just like add_tick does
+    timestamps[700] = timestamps[700] - 30
+
+    single = CandleAggregator(timeframe_seconds=5, max_candles=500)
+    for timestamp, price in zip(timestamps, prices):
+        single.add_tick("EURUSD_otc", timestamp, price)
+
+    bulk = CandleAggregator(timeframe_seconds=5, max_candles=500, storage="array")
+    completed = []
+    rng = np.random.default_rng(1)
+    i = 0
+    while i < len(timestamps):
+        n = int(rng.integers(1, 40))
+        completed += bulk.add_ticks("EURUSD_otc", timestamps[i:i + n], prices[i:i + n])
+        i += n
+
+    assert bulk.get_candles("EURUSD_otc") == single.get_candles("EURUSD_otc")
+    assert bulk.get_current_candle("EURUSD_otc") == single.get_current_candle("EURUSD_otc")
+    assert [c.to_dict() for c in completed] == single.get_candles("EURUSD_otc")
+
+    for cascade in (False, True):
+        completed_single, completed_bulk = [], []
+        managers = []
+        for sink in (completed_single, completed_bulk):
+            manager = SubscriptionManager(cascade=cascade)
+            for timeframe in (5, 15, 60):
+                manager.subscribe_candles_ohlc(
+                    "EURUSD_otc", timeframe,
+                    on_candle_complete=lambda asset, candle, sink=sink: sink.append(candle.to_dict())
+                )
+            manager.subscribe_candles_ohlc("GBPUSD_otc", 5)
+            managers.append(manager)
+
+        rows = [["EURUSD_otc", t, p] for t, p in zip(timestamps, prices)]
+        rows += [["GBPUSD_otc", t, p] for t, p in zip(timestamps[:100], prices[:100])]
+        rows.append(["UNSUBSCRIBED", 1735145820, 1.0])
+        for asset, timestamp, price in rows:
+            managers[0].process_tick(asset, timestamp, price)
+        processed = 0
+        for i in range(0, len(rows), 64):
+            processed += managers[1].process_ticks(rows[i:i + 64])
+
+        assert processed == len(rows) - 1
+        for asset, timeframe in (("EURUSD_otc", 5), ("EURUSD_otc", 15), ("EURUSD_otc", 60), ("GBPUSD_otc", 5)):
+            assert managers[1].get_candles(asset, timeframe) == managers[0].get_candles(asset, timeframe)
+            assert managers[1].get_current_candle(asset, timeframe) == managers[0].get_current_candle(asset, timeframe)
+        assert sorted(map(str, completed_bulk)) == sorted(map(str, completed_single))
+    print(f"   {len(completed)} candles identical in bulk and per-tick ingestion")
+
+
+if __name__ == "__main__":
+    test_array_storage_matches_deque()
+    test_candles_array()
+    test_subscription_manager_array_storage()
+    test_cascade_matches_direct()
+    test_cascade_resubscribe()
+    test_callbacks_run_outside_locks()
+    test_concurrent_readers()
+    test_bulk_ticks_match_single_ticks()
+    print("All OHLC storage tests passed")
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Tests for the local replay server: Engine.IO handshake and pings, history and
+order replies, and a full WebsocketClient session fed at a multiple of real time.
+Sessions recorded with the frame recorder are replayed through the same server.
+"""
+
+import sys
+import os
+import asyncio
+import json
+import logging
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import websockets
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import BinaryOptionsTools.platforms.pocketoption.global_value as global_value
+from BinaryOptionsTools.platforms.pocketoption.ohlc_aggregator import SubscriptionManager
+from BinaryOptionsTools.platforms.pocketoption.replay_server import (
+    ReplayServer, candle_ticks, recorded_streams, synthetic_ticks
+)
+from BinaryOptionsTools.platforms.pocketoption.ws.client import WebsocketClient
+from BinaryOptionsTools.platforms.pocketoption.ws.recorder import (
+    ZSTD_AVAILABLE, FrameRecorder, read_frames, read_header
+)
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.deals import Deals
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.history import HistoryRequests
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.pending import PendingRequests
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.ticks import Ticks
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.timesync import TimeSync
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class FakeAPI:
+    """What the client expects from PocketOptionAPI, with an OHLC aggregator attached."""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.pending_orders = PendingRequests("pendingOrders")
+        self.history_requests = HistoryRequests()
+        self.deals = Deals()
+        self.order_async = None
+        self.history_data = None
+        self.ticks = Ticks(capacity=100000)
+        self.time_sync = TimeSync()
+        self.ohlc_manager = SubscriptionManager()
+        self.ohlc_subscriptions = {}
+
+    async def close(self):
+        pass
+
+
+async def event(ws):
+    """Next socket.io binary event: (name, decoded payload)."""
+    while True:
+        header = await ws.recv()
+        if isinstance(header, str) and header.startswith("451-["):
+            return json.loads(header[4:])[0], json.loads(await ws.recv())
+
+
+def test_handshake_history_and_orders():
+    """Open packet, namespace connect, auth, pings, history by index and settled orders."""
+    print("=" * 60)
+    print("Testing replay server protocol")
+    print("=" * 60)
+
+    history = pd.read_csv(os.path.join(HERE, "history-AUDJPY_otc.csv"))
+    times = pd.to_datetime(history["time"])
+    times = ((times - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy()
+    end = int(times[1000])
+    ticks = synthetic_ticks(["EURUSD_otc"], duration=60, rate=10, start=1735000000)
+
+    with ReplayServer(ticks=ticks, history={"AUDJPY_otc": history}, speed=100, ping_interval=0.02) as server:
+        async def run():
+            async with websockets.connect(server.url) as ws:
+                opened = await ws.recv()
+                assert opened.startswith("0") and "sid" in json.loads(opened[1:])
+                await ws.send("40")
+                assert (await ws.recv()).startswith("40{")
+                await ws.send('42["auth",{"session":"test","isDemo":1}]')
+                name, payload = await event(ws)
+                assert name == "successauth"
+                name, payload = await event(ws)
+                assert name == "successupdateBalance" and payload["balance"] == 10000.0
+
+                await ws.send('42' + json.dumps(["loadHistoryPeriod", {
+                    "asset": "AUDJPY_otc", "index": 17, "time": end, "offset": 300, "period": 5}]))
+                await ws.send('42' + json.dumps(["openOrder", {
+                    "asset": "EURUSD_otc", "amount": 10, "action": "call", "isDemo": 1,
+                    "requestId": 5, "optionType": 100, "time": 20}]))
+
+                pings = 0
+                replies = {}
+                prices = []
+                while "successcloseOrder" not in replies:
+                    message = await ws.recv()
+                    if message == "2":
+                        pings += 1
+                        await ws.send("3")
+                        continue
+                    if isinstance(message, str) and message.startswith("451-["):
+                        name = json.loads(message[4:])[0]
+                        payload = json.loads(await ws.recv())
+                        if name == "updateStream":
+                            prices.extend(payload)
+                        else:
+                            replies[name] = payload
+                return pings, replies, prices
+
+        pings, replies, prices = asyncio.run(run())
+
+    data = replies["loadHistoryPeriod"]["data"]
+    expected = history[(times > end - 300) & (times <= end)]
+    assert data["index"] == 17 and data["asset"] == "AUDJPY_otc"
+    assert len(data["candles"]) == len(expected) == 60
+    assert np.allclose([c[2] for c in data["candles"]], expected["close"])
+
+    opened = replies["successopenOrder"]
+    closed = replies["successcloseOrder"]["deals"][0]
+    assert opened["requestId"] == 5 and closed["id"] == opened["id"]
+    assert closed["closeTimestamp"] - closed["openTimestamp"] == 20
+    # Settled against the last price replayed before expiry
+    before_close = [p for _, t, p in prices if t <= closed["closeTimestamp"]]
+    assert closed["closePrice"] == before_close[-1]
+    expected_profit = 9.2 if closed["closePrice"] > opened["openPrice"] else \
+        (-10 if closed["closePrice"] < opened["openPrice"] else 0)
+    assert closed["profit"] == expected_profit
+    assert pings >= 1 and server.stats["pongs"] == pings
+
+
+def test_speed_multiplier():
+    """Stream time is replayed at the requested multiple of real time."""
+    ticks = synthetic_ticks(["EURUSD_otc", "AUDJPY_otc"], duration=10, rate=5, start=1735000000)
+
+    async def drain(url, count):
+        async with websockets.connect(url) as ws:
+            await ws.recv()
+            await ws.send("40")
+            await ws.recv()
+            await ws.send('42["auth",{}]')
+            started = time.perf_counter()
+            seen = 0
+            while seen < count:
+                message = await ws.recv()
+                if isinstance(message, str) and message.startswith('451-["updateStream"'):
+                    seen += 1
+            return time.perf_counter() - started
+
+    with ReplayServer(ticks=ticks, speed=20) as server:
+        elapsed = asyncio.run(drain(server.url, len(ticks)))
+    span = ticks[-1][0] - ticks[0][0]
+    assert span / 20 * 0.9 < elapsed < span / 20 + 1.0
+    print(f"   {span:.1f}s of ticks replayed in {elapsed:.2f}s at 20x")
+
+
+def replay_to_client(ticks, asset, period, recorder=None):
+    """Replay ticks unthrottled to a WebsocketClient; returns its api object and the elapsed time."""
+    api = FakeAPI()
+    api.ohlc_manager.subscribe_candles_ohlc(asset, period, max_candles=5000)
+    api.ohlc_subscriptions[asset] = [period]
+
+    global_value.websocket_is_connected = False
+    global_value.SSID = '42["auth",{"session":"test","isDemo":1}]'
+    with ReplayServer(ticks=ticks, speed=None) as server:
+        client = WebsocketClient(api, url=server.url, recorder=recorder)
+        thread = threading.Thread(target=client.loop.run_forever, daemon=True)
+        thread.start()
+        started = time.perf_counter()
+        connection = asyncio.run_coroutine_threadsafe(client.connect(), client.loop)
+        assert server.wait_finished(timeout=60)
+        # Every frame has been written; wait for the client to process the last ones
+        deadline = time.time() + 10
+        while len(api.ticks.get_ticks(asset)[0]) < len(ticks) and time.time() < deadline:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        asyncio.run_coroutine_threadsafe(client.websocket.close(), client.loop).result(timeout=5)
+        connection.cancel()
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.01), client.loop).result(timeout=5)
+        client.loop.call_soon_threadsafe(client.loop.stop)
+        thread.join(timeout=5)
+    global_value.websocket_is_connected = False
+    return api, elapsed
+
+
+def assert_candles_match(api, asset, period, history):
+    candles = api.ohlc_manager.get_candles(asset, period)
+    # The last candle is still open
+    assert len(candles) == len(history) - 1
+    for name in ("open", "high", "low", "close"):
+        assert np.allclose([c[name] for c in candles], history[name].iloc[:-1])
+
+
+def test_client_session_throughput():
+    """WebsocketClient connects to the server and aggregates the replayed candles exactly."""
+    print("=" * 60)
+    print("Testing client throughput against the replay server")
+    print("=" * 60)
+
+    history = pd.read_csv(os.path.join(HERE, "history-AUDJPY_otc.csv")).iloc[:2000]
+    ticks = candle_ticks({"AUDJPY_otc": history})
+    assert len(ticks) == 4 * len(history)
+
+    api, elapsed = replay_to_client(ticks, "AUDJPY_otc", 5)
+    assert len(api.ticks.get_ticks("AUDJPY_otc")[0]) == len(ticks)
+    assert_candles_match(api, "AUDJPY_otc", 5, history)
+    print(f"   {len(ticks)} tick frames through on_message in {elapsed:.2f}s "
+          f"({len(ticks) / elapsed:.0f} frames/s)")
+
+
+def test_frame_recorder_round_trip():
+    """Frames come back in order with their direction, compressed or not; torn tails are skipped."""
+    print("=" * 60)
+    print("Testing frame recorder")
+    print("=" * 60)
+
+    payload = json.dumps([["EURUSD_otc", 1735000000.123, 1.10251]]).encode()
+    frames = [(i % 7 == 0, '451-["updateStream",{"_placeholder":true,"num":0}]' if i % 2 else payload)
+              for i in range(100000)]
+    compressions = [None, "gzip"] + (["zstd"] if ZSTD_AVAILABLE else [])
+    with tempfile.TemporaryDirectory() as root:
+        for compression in compressions:
+            path = os.path.join(root, f"session-{compression}.frames")
+            recorder = FrameRecorder(path, compression=compression, flush_interval=0.05)
+            started = time.perf_counter()
+            for outbound, data in frames:
+                if outbound:
+                    recorder.outbound(data)
+                else:
+                    recorder.inbound(data)
+            elapsed = time.perf_counter() - started
+            recorder.close()
+
+            recorded = list(read_frames(path))
+            assert [(f.outbound, f.data) for f in recorded] == frames
+            assert all(a.timestamp <= b.timestamp for a, b in zip(recorded, recorded[1:]))
+            assert recorder.frames == len(frames) and recorder.dropped == 0
+            assert read_header(path)["version"] == 1
+            print(f"   {compression or 'plain'}: {elapsed / len(frames) * 1e9:.0f} ns per frame on the "
+                  f"receive path, {os.path.getsize(path) / 1024:.0f} KiB")
+
+        # A recording cut mid-record ends at the last complete frame
+        path = os.path.join(root, "session-None.frames")
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 3)
+        assert [(f.outbound, f.data) for f in read_frames(path)] == frames[:-1]
+
+        # A recorder that is never closed (a crash) leaves a readable file, compressed or not:
+        # every writer pass flushes whole blocks, and a tail cut anywhere just ends the frames
+        batch = frames[:1000]
+        for compression in compressions:
+            path = os.path.join(root, f"crash-{compression}.frames")
+            copy = path + ".copy"
+            recorder = FrameRecorder(path, compression=compression, flush_interval=0.01)
+            for outbound, data in batch:
+                if outbound:
+                    recorder.outbound(data)
+                else:
+                    recorder.inbound(data)
+            recovered = []
+            deadline = time.perf_counter() + 5
+            while recovered != batch and time.perf_counter() < deadline:
+                time.sleep(0.02)
+                shutil.copyfile(path, copy)
+                recovered = [(f.outbound, f.data) for f in read_frames(copy)]
+            assert recovered == batch, compression
+            for cut in (3, 100, os.path.getsize(copy) // 2):
+                with open(copy, "r+b") as f:
+                    f.truncate(os.path.getsize(copy) - cut)
+                recovered = [(f.outbound, f.data) for f in read_frames(copy)]
+                assert recovered == batch[:len(recovered)], compression
+            assert len(recovered) < len(batch)
+            recorder.close()
+
+        # Frames over the pending limit are dropped and counted instead of growing without bound
+        recorder = FrameRecorder(os.path.join(root, "bounded.frames"), max_pending=10, flush_interval=60)
+        for _ in range(15):
+            recorder.inbound("2")
+        recorder.close()
+        assert recorder.dropped == 5 and recorder.frames == 10
+
+
+def test_record_and_replay_session():
+    """A recorded client session replays through the server to the same candles."""
+    history = pd.read_csv(os.path.join(HERE, "history-EURUSD_otc.csv")).iloc[:1000]
+    ticks = candle_ticks({"EURUSD_otc": history})
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "session.frames")
+        recorder = FrameRecorder(path, compression="gzip")
+        replay_to_client(ticks, "EURUSD_otc", 5, recorder=recorder)
+        recorder.close()
+
+        frames = list(read_frames(path))
+        sent = [f.data for f in frames if f.outbound]
+        assert sent[:2] == ["40", global_value.SSID]
+        assert frames[0].data.startswith("0{")
+
+        recorded_ticks, deals = recorded_streams(path)
+        assert deals == []
+        assert [json.loads(payload) for _, payload in recorded_ticks] == [rows for _, rows in ticks]
+
+        api, _ = replay_to_client(recorded_ticks, "EURUSD_otc", 5)
+        assert_candles_match(api, "EURUSD_otc", 5, history)
+
+
+if __name__ == "__main__":
+    test_handshake_history_and_orders()
+    test_speed_multiplier()
+    test_client_session_throughput()
+    test_frame_recorder_round_trip()
+    test_record_and_replay_session()
+    print("All replay server tests passed")
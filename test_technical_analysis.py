@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the technical analysis module, run on the bundled history CSVs.
+"""
+
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from BinaryOptionsTools.indicators import technical_analysis as ta
+from BinaryOptionsTools.indicators import streaming
+from BinaryOptionsTools.indicators.scanner import MarketScanner
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_history(asset="EURUSD_otc"):
+    """Candles of a bundled history file, in the format get_candles returns."""
+    df = pd.read_csv(os.path.join(ROOT, f"history-{asset}.csv"), index_col=0)
+    df["time"] = (pd.to_datetime(df["time"]) - pd.Timestamp(0)) // pd.Timedelta(seconds=1)
+    df["volume"] = 0
+    return df
+
+
+class FakeAPI:
+    """Serves candles from a history file and counts how often it is asked."""
+
+    def __init__(self, df):
+        self.df = df
+        self.calls = 0
+
+    def get_candles(self, active, period, count):
+        self.calls += 1
+        return self.df.iloc[-count:].to_dict("records")
+
+
+def test_shared_context_fetches_once():
+    """get_all_indicators and get_comprehensive_analysis fetch candles a single time."""
+    print("=" * 60)
+    print("Testing shared candle fetch")
+    print("=" * 60)
+
+    api = FakeAPI(load_history())
+    indicators = ta.get_all_indicators(api, 60, "EURUSD_otc", 200)
+    assert api.calls == 1
+    assert "error" not in indicators
+    assert all("error" not in value for value in indicators.values()), indicators
+
+    api.calls = 0
+    analysis = ta.get_comprehensive_analysis(api, 60, "EURUSD_otc", 200)
+    assert api.calls == 1
+    assert "error" not in analysis, analysis
+    assert analysis["detailed_analysis"]["trading_signals"]["total_signals"] > 0
+    print(f"   Final signal: {analysis['final_signal']}")
+
+
+def test_context_matches_direct_calls():
+    """Indicators computed on a shared context equal the api-based results."""
+    api = FakeAPI(load_history())
+    ctx = ta.AnalysisContext.fetch(api, "EURUSD_otc", 60, 500)
+
+    direct = ta.rsi(api, 60, "EURUSD_otc", 14, 200)
+    shared = ta.rsi(ctx, 60, "EURUSD_otc", 14, 200)
+    assert np.allclose(direct["values"], shared["values"], equal_nan=True)
+    assert direct["latest"] == shared["latest"]
+
+    direct = ta.macd(api, 60, "EURUSD_otc", num_candles=100)
+    shared = ta.macd(ctx, 60, "EURUSD_otc", num_candles=100)
+    assert direct["latest_histogram"] == shared["latest_histogram"]
+    assert ta.analysis_context(ctx) is ctx
+
+
+def test_extrema_and_swing_patterns():
+    """Vectorised swing points equal the neighbour-by-neighbour definition and drive the pattern matchers."""
+    rng = np.random.default_rng(5)
+    for n in (11, 50, 400):
+        values = np.round(100 + np.cumsum(rng.normal(0, 1, n)))  # rounding creates ties
+        expected_peaks = [i for i in range(5, n - 5)
+                          if all(values[i] >= values[i - j] and values[i] >= values[i + j] for j in range(1, 6))]
+        expected_troughs = [i for i in range(5, n - 5)
+                            if all(values[i] <= values[i - j] and values[i] <= values[i + j] for j in range(1, 6))]
+        assert ta._find_extrema(values, 5, peaks=True).tolist() == expected_peaks
+        assert ta._find_extrema(values, 5, peaks=False).tolist() == expected_troughs
+    assert len(ta._find_extrema(np.arange(5.0))) == 0
+
+    # Two equal tops separated by a deep valley, then a decline
+    high = np.array([90, 92, 94, 96, 98, 100, 98, 96, 94, 92, 90, 88, 86, 88, 90, 92, 94, 96, 98,
+                     100, 98, 96, 94, 92, 90, 88, 86, 84], dtype=float)
+    close = high - 1
+    result = ta._detect_double_top(high, close)
+    assert result["detected"] and result["signal"] == "SELL"
+    assert (result["peak1_idx"], result["peak2_idx"]) == (5, 19)
+    assert ta._detect_double_bottom(-high + 200, -close + 200)["detected"]
+
+    patterns = ta.detect_chart_patterns(load_history().iloc[:1000])
+    assert "error" not in patterns and len(patterns) == 12
+
+
+def test_support_resistance_levels():
+    """Pivots, touch counts and nearest levels agree with a direct scan of the candles."""
+    df = load_history().iloc[:1500].reset_index(drop=True)
+    ctx = ta.AnalysisContext(df, "EURUSD_otc", 60)
+    highs, lows, close = df["high"].values, df["low"].values, df["close"].values
+    lookback = 20
+
+    result = ta.support_resistance_levels(ctx, 60, "EURUSD_otc", len(df), lookback)
+    pivots = [highs[i] for i in range(lookback, len(df) - lookback)
+              if highs[i] == max(highs[i - lookback:i + lookback + 1])]
+    levels = sorted(set(pivots))
+    kept = [levels[0]]
+    for level in levels[1:]:
+        if abs(level - kept[-1]) / kept[-1] > 0.001:
+            kept.append(level)
+    assert result["resistance_levels"] == kept[-5:]
+    assert result["nearest_resistance"] == min([r for r in kept if r > close[-1]], default=None)
+
+    recent = highs[-100:]
+    detected = ta._detect_support_resistance_levels(highs, lows, close)
+    for entry in detected["resistance_levels"]:
+        i = entry["index"]
+        assert recent[i] > max(recent[i - 2], recent[i - 1], recent[i + 1], recent[i + 2])
+        assert entry["strength"] == int(np.sum(np.abs(recent - recent[i]) / recent[i] < 0.005))
+
+    # Quantised prices land exactly on the 0.5% band edges
+    rng = np.random.default_rng(7)
+    values = np.concatenate([np.round(1 + rng.random(300) * 0.02, 3), [0.995, 1.0, 1.005]])
+    levels = np.concatenate([values[:50], [1.0, 1.005]])
+    expected = [np.sum(np.abs(values - level) / level < 0.005) for level in levels]
+    assert ta._count_touches(values, levels).tolist() == expected
+
+    levels = np.array([1.0, 1.5, 2.0])
+    assert ta._nearest_levels(levels, 1.5) == (2.0, 1.0)
+    assert ta._nearest_levels(levels, 0.5) == (1.0, None)
+    assert ta._nearest_levels(levels[:0], 1.5) == (None, None)
+
+
+def history_fetch(asset, timeframe, num_candles):
+    """Scanner fetch serving the bundled history files (empty for unknown assets)."""
+    path = os.path.join(ROOT, f"history-{asset}.csv")
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return load_history(asset).iloc[-num_candles:]
+
+
+def test_market_scanner():
+    """Process pool and in-thread scans give the same ranked table."""
+    print("=" * 60)
+    print("Testing multi-asset scanner")
+    print("=" * 60)
+
+    assets = ["EURUSD_otc", "AUDJPY_otc", "AUDNZD_otc", "MISSING_otc"]
+    with MarketScanner(fetch=history_fetch, fetch_workers=4, processes=2) as scanner:
+        parallel = scanner.scan(assets, timeframes=[60, 300], num_candles=200)
+        again = scanner.scan(assets[:1], num_candles=200)
+    with MarketScanner(fetch=history_fetch, processes=0) as scanner:
+        serial = scanner.scan(assets, timeframes=[60, 300], num_candles=200)
+
+    assert len(parallel) == 8
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert parallel["error"].iloc[-2:].tolist() == ["No candles", "No candles"]
+    strengths = parallel["score"].iloc[:-2].abs().tolist()
+    assert strengths == sorted(strengths, reverse=True)
+    assert again["asset"].tolist() == ["EURUSD_otc"]
+    print(parallel[["asset", "timeframe", "signal", "score", "confidence"]].to_string())
+
+
+def test_scan_markets_live_candles():
+    """PocketOption.scan_markets analyses live OHLC aggregates when enough are available."""
+    from BinaryOptionsTools.platforms.pocketoption.stable_api import PocketOption
+
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    api = PocketOption("test_ssid", demo=True)
+    api.ohlc_manager.subscribe_candles_ohlc("EURUSD_otc", 5, max_candles=100)
+    df = load_history()
+    for row in df.iloc[:400].itertuples():
+        api.ohlc_manager.process_tick("EURUSD_otc", row.time / 12, row.close)
+
+    table = api.scan_markets(["EURUSD_otc"], timeframes=[5], num_candles=30, processes=0)
+    assert table["error"].isna().all(), table
+    assert table["candles"].tolist() == [30]
+    api._scanner.close()
+
+
+def seeded_smoothing(values, period, alpha):
+    """Batch reference: smoothing seeded with the mean of the first ``period`` values."""
+    values = pd.Series(values, dtype=float).reset_index(drop=True)
+    out = pd.Series(np.nan, index=values.index)
+    seeded = pd.concat([pd.Series([values.iloc[:period].mean()]), values.iloc[period:]], ignore_index=True)
+    out.iloc[period - 1:] = seeded.ewm(alpha=alpha, adjust=False).mean().values
+    return out
+
+
+def reference_indicators(df):
+    """Full recomputation of every streaming indicator with pandas."""
+    close, high, low = df["close"], df["high"], df["low"]
+    change = close.diff().iloc[1:]
+    gain = seeded_smoothing(change.clip(lower=0), 14, 1 / 14)
+    loss = seeded_smoothing((-change).clip(lower=0), 14, 1 / 14)
+    rsi = pd.concat([pd.Series([np.nan]), 100 - 100 / (1 + gain / loss)], ignore_index=True)
+
+    fast = seeded_smoothing(close, 12, 2 / 13)
+    slow = seeded_smoothing(close, 26, 2 / 27)
+    macd_line = (fast - slow).iloc[25:]
+    signal = pd.Series(np.nan, index=close.index)
+    signal.iloc[25:] = seeded_smoothing(macd_line, 9, 2 / 10).values
+
+    middle = close.rolling(20).mean()
+    std = close.rolling(20).std(ddof=0)
+    highest, lowest = high.rolling(14).max(), low.rolling(14).min()
+    slow_k = (100 * (close - lowest) / (highest - lowest)).rolling(3).mean()
+
+    prev_close = close.shift()
+    true_range = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+    atr = pd.concat([pd.Series([np.nan]), seeded_smoothing(true_range.iloc[1:], 14, 1 / 14)], ignore_index=True)
+
+    return {
+        "sma": close.rolling(9).mean().values,
+        "ema": seeded_smoothing(close, 21, 2 / 22).values,
+        "rsi": rsi.values,
+        "macd": np.column_stack([fast - slow, signal]),
+        "bollinger_bands": np.column_stack([middle + 2 * std, middle, middle - 2 * std]),
+        "stochastic": np.column_stack([slow_k, slow_k.rolling(3).mean()]),
+        "williams_r": (-100 * (highest - close) / (highest - lowest)).values,
+        "atr": atr.values,
+    }
+
+
+def make_engine():
+    engine = streaming.IndicatorEngine()
+    engine.add("sma", streaming.SMA, 9)
+    engine.add("ema", streaming.EMA, 21)
+    engine.add("rsi", streaming.RSI, 14)
+    engine.add("macd", streaming.MACD, 12, 26, 9)
+    engine.add("bollinger_bands", streaming.BollingerBands, 20, 2.0)
+    engine.add("stochastic", streaming.Stochastic, 14, 3)
+    engine.add("williams_r", streaming.WilliamsR, 14)
+    engine.add("atr", streaming.ATR, 14)
+    return engine
+
+
+def as_row(value, width):
+    if value is None:
+        return [np.nan] * width
+    if not isinstance(value, tuple):
+        value = (value,)
+    return [np.nan if v is None else v for v in value[:width]]
+
+
+def test_streaming_matches_batch():
+    """Indicators updated candle by candle equal a full recomputation at every step."""
+    print("=" * 60)
+    print("Testing streaming indicators")
+    print("=" * 60)
+
+    df = load_history().iloc[:600].reset_index(drop=True)
+    expected = reference_indicators(df)
+    engine = make_engine()
+    streamed = {name: [] for name in expected}
+    for candle in df.to_dict("records"):
+        engine.on_candle_complete("EURUSD_otc", candle)
+        for name, value in engine.values("EURUSD_otc").items():
+            width = expected[name].shape[1] if expected[name].ndim == 2 else 1
+            streamed[name].append(as_row(value, width))
+
+    for name, reference in expected.items():
+        values = np.array(streamed[name]).reshape(reference.shape)
+        assert np.allclose(values, reference, equal_nan=True, rtol=1e-9, atol=1e-9), name
+    print(f"   {len(expected)} indicators match batch values over {len(df)} candles")
+
+
+def test_streaming_provisional():
+    """peek/provisional give the value the candle would produce, without committing it."""
+    df = load_history().iloc[:120]
+    candles = df.to_dict("records")
+    engine = make_engine()
+    committed = make_engine()
+    for i, candle in enumerate(candles):
+        before = engine.values("EURUSD_otc")
+        provisional = engine.provisional("EURUSD_otc", candle)
+        assert engine.values("EURUSD_otc") == before
+        engine.on_candle_complete("EURUSD_otc", candle)
+        for name, value in engine.values("EURUSD_otc").items():
+            if value is None:
+                assert provisional[name] is None, (i, name)
+            else:
+                assert np.allclose(as_row(provisional[name], 3), as_row(value, 3), equal_nan=True, atol=1e-12), (i, name)
+
+    # warm_up takes a DataFrame and ends in the same state as streaming the candles
+    assert committed.warm_up("EURUSD_otc", df) == engine.values("EURUSD_otc")
+    assert engine.values("GBPUSD_otc")["rsi"] is None
+
+
+def test_stream_signals_warm_up():
+    """Warm-up history leaves out the forming candle, live candles join it without gaps or repeats."""
+    try:
+        from BinaryOptionsTools.bot.signals import StreamSignals
+    except ImportError as e:
+        # The batch signals need the optional ``ta`` package
+        print(f"   Skipped: {e}")
+        return
+
+    df = load_history().iloc[:400]
+
+    def live(row):
+        return SimpleNamespace(timestamp=int(row.time), open=row.open, high=row.high, low=row.low,
+                               close=row.close, volume=0)
+
+    class SignalsAPI:
+        def __init__(self):
+            self.requests = []
+            self.callback = None
+
+        def get_candles(self, active, period, count, count_request=1):
+            self.requests.append((count, count_request))
+            if self.callback is not None:
+                # Candles completing while the history loads: the partial first one,
+                # one the history holds as well and the one forming in the history
+                for row in df.iloc[[-3, -2, -1]].itertuples():
+                    self.callback(active, live(row))
+            return df.iloc[-(count * count_request // period):]
+
+        def subscribe_candles(self, active, **kwargs):
+            self.requests.append("subscribe")
+            self.callback = kwargs["on_candle_complete"]
+            return True
+
+    api = SignalsAPI()
+    signals = StreamSignals(api, timeframe=5)
+    signals.sma(20)
+    signals.subscribe("EURUSD_otc", warm_up=300)
+    assert api.requests == ["subscribe", (1505, 1)]
+    expected = streaming.IndicatorEngine()
+    expected.add("sma_20", streaming.SMA, 20)
+    expected.warm_up("EURUSD_otc", df)
+    assert signals.latest("EURUSD_otc") == expected.values("EURUSD_otc")
+
+    later = load_history().iloc[400:402]
+    for row in later.itertuples():
+        api.callback("EURUSD_otc", live(row))
+    expected.warm_up("EURUSD_otc", later)
+    assert signals.latest("EURUSD_otc") == expected.values("EURUSD_otc")
+
+    api = SignalsAPI()
+    signals = StreamSignals(api, timeframe=60)
+    signals.subscribe("EURUSD_otc", warm_up=200)
+    assert api.requests[-1] == (9000, 2)
+
+    # The indicator base class cannot be used without update and peek
+    try:
+        streaming.StreamingIndicator()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("StreamingIndicator should be abstract")
+
+
+if __name__ == "__main__":
+    test_shared_context_fetches_once()
+    test_context_matches_direct_calls()
+    test_extrema_and_swing_patterns()
+    test_support_resistance_levels()
+    test_market_scanner()
+    test_scan_markets_live_candles()
+    test_streaming_matches_batch()
+    test_streaming_provisional()
+    test_stream_signals_warm_up()
+    print("All technical analysis tests passed")
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the synchronous PocketOption WebsocketClient.
+These tests drive the client's I/O loop in a background thread with a fake socket,
+so no network connection or SSID is required.
+"""
+
+import asyncio
+import sys
+import os
+import threading
+import logging
+import json
+
+import websockets
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from BinaryOptionsTools.platforms.pocketoption.ws.client import WebsocketClient
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.pending import PendingRequests
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.history import HistoryRequests
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.deals import Deals
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.timesync import TimeSync
+from BinaryOptionsTools.platforms.pocketoption.ws.objects.ticks import Ticks
+
+
+class FakeSocket:
+    """Collects frames written by the client."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+class FakeConnection(FakeSocket):
+    """Socket handed out by a patched ``websockets.connect``; it stays open until cancelled."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.Event().wait()
+
+
+class FakeAPI:
+    """Bare minimum the client expects from PocketOptionAPI."""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.pending_orders = PendingRequests("pendingOrders")
+        self.deals = Deals()
+        self.order_async = None
+        self.history_data = None
+        self.ticks = Ticks(capacity=100)
+        self.time_sync = TimeSync()
+
+
+def start_client_loop(client, ws):
+    """Run the client's I/O loop in a daemon thread, like PocketOptionAPI.start_websocket does."""
+    thread = threading.Thread(target=client.loop.run_forever, daemon=True)
+    thread.start()
+    sender = asyncio.run_coroutine_threadsafe(client.websocket_sender(ws), client.loop)
+    return thread, sender
+
+
+def stop_client_loop(client, thread, sender):
+    sender.cancel()
+    asyncio.run_coroutine_threadsafe(asyncio.sleep(0.01), client.loop).result(timeout=5)
+    client.loop.call_soon_threadsafe(client.loop.stop)
+    thread.join(timeout=5)
+
+
+def test_submit_message_from_threads():
+    """Frames submitted from several threads are written by the single I/O loop."""
+    print("=" * 60)
+    print("Testing outgoing frame queue")
+    print("=" * 60)
+
+    client = WebsocketClient(FakeAPI())
+    ws = FakeSocket()
+    thread, sender = start_client_loop(client, ws)
+
+    futures = []
+
+    def submit(worker):
+        for i in range(50):
+            futures.append(client.submit_message(f'42["ps",{worker},{i}]'))
+
+    workers = [threading.Thread(target=submit, args=(w,)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    results = [future.result(timeout=5) for future in futures]
+    stop_client_loop(client, thread, sender)
+
+    print(f"   Sent {len(ws.sent)} frames")
+    assert all(results)
+    assert len(ws.sent) == 200
+    assert sorted(ws.sent) == sorted(f'42["ps",{w},{i}]' for w in range(4) for i in range(50))
+
+
+def test_submit_before_sender_starts():
+    """Frames queued before the connection is up are flushed once the sender runs."""
+    client = WebsocketClient(FakeAPI())
+    future = client.submit_message('42["subfor","EURUSD_otc"]')
+
+    ws = FakeSocket()
+    thread, sender = start_client_loop(client, ws)
+
+    assert future.result(timeout=5) is True
+    stop_client_loop(client, thread, sender)
+    assert ws.sent == ['42["subfor","EURUSD_otc"]']
+
+
+def test_reconnect_stops_old_tasks():
+    """A dropped connection's sender is cancelled, so frames queued afterwards reach the new socket."""
+    from BinaryOptionsTools.platforms.pocketoption.ws import client as client_module
+
+    sockets = [FakeConnection(), FakeConnection()]
+    opened = iter(sockets)
+
+    async def ping(ws):
+        if ws is sockets[0]:
+            raise websockets.ConnectionClosed(None, None)
+        await asyncio.Event().wait()
+
+    client = WebsocketClient(FakeAPI())
+
+    async def scenario():
+        await client._run_connection("wss://first")
+        second = asyncio.ensure_future(client._run_connection("wss://second"))
+        await asyncio.sleep(0.01)  # let the new sender start waiting for frames
+        await asyncio.wait_for(asyncio.wrap_future(client.submit_message('42["ps"]')), 5)
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+
+    connect, send_ping = websockets.connect, client_module.send_ping
+    websockets.connect = lambda url, **kwargs: next(opened)
+    client_module.send_ping = ping
+    try:
+        client.loop.run_until_complete(scenario())
+    finally:
+        websockets.connect, client_module.send_ping = connect, send_ping
+        client.loop.close()
+
+    assert sockets[0].sent == []
+    assert sockets[1].sent == ['42["ps"]']
+
+
+def test_order_reply_resolves_request():
+    """An openOrder reply is delivered to the request with the same requestId."""
+    client = WebsocketClient(FakeAPI())
+    first = client.api.pending_orders.register("101")
+    second = client.api.pending_orders.register("102")
+
+    reply = {"id": "deal-2", "requestId": "102", "asset": "EURUSD_otc"}
+    asyncio.run(client.on_message(json.dumps(reply).encode("utf-8")))
+
+    assert second.result(timeout=1)["id"] == "deal-2"
+    assert not first.done()
+    assert "101" in client.api.pending_orders and "102" not in client.api.pending_orders
+
+
+def test_concurrent_buys():
+    """Several threads can place orders at once; each gets its own acknowledgement."""
+    from BinaryOptionsTools.platforms.pocketoption.stable_api import PocketOption
+
+    # PocketOption grabs the current event loop on construction
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    po = PocketOption("test_ssid", demo=True)
+    client = po.api.websocket_client
+
+    def fake_send(name, msg, request_id=""):
+        # Reply a little later from another thread, as the websocket thread would
+        order = msg[1]
+        reply = {"id": f"deal-{order['asset']}", "requestId": order["requestId"]}
+        threading.Timer(0.05, lambda: asyncio.run(client.on_message(json.dumps(reply).encode("utf-8")))).start()
+
+    po.api.send_websocket_request = fake_send
+
+    results = {}
+
+    def place(asset):
+        results[asset] = po.buy(1, asset, "call", 60, timeout=2)
+
+    assets = ["EURUSD_otc", "GBPUSD_otc", "AUDJPY_otc", "AUDNZD_otc"]
+    threads = [threading.Thread(target=place, args=(asset,)) for asset in assets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for asset in assets:
+        assert results[asset] == (True, f"deal-{asset}")
+    assert len(po.api.pending_orders) == 0
+
+
+def test_closed_deals_wake_waiters():
+    """Closed deals from both close messages are indexed by id and wake every kind of waiter."""
+    client = WebsocketClient(FakeAPI())
+    client.websocket = FakeSocket()
+    deals = client.api.deals
+
+    blocking = {}
+    waiter = threading.Thread(target=lambda: blocking.update(deal=deals.wait("a1", timeout=5)))
+    waiter.start()
+    called = []
+    deals.add_callback("b2", called.append)
+
+    async def scenario():
+        pending = asyncio.ensure_future(deals.wait_async("c3", timeout=5))
+        await client.on_message('451-["successcloseOrder",{"_placeholder":true,"num":0}]')
+        await client.on_message(json.dumps({"profit": 1.8, "deals": [{"id": "a1", "profit": 1.8}]}).encode("utf-8"))
+        await client.on_message('451-["updateClosedDeals",{"_placeholder":true,"num":0}]')
+        await client.on_message(json.dumps([{"id": "b2", "profit": -1}, {"id": "c3", "profit": 0}]).encode("utf-8"))
+        return await pending
+
+    assert asyncio.run(scenario())["id"] == "c3"
+    waiter.join(timeout=5)
+    assert blocking["deal"]["profit"] == 1.8
+    assert called and called[0]["id"] == "b2"
+    assert deals.pending_count() == 0
+    # A waiter arriving after settlement is answered straight away
+    assert deals.wait("a1", timeout=0)["id"] == "a1"
+
+
+def test_wait_timeout_cleans_up():
+    deals = Deals()
+    assert deals.wait("missing", timeout=0.01) is None
+    assert deals.pending_count() == 0
+
+
+def test_event_dispatch():
+    """Binary payloads are routed by the event name announced in the preceding 451 header."""
+    client = WebsocketClient(FakeAPI())
+    ticks = [["EURUSD_otc", 1735145825, 1.04223], ["GBPUSD_otc", 1735145826, 1.25647]]
+    history = {"data": {"asset": "EURUSD_otc", "period": 60,
+                        "candles": [[1735145820, 1.0421, 1.0422, 1.0424, 1.0420]]}}
+
+    async def scenario():
+        await client.on_message('451-["updateStream",{"_placeholder":true,"num":0}]')
+        await client.on_message(json.dumps(ticks).encode("utf-8"))
+        await client.on_message('451-["loadHistoryPeriod",{"_placeholder":true,"num":0}]')
+        await client.on_message(json.dumps(history).encode("utf-8"))
+
+    asyncio.run(scenario())
+
+    assert client.api.time_sync.server_timestamp == 1735145826
+    assert client.api.ticks.latest("EURUSD_otc") == (1735145825, 1.04223)
+    assert client.api.history_data == [{"time": 1735145820, "open": 1.0421, "close": 1.0422,
+                                        "high": 1.0424, "low": 1.0420, "volume": 0}]
+
+
+def test_history_index_at_top_level():
+    """Replies echoing the request index next to ``data`` reach that request on every decode path."""
+    client = WebsocketClient(FakeAPI())
+    client.api.history_requests = HistoryRequests()
+    requests = client.api.history_requests
+    candles = [[1735145820, 1.0421, 1.0422, 1.0424, 1.0420]]
+
+    async def reply(index, candles):
+        await client.on_message('451-["loadHistoryPeriod",{"_placeholder":true,"num":0}]')
+        await client.on_message(json.dumps({"index": index, "data": {"asset": "EURUSD_otc", "period": 60,
+                                                                     "candles": candles}}).encode("utf-8"))
+
+    # Two open requests for the same asset and period: only the index tells them apart
+    first, second = requests.register(101, "EURUSD_otc", 60), requests.register(102, "EURUSD_otc", 60)
+    asyncio.run(reply(102, candles))
+    assert second.result(timeout=1)[0]["time"] == 1735145820
+    assert not first.done()
+
+    # Rows the typed decoder rejects go through the dict path
+    asyncio.run(reply(101, [["1735145880", "1.0422", "1.0423", "1.0425", "1.0421"]]))
+    assert first.result(timeout=1)[0]["time"] == 1735145880
+    assert len(requests) == 0
+
+
+def test_custom_handler():
+    """Handlers can be plugged in for events the client does not know about."""
+    client = WebsocketClient(FakeAPI())
+    received = []
+
+    async def on_payload(payload):
+        received.append(payload)
+
+    client.register_handler("updateCharts", on_payload)
+
+    async def scenario():
+        await client.on_message('451-["updateCharts",{"_placeholder":true,"num":0}]')
+        await client.on_message(b'{"chart": 1}')
+
+    asyncio.run(scenario())
+    assert received == [{"chart": 1}]
+
+
+def test_tick_decoding():
+    """Tick frames decode to typed ticks; malformed rows are skipped instead of failing the frame."""
+    from BinaryOptionsTools.platforms.pocketoption.ws.decoder import decode_ticks
+
+    ticks = decode_ticks(b'[["EURUSD_otc",1735145825.5,1.04223],["GBPUSD_otc",1735145826,1.25647]]')
+    assert [(t.asset, t.timestamp, t.price) for t in ticks] == [
+        ("EURUSD_otc", 1735145825.5, 1.04223), ("GBPUSD_otc", 1735145826.0, 1.25647)
+    ]
+
+    ticks = decode_ticks(b'[["EURUSD_otc",1735145825,1.04223],["BROKEN"],["GBPUSD_otc",null,1.2]]')
+    assert [t.asset for t in ticks] == ["EURUSD_otc", "GBPUSD_otc"]
+
+
+def test_tick_store_bounded():
+    """The tick store keeps the latest ticks per asset and hands out contiguous arrays."""
+    ticks = Ticks(capacity=5)
+    for i in range(12):
+        ticks.add_tick("EURUSD_otc", 1000 + i, 1.0 + i / 100)
+
+    timestamps, prices = ticks.get_ticks("EURUSD_otc")
+    assert ticks.count("EURUSD_otc") == 5
+    assert timestamps.tolist() == [1007, 1008, 1009, 1010, 1011]
+    assert prices.flags.c_contiguous
+    assert ticks.get_ticks("EURUSD_otc", 2)[0].tolist() == [1010, 1011]
+
+    ticks.add_ticks("EURUSD_otc", [1012, 1013, 1014], [1.5, 1.6, 1.7])
+    assert ticks.get_ticks("EURUSD_otc")[0].tolist() == [1010, 1011, 1012, 1013, 1014]
+    assert ticks.latest("EURUSD_otc") == (1014, 1.7)
+    assert len(ticks.get_ticks("GBPUSD_otc")[0]) == 0 and ticks.latest("GBPUSD_otc") is None
+
+
+def test_tick_arrays_survive_appends():
+    """Arrays taken from a full buffer keep their values while new ticks overwrite the ring."""
+    ticks = Ticks(capacity=4)
+    for i in range(6):
+        ticks.add_tick("EURUSD_otc", i, float(i))
+    timestamps, prices = ticks.get_ticks("EURUSD_otc")
+    assert prices.tolist() == [2.0, 3.0, 4.0, 5.0]
+
+    ticks.add_tick("EURUSD_otc", 6, 100.0)
+    ticks.add_ticks("EURUSD_otc", [7, 8], [101.0, 102.0])
+    assert prices.tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert timestamps.tolist() == [2, 3, 4, 5]
+    assert ticks.get_ticks("EURUSD_otc")[1].tolist() == [5.0, 100.0, 101.0, 102.0]
+
+
+if __name__ == "__main__":
+    test_submit_message_from_threads()
+    test_submit_before_sender_starts()
+    test_reconnect_stops_old_tasks()
+    test_order_reply_resolves_request()
+    test_concurrent_buys()
+    test_closed_deals_wake_waiters()
+    test_wait_timeout_cleans_up()
+    test_event_dispatch()
+    test_history_index_at_top_level()
+    test_custom_handler()
+    test_tick_decoding()
+    test_tick_store_bounded()
+    test_tick_arrays_survive_appends()
+    print("All websocket client tests passed")